@@ -0,0 +1,74 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+
+from app.services.conexion_nosql import conectar_redis
+from app.services.operaciones_lentas import agrupar, leer
+from app.services.perfilador import FORMATOS, perfilador
+from app.utils.encoder import RutaJSON
+
+
+def verificar_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Los endpoints de admin exigen el header X-Admin-Token con el valor de ADMIN_TOKEN.
+    """
+    if perfilador.token is None:
+        raise HTTPException(403, "Endpoints de admin deshabilitados (definir ADMIN_TOKEN)")
+    if not perfilador.token_valido(x_admin_token):
+        raise HTTPException(401, "X-Admin-Token inválido")
+
+
+router = APIRouter(
+    prefix="/admin", tags=["admin"], route_class=RutaJSON, dependencies=[Depends(verificar_admin)]
+)
+
+
+@router.get("/perfiles")
+def listar_perfiles():
+    """
+    Perfiles guardados en este worker (el más reciente primero) y la configuración del perfilador.
+    """
+    return {"perfilador": perfilador.stats(), "perfiles": perfilador.listar()}
+
+
+@router.get("/perfiles/{perfil_id}")
+def descargar_perfil(perfil_id: int, formato: str = Query("html", pattern="^(" + "|".join(FORMATOS) + ")$")):
+    """
+    Descarga un perfil: html (pyinstrument), texto, speedscope (speedscope.app) o pstats (cProfile).
+    """
+    perfil = perfilador.obtener(perfil_id)
+    if perfil is None:
+        raise HTTPException(404, "Perfil no encontrado (el ring buffer es por worker y descarta los viejos)")
+    try:
+        contenido, media_type = perfil.render(formato)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    extension = {"html": "html", "texto": "txt", "speedscope": "json", "pstats": "prof"}[formato]
+    return Response(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="perfil-{perfil_id}.{extension}"'},
+    )
+
+
+@router.delete("/perfiles")
+def borrar_perfiles():
+    return {"borrados": perfilador.limpiar()}
+
+
+@router.get("/lentas")
+def operaciones_lentas(
+    limite: int = Query(50, ge=1, le=1000),
+    backend: Optional[str] = Query(None, pattern="^(mongo|neo4j)$"),
+    endpoint: Optional[str] = None,
+    agrupado: bool = False,
+):
+    """
+    Operaciones de Mongo/Neo4j que superaron LENTAS_UMBRAL_MS (la más reciente primero),
+    o agrupadas por forma con `agrupado=true`.
+    """
+    r = conectar_redis()
+    if r is None:
+        raise HTTPException(500, "Redis no disponible")
+    ops = leer(r, limite, backend, endpoint)
+    return agrupar(ops) if agrupado else ops
@@ -4,8 +4,10 @@ from typing import Optional, List
 from datetime import datetime
 
 from app.services.conexion_nosql import conectar_mongo
+from app.utils.campos import parsear_campos, proyeccion, query_fields
+from app.utils.encoder import RutaJSON
 
-router = APIRouter(prefix="/cursos", tags=["cursos"])
+router = APIRouter(prefix="/cursos", tags=["cursos"], route_class=RutaJSON)
 
 
 class CursoIn(BaseModel):
@@ -44,21 +46,21 @@ def crear_curso(c: CursoIn):
 
 
 @router.get("")
-def listar_cursos():
+def listar_cursos(fields: Optional[str] = query_fields()):
     db = conectar_mongo()
     if db is None:
         raise HTTPException(500, "Mongo no disponible")
 
-    cur = db.cursos.find({}, {"_id": 0})
+    cur = db.cursos.find({}, proyeccion(parsear_campos(fields)) or {"_id": 0})
     return {"cursos": list(cur)}
 
 
 @router.get("/{titulo}")
-def detalle_curso(titulo: str):
+def detalle_curso(titulo: str, fields: Optional[str] = query_fields()):
     db = conectar_mongo()
     if db is None:
         raise HTTPException(500, "Mongo no disponible")
-    c = db.cursos.find_one({"titulo": titulo}, {"_id": 0})
+    c = db.cursos.find_one({"titulo": titulo}, proyeccion(parsear_campos(fields)) or {"_id": 0})
     if not c:
         raise HTTPException(404, "Curso no encontrado")
     return {"curso": c}
\ No newline at end of file
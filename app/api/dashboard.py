@@ -1,9 +1,17 @@
 from fastapi import APIRouter, HTTPException
-from typing import List
+from typing import List, Optional
+from bson import ObjectId
 
-from app.services.conexion_nosql import conectar_mongo
+from app.services.conexion_async import conectar_mongo_async, conectar_redis_async
+from app.services.ofertas import lookup_empresa
+from app.services.indice_ofertas import top_ofertas_por_skills
+from app.services.candidatos import buscar_candidato_async
+from app.utils.campos import parsear_campos, proyeccion_salida, query_fields, recortar
+from app.utils.encoder import RutaJSON
 
-router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+TOP_POSICIONES = 50
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"], route_class=RutaJSON)
 
 def normalize_skills(skill_list):
     out = []
@@ -11,7 +19,8 @@ def normalize_skills(skill_list):
         if isinstance(s, str):
             out.append(s.strip().lower())
         elif isinstance(s, dict):
-            out.append((s.get("nombre") or "").strip().lower())
+            # skills de candidatos usan "nombre"; requerimientos de ofertas, "habilidad"
+            out.append((s.get("nombre") or s.get("habilidad") or "").strip().lower())
     return out
 
 def parse_exp(val):
@@ -20,18 +29,43 @@ def parse_exp(val):
     except Exception:
         return 0
 
+# Campos de salida -> campos del candidato en Mongo que necesita (para ?fields=)
+CAMPOS_PERFIL = {
+    "usuario": [],
+    "skills": ["habilidades.tecnicas"],
+    "capacitaciones": ["capacitaciones"],
+    "sugerencias_capacitacion": [],
+    "experiencia": ["experiencia_laboral"],
+    "historial": [],
+}
+CAMPOS_POSICION_RECOMENDADA = {
+    "titulo": ["puesto"],
+    "empresa": ["empresa_nombre"],  # $lookup solo si se pide
+    "skills_requeridos": [],
+    "estudios_requeridos": ["estudios_requeridos"],
+    "experiencia_minima": [],
+    "coincidencias": [],
+    "match": [],
+    "faltantes": [],
+    "sugerencias": [],
+}
+
+
 @router.get("/user/{nombre}")
-def get_user_profile(nombre: str):
+async def get_user_profile(nombre: str, fields: Optional[str] = query_fields()):
     """
     Perfil + recomendaciones resumidas (para panel izquierdo).
+    Solo se traen de Mongo los campos del candidato que usa el panel (o los pedidos en ?fields=).
     """
-    db = conectar_mongo()
+    db = conectar_mongo_async()
     if db is None:
         raise HTTPException(500, "Conexión Mongo no disponible")
 
+    campos = parsear_campos(fields)
+    proy = proyeccion_salida(campos or list(CAMPOS_PERFIL), CAMPOS_PERFIL)
+
     nombre = nombre.strip().lower()
-    users = db.candidatos
-    user = users.find_one({"informacion_personal.nombre_apellido": nombre})
+    user = await buscar_candidato_async(db, nombre, proy)
     if not user:
         return {"error": "Usuario no encontrado"}
 
@@ -44,44 +78,62 @@ def get_user_profile(nombre: str):
     sugerencias = []
     # (si querés, cargamos desde ofertas los skills más frecuentes)
 
-    return {
+    return recortar({
         "usuario": nombre,
         "skills": list(set(user_skills)),
         "capacitaciones": caps,
         "sugerencias_capacitacion": sugerencias,
         "experiencia": user.get("experiencia_laboral", []),
         "historial": []  # si querés podés sumar versiones o evento aquí
-    }
+    }, campos)
 
 @router.get("/user/{nombre}/positions")
-def match_positions(nombre: str):
+async def match_positions(nombre: str, fields: Optional[str] = query_fields()):
     """
     Devuelve posiciones recomendadas para un usuario (ordenadas por coincidencias).
-    - Cruza skills del usuario vs requerimientos de las ofertas
+    - Usa el índice invertido skill -> ofertas abiertas de Redis: solo se consideran
+      ofertas que comparten al menos una skill, sobre todo el catálogo (top-K en Redis)
     - Chequea estudios y experiencia mínima si están presentes en la oferta
+    - ?fields= recorta cada posición (y evita el $lookup de empresa si no se pide)
     """
-    db = conectar_mongo()
-    if db is None:
-        raise HTTPException(500, "Conexión Mongo no disponible")
+    db = conectar_mongo_async()
+    r = conectar_redis_async()
+    if db is None or r is None:
+        raise HTTPException(500, "Conexiones no disponibles")
+
+    campos = parsear_campos(fields)
+    # requerimientos y experiencia siempre: se usan para calcular el match y ordenar
+    proy = proyeccion_salida(
+        campos or list(CAMPOS_POSICION_RECOMENDADA), CAMPOS_POSICION_RECOMENDADA,
+        siempre=("requerimientos", "experiencia_requerida"),
+    )
 
     nombre = nombre.strip().lower()
-    users = db.candidatos
-    user = users.find_one({"informacion_personal.nombre_apellido": nombre})
+    user = await buscar_candidato_async(db, nombre, {"habilidades.tecnicas": 1, "capacitaciones": 1})
     if not user:
         return {"error": "Usuario no encontrado"}
 
     user_skills = normalize_skills(user.get("habilidades", {}).get("tecnicas", []))
     caps = [c.strip().lower() for c in user.get("capacitaciones", [])]
+
+    # Top-K ofertas por coincidencias y luego solo esas K desde Mongo,
+    # con el nombre de la empresa resuelto con $lookup (un solo round trip)
+    top = await top_ofertas_por_skills(r, user_skills, TOP_POSICIONES)
+    ranking = {oid: i for i, (oid, _score) in enumerate(top)}
+    ofertas = await db.ofertas.aggregate([
+        {"$match": {"_id": {"$in": [ObjectId(oid) for oid in ranking]}}},
+        *(lookup_empresa("empresa_nombre") if "empresa_nombre" in proy else []),
+        {"$project": proy},
+    ]).to_list(length=None)
+    ofertas.sort(key=lambda o: ranking[str(o["_id"])])
     # experiencia del user (opcional): parsear desde su doc
     # acá simplificamos: si tu estructura tiene años de exp, parsealo a int
     user_exp = 0
 
-    ofertas = list(db.ofertas.find({}).limit(200))
     matched = []
 
     for pos in ofertas:
         pos_titulo = pos.get("puesto", "")
-        empresa = db.empresas.find_one({"_id": pos.get("empresa_id")}, {"nombre": 1}) or {}
         pos_req_skills = normalize_skills(pos.get("requerimientos", []))
         exp_req = parse_exp(pos.get("experiencia_requerida"))
         est_req = (pos.get("estudios_requeridos") or "").strip().lower()
@@ -99,7 +151,7 @@ def match_positions(nombre: str):
         if coincidencias > 0 or estudios_match or exp_match:
             matched.append({
                 "titulo": pos_titulo,
-                "empresa": empresa.get("nombre", ""),
+                "empresa": pos.get("empresa_nombre", ""),
                 "skills_requeridos": ", ".join(pos_req_skills),
                 "estudios_requeridos": est_req or "",
                 "experiencia_minima": pos.get("experiencia_requerida", ""),
@@ -113,5 +165,5 @@ def match_positions(nombre: str):
     matched = sorted(matched, key=lambda x: (x["coincidencias"]), reverse=True)
     return {
         "usuario": nombre,
-        "posiciones_recomendadas": matched[:50]
+        "posiciones_recomendadas": [recortar(m, campos) for m in matched[:TOP_POSICIONES]]
     }
\ No newline at end of file
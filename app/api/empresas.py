@@ -4,8 +4,10 @@ from datetime import datetime
 from typing import Optional
 
 from app.services.conexion_nosql import conectar_mongo
+from app.utils.campos import parsear_campos, proyeccion, proyeccion_salida, query_fields, recortar
+from app.utils.encoder import RutaJSON
 
-router = APIRouter(prefix="/empresas", tags=["empresas"])
+router = APIRouter(prefix="/empresas", tags=["empresas"], route_class=RutaJSON)
 
 
 # =========================
@@ -57,11 +59,12 @@ def create_company(e: EmpresaIn):
 # Listar empresas
 # =========================
 @router.get("")
-def list_companies():
+def list_companies(fields: Optional[str] = query_fields()):
     db = conectar_mongo()
     if db is None:
         raise HTTPException(500, "Conexión Mongo no disponible")
-    cur = db.empresas.find({}, {"_id": 0, "nombre": 1, "industria": 1})
+    proy = proyeccion(parsear_campos(fields)) or {"_id": 0, "nombre": 1, "industria": 1}
+    cur = db.empresas.find({}, proy)
     return {"empresas": list(cur)}
 
 
@@ -69,12 +72,12 @@ def list_companies():
 # Detalle de empresa
 # =========================
 @router.get("/{nombre}")
-def get_company(nombre: str):
+def get_company(nombre: str, fields: Optional[str] = query_fields()):
     db = conectar_mongo()
     if db is None:
         raise HTTPException(500, "Conexión Mongo no disponible")
 
-    empresa = db.empresas.find_one({"nombre": nombre}, {"_id": 0})
+    empresa = db.empresas.find_one({"nombre": nombre}, proyeccion(parsear_campos(fields)) or {"_id": 0})
     if not empresa:
         raise HTTPException(404, "Empresa no encontrada")
     return {"empresa": empresa}
@@ -83,17 +86,36 @@ def get_company(nombre: str):
 # =========================
 # Posiciones por empresa
 # =========================
+# Campos de salida de cada oferta -> campos de Mongo que necesita
+CAMPOS_OFERTA_EMPRESA = {
+    "puesto": ["puesto"],
+    "descripcion": ["descripcion"],
+    "skills_requeridos": ["requerimientos.habilidad"],
+    "modalidad": ["modalidad"],
+    "ubicacion": ["ubicacion"],
+    "estado": ["estado"],
+    "experiencia_minima": ["experiencia_requerida"],
+    "estudios_requeridos": ["estudios_requeridos"],
+    "fecha_creacion": ["fecha_creacion"],
+}
+
+
 @router.get("/{nombre}/positions")
-def list_positions_by_company(nombre: str, estado: Optional[str] = None):
+def list_positions_by_company(
+    nombre: str, estado: Optional[str] = None, fields: Optional[str] = query_fields()
+):
     """
     Devuelve las posiciones/ofertas de una empresa, con resumen para el dashboard.
-    Permite filtrar opcionalmente por estado (?estado=abierta).
+    Permite filtrar opcionalmente por estado (?estado=abierta) y elegir campos (?fields=puesto,estado).
     """
     db = conectar_mongo()
     if db is None:
         raise HTTPException(500, "Conexión Mongo no disponible")
 
-    emp = db.empresas.find_one({"nombre": nombre})
+    campos = parsear_campos(fields)
+    proy = proyeccion_salida(campos, CAMPOS_OFERTA_EMPRESA)
+
+    emp = db.empresas.find_one({"nombre": nombre}, {"_id": 1})
     if not emp:
         raise HTTPException(404, "Empresa no encontrada")
 
@@ -103,7 +125,7 @@ def list_positions_by_company(nombre: str, estado: Optional[str] = None):
 
     cur = db.ofertas.find(
         filtro,
-        {
+        {**proy, "_id": 0} if proy else {
             "_id": 0,
             "puesto": 1,
             "descripcion": 1,
@@ -121,7 +143,7 @@ def list_positions_by_company(nombre: str, estado: Optional[str] = None):
     for o in cur:
         reqs = o.get("requerimientos", [])
         req_str = ", ".join([(r.get("habilidad") or "").strip().lower() for r in reqs])
-        ofertas.append({
+        ofertas.append(recortar({
             "puesto": o.get("puesto", ""),
             "descripcion": o.get("descripcion", ""),
             "skills_requeridos": req_str,
@@ -131,6 +153,6 @@ def list_positions_by_company(nombre: str, estado: Optional[str] = None):
             "experiencia_minima": o.get("experiencia_requerida", "") or "",
             "estudios_requeridos": o.get("estudios_requeridos", "") or "",
             "fecha_creacion": o.get("fecha_creacion"),
-        })
+        }, campos))
 
     return {"empresa": nombre, "ofertas": ofertas}
\ No newline at end of file
@@ -0,0 +1,193 @@
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.conexion_async import conectar_mongo_async, conectar_redis_async
+from app.services.candidatos import COLACION_NOMBRE, filtro_nombres
+from app.utils.campos import parsear_campos, proyeccion, query_fields
+from app.utils.encoder import RutaJSON, dumps
+
+router = APIRouter(prefix="/export", tags=["export"], route_class=RutaJSON)
+
+# Exportaciones en NDJSON (un documento JSON por línea), generadas a medida que se leen:
+# cursores de Mongo con batch_size acotado e iteradores SSCAN / rangos de ZSET en Redis.
+# La memoria del worker queda acotada por el lote, no por el tamaño del resultado,
+# y el cliente empieza a recibir filas con el primer lote.
+NDJSON = "application/x-ndjson"
+TTL_FOTO_SECONDS = 600  # copia del ZSET que se exporta; se renueva por lote y se borra al terminar
+
+
+def _query_batch():
+    return Query(500, ge=1, le=10_000, description="Documentos por lote leídos de Mongo/Redis")
+
+
+def _ndjson(filas: AsyncIterator[Dict]) -> StreamingResponse:
+    async def generar():
+        try:
+            async for fila in filas:
+                yield dumps(fila) + b"\n"
+        except Exception as e:
+            # El status 200 ya se envió: se corta el stream y queda en el log
+            print("ERROR exportando NDJSON:", repr(e))
+            raise
+    return StreamingResponse(generar(), media_type=NDJSON)
+
+
+async def _perfiles_por_lote(db, nombres: List[str], proy: Optional[Dict]) -> AsyncIterator[Dict]:
+    cur = db.candidatos.find(
+        filtro_nombres(nombres), proy or {"_id": 0}, collation=COLACION_NOMBRE
+    ).batch_size(len(nombres))
+    async for doc in cur:
+        yield doc
+
+
+# ----------------------------
+# Candidatos (todos o por intersección de skills)
+# ----------------------------
+@router.get("/candidatos")
+async def export_candidatos(
+    skills: Optional[List[str]] = Query(None, description="Solo candidatos con TODAS estas skills"),
+    fields: Optional[str] = query_fields(),
+    batch: int = _query_batch(),
+):
+    """
+    Candidatos en NDJSON. Sin skills recorre la colección con un cursor; con skills recorre con
+    SSCAN el set skill:{s}:users más chico, filtra por lote contra los demás (SMISMEMBER) y
+    trae los perfiles de ese lote de Mongo.
+    """
+    db = conectar_mongo_async()
+    if db is None:
+        raise HTTPException(500, "Conexión Mongo no disponible")
+    proy = proyeccion(parsear_campos(fields))
+    skills_norm = sorted({s.strip().lower() for s in (skills or []) if s.strip()})
+
+    if not skills_norm:
+        async def filas():
+            async for doc in db.candidatos.find({}, proy or {"_id": 0}).batch_size(batch):
+                yield doc
+        return _ndjson(filas())
+
+    r = conectar_redis_async()
+    if r is None:
+        raise HTTPException(500, "Redis no disponible")
+    keys = [f"skill:{s}:users" for s in skills_norm]
+    pipe = r.pipeline(transaction=False)
+    for k in keys:
+        pipe.scard(k)
+    tamanios = await pipe.execute()
+    base, *resto = [k for _n, k in sorted(zip(tamanios, keys))]
+
+    async def filas():
+        lote: List[str] = []
+
+        async def vaciar():
+            nombres = lote
+            if resto:
+                pipe = r.pipeline(transaction=False)
+                for k in resto:
+                    pipe.smismember(k, nombres)
+                miembros = await pipe.execute()
+                nombres = [n for i, n in enumerate(nombres) if all(m[i] for m in miembros)]
+            if nombres:
+                async for doc in _perfiles_por_lote(db, nombres, proy):
+                    yield doc
+
+        async for nombre in r.sscan_iter(base, count=batch):
+            lote.append(nombre)
+            if len(lote) >= batch:
+                async for doc in vaciar():
+                    yield doc
+                lote = []
+        if lote:
+            async for doc in vaciar():
+                yield doc
+
+    return _ndjson(filas())
+
+
+# ----------------------------
+# Ofertas
+# ----------------------------
+@router.get("/ofertas")
+async def export_ofertas(
+    empresa: Optional[str] = Query(None, description="Nombre de la empresa"),
+    estado: Optional[str] = Query(None),
+    fields: Optional[str] = query_fields(),
+    batch: int = _query_batch(),
+):
+    """
+    Ofertas en NDJSON, de la más nueva a la más vieja (mismos índices que /posiciones).
+    """
+    db = conectar_mongo_async()
+    if db is None:
+        raise HTTPException(500, "Conexión Mongo no disponible")
+    filtro = {}
+    if empresa:
+        emp = await db.empresas.find_one({"nombre": empresa}, {"_id": 1})
+        if not emp:
+            raise HTTPException(404, "Empresa no encontrada")
+        filtro["empresa_id"] = emp["_id"]
+    if estado:
+        filtro["estado"] = estado
+    proy = proyeccion(parsear_campos(fields), excluir_id=False)
+
+    async def filas():
+        cur = db.ofertas.find(filtro, proy).sort([("fecha_creacion", -1), ("_id", -1)]).batch_size(batch)
+        async for doc in cur:
+            yield doc
+
+    return _ndjson(filas())
+
+
+# ----------------------------
+# Recomendaciones cacheadas de una oferta
+# ----------------------------
+@router.get("/recomendaciones/{oferta_id}")
+async def export_recomendaciones(oferta_id: str, batch: int = _query_batch()):
+    """
+    El ZSET cache:match:{oferta_id} en NDJSON, de mayor a menor score, de a `batch` miembros
+    (ZRANGE por rango de posiciones: ordenado y sin cargar el ZSET entero), con el perfil
+    de cada candidato. 404 si no hay recomendaciones cacheadas (usar /offers/{id}/recompute).
+    Se exporta una copia del ZSET tomada al empezar (ZUNIONSTORE en una clave temporal): un
+    recompute o un ZADD incremental durante el stream mueve posiciones en el original y paginar
+    sobre él duplicaría u omitiría candidatos.
+    """
+    db = conectar_mongo_async()
+    r = conectar_redis_async()
+    if db is None or r is None:
+        raise HTTPException(500, "Conexiones no disponibles")
+    zkey = f"cache:match:{oferta_id}"
+    foto = f"tmp:export:{oferta_id}:{uuid.uuid4().hex[:8]}"
+    pipe = r.pipeline(transaction=True)
+    pipe.zunionstore(foto, [zkey])
+    pipe.expire(foto, TTL_FOTO_SECONDS)
+    total, _ = await pipe.execute()
+    if not total:
+        raise HTTPException(404, f"Sin recomendaciones cacheadas para '{oferta_id}'")
+
+    proy = {
+        "_id": 0,
+        "informacion_personal.nombre_apellido": 1,
+        "informacion_personal.email": 1,
+        "estado": 1,
+        "habilidades.tecnicas": 1,
+    }
+
+    async def filas():
+        try:
+            for inicio in range(0, total, batch):
+                pipe = r.pipeline(transaction=False)
+                pipe.zrange(foto, inicio, inicio + batch - 1, desc=True, withscores=True)
+                pipe.expire(foto, TTL_FOTO_SECONDS)
+                pagina, _ = await pipe.execute()
+                perfiles = {}
+                async for doc in _perfiles_por_lote(db, [n for n, _s in pagina], proy):
+                    perfiles[doc["informacion_personal"]["nombre_apellido"].lower()] = doc
+                for nombre, score in pagina:
+                    yield {"candidato": nombre, "score": score, "perfil": perfiles.get(nombre.lower())}
+        finally:
+            await r.delete(foto)
+
+    return _ndjson(filas())
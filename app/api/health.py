@@ -0,0 +1,49 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.conexion_nosql import gestor
+from app.services.conexion_async import salud_async, stats_async
+from app.services.escritor_grafo import escritor_grafo
+from app.services.cache_perfiles import cache_perfiles
+from app.utils.encoder import MongoJSONResponse, RutaJSON
+
+router = APIRouter(prefix="/health", tags=["health"], route_class=RutaJSON)
+
+
+@router.get("")
+async def health():
+    """
+    Health probe: ping a Mongo, Neo4j y Redis (clientes sync y async) de este worker.
+    Responde 503 si algún backend no está disponible.
+    """
+    backends = await run_in_threadpool(gestor.salud)
+    backends.update(await salud_async())
+    ok = all(b["ok"] for b in backends.values())
+    return MongoJSONResponse(
+        status_code=200 if ok else 503,
+        content={"ok": ok, "backends": backends},
+    )
+
+
+@router.get("/pools")
+def pool_stats():
+    """
+    Utilización de los pools de conexiones de este worker (para dimensionarlos).
+    """
+    return {**gestor.stats(), **stats_async()}
+
+
+@router.get("/grafo")
+def grafo_stats():
+    """
+    Estado del escritor de Neo4j en segundo plano: mutaciones en cola, lag, lotes y fallos.
+    """
+    return escritor_grafo.stats()
+
+
+@router.get("/cache")
+def cache_stats():
+    """
+    Aciertos / fallos por nivel del cache de perfiles (LRU local, Redis, Mongo) de este worker.
+    """
+    return cache_perfiles.stats()
@@ -1,16 +1,22 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 from typing import Optional
 from datetime import datetime
 
 from app.services.conexion_nosql import (
     conectar_mongo,
-    conectar_neo4j,
     conectar_redis,
 )
 from app.services.versiones import log_version, get_candidato_id_by_nombre
+from app.services.funciones import actualizar_score_candidato
+from app.services.escritor_grafo import escritor_grafo
+from app.services.candidatos import buscar_candidato
+from app.services.cache_perfiles import invalidar_perfil
+from app.services.indice_usuarios import indexar_usuario
+from app.utils.encoder import RutaJSON
 
-router = APIRouter(prefix="/inscripciones", tags=["inscripciones"])
+router = APIRouter(prefix="/inscripciones", tags=["inscripciones"], route_class=RutaJSON)
 
 
 class InscripcionIn(BaseModel):
@@ -40,7 +46,7 @@ def inscribirse(inf: InscripcionIn):
     user = (inf.usuario or "").strip().lower()
     curso = (inf.curso or "").strip()
 
-    cand = db.candidatos.find_one({"informacion_personal.nombre_apellido": user})
+    cand = buscar_candidato(db, user)
     if not cand:
         raise HTTPException(404, f"Usuario '{user}' no encontrado")
 
@@ -81,6 +87,7 @@ def actualizar_progreso(p: ProgresoIn):
       - marca fecha_fin en Mongo
       - si sumar_skill y el curso tiene skill_asociada, agrega la skill al usuario (Mongo)
       - agrega el usuario al índice Redis skill:{skill}:users
+      - actualiza su score en las recomendaciones cacheadas (cache:match:*) de sus ofertas
       - refleja en Neo4j: (Usuario)-[:REALIZO]->(Curso) y (Usuario)-[:TIENE]->(Skill)
       - registra versión en versiones_perfil
     """
@@ -92,7 +99,7 @@ def actualizar_progreso(p: ProgresoIn):
     user = (p.usuario or "").strip().lower()
     curso = (p.curso or "").strip()
 
-    cand = db.candidatos.find_one({"informacion_personal.nombre_apellido": user})
+    cand = buscar_candidato(db, user)
     if not cand:
         raise HTTPException(404, "Usuario no encontrado")
 
@@ -119,15 +126,21 @@ def actualizar_progreso(p: ProgresoIn):
     added_skill = None
     if p.completar and p.sumar_skill and (c.get("skill_asociada")):
         skill = c["skill_asociada"].strip().lower()
-        db.candidatos.update_one(
+        perfil = db.candidatos.find_one_and_update(
             {"_id": cand["_id"]},
-            {"$addToSet": {"habilidades.tecnicas": {"nombre": skill, "nivel": 5}}}
+            {"$addToSet": {"habilidades.tecnicas": {"nombre": skill, "nivel": 5}}},
+            projection={"informacion_personal.nombre_apellido": 1, "habilidades.tecnicas": 1},
+            return_document=ReturnDocument.AFTER,
         )
         added_skill = skill
 
-        # Redis: índice skill:{skill}:users
+        # Redis: índice skill:{skill}:users, perfil cacheado y score incremental en cache:match:*
         if r is not None:
-            r.sadd(f"skill:{added_skill}:users", user)
+            pipe = r.pipeline(transaction=False)
+            indexar_usuario(pipe, user, [added_skill])
+            invalidar_perfil(pipe, user)
+            pipe.execute()
+            actualizar_score_candidato(r, perfil)
 
     # Versión (historial)
     diff = {"curso": curso, "progreso": upd["progreso"], "nota": upd["nota"]}
@@ -143,29 +156,12 @@ def actualizar_progreso(p: ProgresoIn):
         diff=diff
     )
 
-    # Neo4j: reflejar (Usuario)-[:REALIZO]->(Curso) al completar
+    # Neo4j: reflejar (Usuario)-[:REALIZO]->(Curso) al completar (write-behind)
     if p.completar:
-        graph = conectar_neo4j()
-        if graph is not None:
-            # MERGE Usuario y Curso
-            graph.run(
-                """
-                MERGE (u:Usuario {nombre:$user})
-                MERGE (c:Curso {titulo:$curso})
-                MERGE (u)-[:REALIZO]->(c)
-                """,
-                user=user, curso=curso
-            )
-            # MERGE skill en Neo4j si fue agregada
-            if added_skill:
-                graph.run(
-                    """
-                    MERGE (u:Usuario {nombre:$user})
-                    MERGE (s:Skill {nombre:$skill})
-                    MERGE (u)-[:TIENE]->(s)
-                    """,
-                    user=user, skill=added_skill
-                )
+        escritor_grafo.encolar("curso", nombre=user, curso=curso)
+        # MERGE skill en Neo4j si fue agregada
+        if added_skill:
+            escritor_grafo.encolar("skill", nombre=user, skill=added_skill)
 
     return {
         "ok": True,
@@ -189,7 +185,7 @@ def cursos_de_usuario(nombre: str):
         raise HTTPException(500, "Mongo no disponible")
 
     nombre = (nombre or "").strip().lower()
-    cand = db.candidatos.find_one({"informacion_personal.nombre_apellido": nombre})
+    cand = buscar_candidato(db, nombre)
     if not cand:
         raise HTTPException(404, "Usuario no encontrado")
 
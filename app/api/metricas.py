@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response
+
+from app.services.metricas import CONTENT_TYPE, exponer
+
+router = APIRouter(tags=["metricas"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Métricas de Prometheus: latencia por endpoint y por backend, aciertos de cache, recomputes.
+    """
+    return Response(exponer(), media_type=CONTENT_TYPE)
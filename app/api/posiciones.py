@@ -4,9 +4,14 @@ from typing import Optional, List
 from bson import ObjectId
 from datetime import datetime
 
-from app.services.conexion_nosql import conectar_mongo
+from app.services.conexion_nosql import conectar_mongo, conectar_redis
+from app.services.conexion_async import conectar_mongo_async
+from app.services.ofertas import codificar_cursor, decodificar_cursor, lookup_empresa
+from app.services.indice_ofertas import indexar_oferta, desindexar_oferta
+from app.utils.campos import parsear_campos, proyeccion_salida, query_fields, recortar
+from app.utils.encoder import RutaJSON
 
-router = APIRouter(prefix="/posiciones", tags=["posiciones"])
+router = APIRouter(prefix="/posiciones", tags=["posiciones"], route_class=RutaJSON)
 
 
 # ----------------------------
@@ -27,6 +32,8 @@ class PositionIn(BaseModel):
     estado: Optional[str] = "abierta"
     experiencia_requerida: Optional[str] = None   # string "1", "2", etc
     estudios_requeridos: Optional[str] = None     # ej. "universitario"
+    cache_ttl_soft: Optional[int] = None   # segundos hasta que las recomendaciones se refrescan en segundo plano
+    cache_ttl_hard: Optional[int] = None   # segundos hasta que se descartan
 
 
 class PositionUpdate(BaseModel):
@@ -38,6 +45,8 @@ class PositionUpdate(BaseModel):
     estado: Optional[str] = None
     experiencia_requerida: Optional[str] = None
     estudios_requeridos: Optional[str] = None
+    cache_ttl_soft: Optional[int] = None
+    cache_ttl_hard: Optional[int] = None
 
 
 def to_object_id(id_str: str) -> ObjectId:
@@ -80,40 +89,87 @@ def create_position(p: PositionIn):
         # extras opcionales para dashboard:
         "experiencia_requerida": p.experiencia_requerida or None,
         "estudios_requeridos": p.estudios_requeridos or None,
+        # staleness de la cache de recomendaciones (None = defaults de funciones.py)
+        "cache_ttl_soft": p.cache_ttl_soft,
+        "cache_ttl_hard": p.cache_ttl_hard,
     }
     ins = db.ofertas.insert_one(doc)
+
+    # Redis: índice invertido skill -> ofertas abiertas
+    r = conectar_redis()
+    if r is not None:
+        indexar_oferta(r, str(ins.inserted_id), reqs, doc["estado"])
+
     return {"ok": True, "oferta_id": str(ins.inserted_id), "puesto": p.puesto}
 
 
+# Campos de salida de una posición -> campos de Mongo que necesita (para ?fields=)
+CAMPOS_POSICION = {
+    "id": ["_id"],
+    "empresa": ["empresa_nombre"],  # resuelto con $lookup en el listado
+    "puesto": ["puesto"],
+    "descripcion": ["descripcion"],
+    "requerimientos": ["requerimientos"],
+    "estado": ["estado"],
+    "modalidad": ["modalidad"],
+    "ubicacion": ["ubicacion"],
+    "experiencia_requerida": ["experiencia_requerida"],
+    "estudios_requeridos": ["estudios_requeridos"],
+    "fecha_creacion": ["fecha_creacion"],
+}
+
+
 # ----------------------------
 # Listar posiciones (con filtros opcionales)
 # ----------------------------
 @router.get("")
-def list_positions(
+async def list_positions(
     empresa: Optional[str] = Query(None),
     estado: Optional[str] = Query(None),
     puesto: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    next: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    fields: Optional[str] = query_fields(),
 ):
-    db = conectar_mongo()
+    """
+    Lista posiciones de la más nueva a la más vieja, paginadas por keyset sobre
+    (fecha_creacion, _id): cada página es un rango de índice, no un skip, así que
+    la latencia no crece con el tamaño de la colección.
+    Con ?fields= solo se proyectan esos campos (y el $lookup de empresa solo si se pide "empresa").
+    """
+    db = conectar_mongo_async()
     if db is None:
         raise HTTPException(500, "Conexión Mongo no disponible")
 
+    campos = parsear_campos(fields)
+    # _id y fecha_creacion siempre: arman el cursor de la página siguiente
+    proy = proyeccion_salida(campos, CAMPOS_POSICION, siempre=("_id", "fecha_creacion"))
+
     filtro = {}
     if empresa:
-        emp = db.empresas.find_one({"nombre": empresa}, {"_id": 1})
+        emp = await db.empresas.find_one({"nombre": empresa}, {"_id": 1})
         if not emp:
-            return {"positions": []}
+            return {"positions": [], "next": None}
         filtro["empresa_id"] = emp["_id"]
     if estado:
         filtro["estado"] = estado
     if puesto:
         filtro["puesto"] = {"$regex": puesto, "$options": "i"}
-
-    cur = db.ofertas.find(
-        filtro,
-        {
+    if next:
+        try:
+            filtro = {"$and": [filtro, decodificar_cursor(next)]} if filtro else decodificar_cursor(next)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+    # Filtro + orden + límite sobre índice, y el nombre de la empresa en el mismo pipeline
+    ofertas = await db.ofertas.aggregate([
+        {"$match": filtro},
+        {"$sort": {"fecha_creacion": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        *(lookup_empresa("empresa_nombre") if not campos or "empresa" in campos else []),
+        {"$project": proy or {
             "_id": 1,
-            "empresa_id": 1,
+            "empresa_nombre": 1,
             "puesto": 1,
             "descripcion": 1,
             "requerimientos": 1,
@@ -123,15 +179,18 @@ def list_positions(
             "fecha_creacion": 1,
             "experiencia_requerida": 1,
             "estudios_requeridos": 1,
-        }
-    ).sort("fecha_creacion", -1)
+        }},
+    ]).to_list(length=None)
+
+    # Pedimos uno de más para saber si hay página siguiente
+    hay_mas = len(ofertas) > limit
+    ofertas = ofertas[:limit]
 
     result = []
-    for o in cur:
-        empresa_doc = db.empresas.find_one({"_id": o["empresa_id"]}, {"nombre": 1}) or {}
-        result.append({
+    for o in ofertas:
+        result.append(recortar({
             "id": str(o["_id"]),
-            "empresa": empresa_doc.get("nombre", ""),
+            "empresa": o.get("empresa_nombre", ""),
             "puesto": o.get("puesto", ""),
             "descripcion": o.get("descripcion", ""),
             "requerimientos": o.get("requerimientos", []),
@@ -141,27 +200,37 @@ def list_positions(
             "experiencia_requerida": o.get("experiencia_requerida", ""),
             "estudios_requeridos": o.get("estudios_requeridos", ""),
             "fecha_creacion": o.get("fecha_creacion"),
-        })
+        }, campos))
 
-    return {"positions": result}
+    ultima = ofertas[-1] if (hay_mas and ofertas) else None
+    return {
+        "positions": result,
+        "next": codificar_cursor(ultima.get("fecha_creacion"), ultima["_id"]) if ultima else None,
+    }
 
 
 # ----------------------------
 # Detalle de posición por ID
 # ----------------------------
 @router.get("/{id}")
-def get_position(id: str):
+def get_position(id: str, fields: Optional[str] = query_fields()):
     db = conectar_mongo()
     if db is None:
         raise HTTPException(500, "Conexión Mongo no disponible")
 
+    campos = parsear_campos(fields)
+    # En el detalle la empresa se resuelve aparte, a partir de empresa_id
+    proy = proyeccion_salida(campos, {**CAMPOS_POSICION, "empresa": ["empresa_id"]})
+
     _id = to_object_id(id)
-    o = db.ofertas.find_one({"_id": _id})
+    o = db.ofertas.find_one({"_id": _id}, proy)
     if not o:
         raise HTTPException(404, "Posición no encontrada")
 
-    empresa_doc = db.empresas.find_one({"_id": o["empresa_id"]}, {"nombre": 1}) or {}
-    return {
+    empresa_doc = {}
+    if "empresa_id" in o:
+        empresa_doc = db.empresas.find_one({"_id": o["empresa_id"]}, {"nombre": 1}) or {}
+    return recortar({
         "id": str(o["_id"]),
         "empresa": empresa_doc.get("nombre", ""),
         "puesto": o.get("puesto", ""),
@@ -173,7 +242,7 @@ def get_position(id: str):
         "experiencia_requerida": o.get("experiencia_requerida", ""),
         "estudios_requeridos": o.get("estudios_requeridos", ""),
         "fecha_creacion": o.get("fecha_creacion"),
-    }
+    }, campos)
 
 
 # ----------------------------
@@ -209,11 +278,23 @@ def update_position(id: str, data: PositionUpdate):
         set_doc["experiencia_requerida"] = data.experiencia_requerida.strip() if data.experiencia_requerida else None
     if data.estudios_requeridos is not None:
         set_doc["estudios_requeridos"] = data.estudios_requeridos.strip() if data.estudios_requeridos else None
+    if data.cache_ttl_soft is not None:
+        set_doc["cache_ttl_soft"] = data.cache_ttl_soft or None
+    if data.cache_ttl_hard is not None:
+        set_doc["cache_ttl_hard"] = data.cache_ttl_hard or None
 
     if not set_doc:
         return {"ok": True, "updated": 0}
 
     res = db.ofertas.update_one({"_id": _id}, {"$set": set_doc})
+
+    # Redis: si cambiaron requerimientos o estado, reindexar con el documento actualizado
+    r = conectar_redis()
+    if r is not None and res.modified_count and ("requerimientos" in set_doc or "estado" in set_doc):
+        o = db.ofertas.find_one({"_id": _id}, {"requerimientos": 1, "estado": 1})
+        if o:
+            indexar_oferta(r, str(_id), o.get("requerimientos"), o.get("estado"))
+
     return {"ok": True, "updated": res.modified_count}
 
 
@@ -228,4 +309,9 @@ def delete_position(id: str):
 
     _id = to_object_id(id)
     res = db.ofertas.delete_one({"_id": _id})
+
+    r = conectar_redis()
+    if r is not None and res.deleted_count:
+        desindexar_oferta(r, str(_id))
+
     return {"ok": True, "deleted": res.deleted_count}
\ No newline at end of file
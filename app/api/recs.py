@@ -1,26 +1,28 @@
 from fastapi import APIRouter, HTTPException
-from app.services.conexion_nosql import (
-    conectar_mongo, conectar_neo4j, conectar_redis,
+from app.services.conexion_nosql import conectar_redis
+from app.services.conexion_async import (
+    conectar_mongo_async, conectar_neo4j_async, conectar_redis_async,
 )
 from app.services.funciones import (
     get_recommendations, recompute_matches, clear_offer_cache,
 )
+from app.utils.encoder import RutaJSON
 
-router = APIRouter(prefix="/offers", tags=["recommendations"])
+router = APIRouter(prefix="/offers", tags=["recommendations"], route_class=RutaJSON)
 
 @router.get("/{oferta_id}/recommendations")
-def recommendations(oferta_id: str):
-    db, graph, r = conectar_mongo(), conectar_neo4j(), conectar_redis()
+async def recommendations(oferta_id: str):
+    db, graph, r = conectar_mongo_async(), conectar_neo4j_async(), conectar_redis_async()
     if any(x is None for x in (db, graph, r)):
         raise HTTPException(500, "Conexiones no disponibles")
-    return get_recommendations(db, graph, r, oferta_id)
+    return await get_recommendations(db, graph, r, oferta_id)
 
 @router.post("/{oferta_id}/recompute")
-def recompute(oferta_id: str):
-    db, graph, r = conectar_mongo(), conectar_neo4j(), conectar_redis()
+async def recompute(oferta_id: str):
+    db, graph, r = conectar_mongo_async(), conectar_neo4j_async(), conectar_redis_async()
     if any(x is None for x in (db, graph, r)):
         raise HTTPException(500, "Conexiones no disponibles")
-    items = recompute_matches(db, graph, r, oferta_id)
+    items = await recompute_matches(db, graph, r, oferta_id)
     return {"count": len(items), "items": items}
 
 @router.delete("/{oferta_id}/cache")
@@ -29,4 +31,4 @@ def invalidate(oferta_id: str):
     if r is None:
         raise HTTPException(500, "Redis no disponible")
     deleted = clear_offer_cache(r, oferta_id)
-    return {"deleted": deleted}
\ No newline at end of file
+    return {"deleted": deleted}
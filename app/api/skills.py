@@ -1,18 +1,32 @@
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Dict, List
 
 from app.services.conexion_nosql import (
     conectar_mongo,
     conectar_redis,
     conectar_neo4j,
 )
-from app.services.versiones import (
-    log_version,
-    get_candidato_id_by_nombre,
+from app.services.conexion_async import (
+    conectar_mongo_async,
+    conectar_redis_async,
 )
+from app.services.versiones import log_version, log_versions
+from app.services.funciones import actualizar_score_candidato, actualizar_scores_candidatos
+from app.services.indice_usuarios import indexar_usuario
+from app.services.cache_perfiles import invalidar_perfil
+from app.services.candidatos import (
+    CAMPO_NOMBRE,
+    COLACION_NOMBRE,
+    filtro_nombre,
+    filtro_nombres,
+    normalizar_nombre,
+)
+from app.utils.encoder import RutaJSON
 
-router = APIRouter(prefix="/skills", tags=["skills"])
+router = APIRouter(prefix="/skills", tags=["skills"], route_class=RutaJSON)
 
 
 # ----------------------------
@@ -23,6 +37,9 @@ class AddSkillIn(BaseModel):
     skill: str
     nivel: int = 5  # valor por defecto 
 
+class AddSkillsBulkIn(BaseModel):
+    items: List[AddSkillIn] = Field(..., min_length=1, max_length=10_000)
+
 class SkillsRequest(BaseModel):
     skills: List[str]
 
@@ -34,7 +51,8 @@ class SkillsRequest(BaseModel):
 def add_skill(body: AddSkillIn):
     """
     - MongoDB: agrega una habilidad y su nivel. Inserta un registro en versiones_perfil
-    - Redis: agrega al set skill:{skill}:users
+    - Redis: agrega al set skill:{skill}:users y actualiza el score del usuario en las
+      recomendaciones cacheadas de las ofertas a las que se postuló
     """
     db = conectar_mongo()
     r = conectar_redis()
@@ -42,54 +60,157 @@ def add_skill(body: AddSkillIn):
     user = body.user.strip().lower()
     skill = body.skill.strip().lower()
 
-    # Mongo: $addToSet para evitar duplicados
-    res = db.candidatos.update_one(
-    {
-        "informacion_personal.nombre_apellido": {
-            "$regex": f"^{user}$",
-            "$options": "i"  # i = insensible a mayúsculas/minúsculas
-        }
-    },
+    # Mongo: $addToSet para evitar duplicados; devuelve el perfil ya actualizado
+    cand = db.candidatos.find_one_and_update(
+    filtro_nombre(user),
     {
         "$addToSet": {
             "habilidades.tecnicas": {"nombre": skill, "nivel": body.nivel}
         }
     },
+    projection={"informacion_personal.nombre_apellido": 1, "habilidades.tecnicas": 1},
+    return_document=ReturnDocument.AFTER,
+    collation=COLACION_NOMBRE,  # insensible a mayúsculas/minúsculas, por índice
     )
-    if res.matched_count == 0:
+    if cand is None:
         raise HTTPException(404, f"Usuario '{user}' no encontrado")
 
-    # Redis: índice por skill
-    r.sadd(f"skill:{skill}:users", user)
+    # Redis: índice por skill + invalidación del cache de perfil, en un solo round trip
+    pipe = r.pipeline(transaction=False)
+    indexar_usuario(pipe, user, [skill])
+
+    # Invalida cache de perfil (Redis + LRU de cada worker)
+    invalidar_perfil(pipe, user)
+    pipe.execute()
 
-    # Invalida cache de perfil (opcional si lo usás)
-    r.delete(f"user:{user}")
+    # Redis: score incremental en cache:match:* (sin recompute completo)
+    actualizar_score_candidato(r, cand)
 
     # Versionado
-    cand_id = get_candidato_id_by_nombre(db, user)
-    if cand_id:
-        log_version(
-            db,
-            cand_id,
-            cambio=f"Agregó skill {skill}",
-            diff={"skills": [{"nombre": skill, "nivel": body.nivel}]},
-        )
+    log_version(
+        db,
+        cand["_id"],
+        cambio=f"Agregó skill {skill}",
+        diff={"skills": [{"nombre": skill, "nivel": body.nivel}]},
+    )
 
     return {"ok": True, "user": user, "skill": skill}
 
 
+# ----------------------------
+# Agregar skills en lote
+# ----------------------------
+@router.post("/add/bulk")
+def add_skills_bulk(body: AddSkillsBulkIn):
+    """
+    Lo mismo que /skills/add para muchos pares (user, skill, nivel), con un round trip por paso:
+    - MongoDB: un find de los candidatos, un bulk_write ($addToSet $each por candidato) y un
+      insert_many de versiones
+    - Redis: un pipeline con los sets skill:{skill}:users y las invalidaciones de perfil, más
+      la actualización incremental de scores de todos los candidatos juntos
+    Responde un resultado por item, en el orden recibido.
+    """
+    db = conectar_mongo()
+    r = conectar_redis()
+    if db is None or r is None:
+        raise HTTPException(500, "Conexiones no disponibles")
+
+    resultados: List[Dict] = []
+    pendientes: List[int] = []  # índices de resultados todavía sin error
+    for it in body.items:
+        user, skill = normalizar_nombre(it.user), it.skill.strip().lower()
+        resultados.append({"user": user, "skill": skill, "nivel": it.nivel, "ok": False})
+        if not user or not skill:
+            resultados[-1]["error"] = "user y skill son obligatorios"
+        else:
+            pendientes.append(len(resultados) - 1)
+
+    # Mongo: ids de todos los candidatos en una consulta (índice con collation)
+    ids = {
+        normalizar_nombre(c["informacion_personal"]["nombre_apellido"]): c["_id"]
+        for c in db.candidatos.find(
+            filtro_nombres(resultados[i]["user"] for i in pendientes),
+            {CAMPO_NOMBRE: 1},
+            collation=COLACION_NOMBRE,
+        )
+    } if pendientes else {}
+
+    por_usuario: Dict[str, List[Dict]] = {}
+    for i in pendientes:
+        res = resultados[i]
+        if res["user"] not in ids:
+            res["error"] = f"Usuario '{res['user']}' no encontrado"
+            continue
+        habilidad = {"nombre": res["skill"], "nivel": res["nivel"]}
+        lista = por_usuario.setdefault(res["user"], [])
+        if habilidad not in lista:
+            lista.append(habilidad)
+
+    # Mongo: un $addToSet por candidato con todas sus skills nuevas
+    usuarios = list(por_usuario)
+    fallidos = {}
+    if usuarios:
+        try:
+            db.candidatos.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": ids[u]},
+                        {"$addToSet": {"habilidades.tecnicas": {"$each": por_usuario[u]}}},
+                    )
+                    for u in usuarios
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            fallidos = {
+                usuarios[err["index"]]: err.get("errmsg", "Error de Mongo")
+                for err in e.details.get("writeErrors", [])
+            }
+    for i in pendientes:
+        res = resultados[i]
+        if res["user"] in fallidos:
+            res["error"] = fallidos[res["user"]]
+        elif res["user"] in por_usuario:
+            res["ok"] = True
+    aplicados = [u for u in usuarios if u not in fallidos]
+    if not aplicados:
+        return {"ok": True, "aplicados": 0, "resultados": resultados}
+
+    # Redis: índices por skill + invalidación de perfiles, en un solo round trip
+    pipe = r.pipeline(transaction=False)
+    for u in aplicados:
+        indexar_usuario(pipe, u, [h["nombre"] for h in por_usuario[u]])
+        invalidar_perfil(pipe, u)
+    pipe.execute()
+
+    # Redis: scores incrementales en cache:match:* con los perfiles ya actualizados
+    perfiles = list(db.candidatos.find(
+        {"_id": {"$in": [ids[u] for u in aplicados]}},
+        {"informacion_personal.nombre_apellido": 1, "habilidades.tecnicas": 1},
+    ))
+    actualizar_scores_candidatos(r, perfiles)
+
+    # Versionado: una versión por skill agregada, en un solo insert_many
+    log_versions(db, [
+        (ids[u], f"Agregó skill {h['nombre']}", {"skills": [h]})
+        for u in aplicados
+        for h in por_usuario[u]
+    ])
+
+    return {"ok": True, "aplicados": sum(1 for x in resultados if x["ok"]), "resultados": resultados}
+
 # -------------------------------
 # Segmentación por skills (Redis)
 # -------------------------------
 @router.get("/segment")
-def segment_by_skills(skills: List[str] = Query(..., min_items=1)):
+async def segment_by_skills(skills: List[str] = Query(..., min_items=1)):
     """
     Segmenta usuarios por intersección de skills usando Redis sets:
       - SINTER skill:{s1}:users skill:{s2}:users ...
     Luego enriquece perfiles desde Mongo.
     """
-    r = conectar_redis()
-    db = conectar_mongo()
+    r = conectar_redis_async()
+    db = conectar_mongo_async()
     if r is None or db is None:
         raise HTTPException(500, "Conexiones no disponibles")
 
@@ -101,22 +222,21 @@ def segment_by_skills(skills: List[str] = Query(..., min_items=1)):
     #Cada skill tiene un set en Redis que contiene los usuarios que la tienen
     #skill:python:users = { "trinidad echevarria", "rosario martinez" }
     if len(keys) == 1:
-        users = r.smembers(keys[0])
+        users = await r.smembers(keys[0])
     else:
-        users = r.sinter(*keys)
+        users = await r.sinter(*keys)
 
     users = list(users or [])
     # Enriquecimiento desde Mongo
-    perfiles = list(
-        db.candidatos.find(
-            {"informacion_personal.nombre_apellido": {"$in": users}},
-            {
-                "_id": 0,
-                "informacion_personal": 1,
-                "estado": 1,
-                "habilidades.tecnicas": 1,
-            },
-        )
-    )
+    perfiles = await db.candidatos.find(
+        filtro_nombres(users),
+        {
+            "_id": 0,
+            "informacion_personal": 1,
+            "estado": 1,
+            "habilidades.tecnicas": 1,
+        },
+        collation=COLACION_NOMBRE,
+    ).to_list(length=None)
     return {"skills": skills_norm, "users": users, "perfiles": perfiles}
 
@@ -1,22 +1,41 @@
-from fastapi import APIRouter, HTTPException
+from anyio import from_thread
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
-from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
 from app.services.conexion_nosql import (
     conectar_mongo,
     conectar_redis,
-    conectar_neo4j,
 )
+from app.services.conexion_async import conectar_mongo_async, conectar_redis_async
 from app.services.versiones import (
     log_version,
     get_candidato_id_by_nombre,
 )
+from app.services.escritor_grafo import escritor_grafo
+from app.services.cache_perfiles import (
+    TTL_PERFIL_SECONDS,
+    cache_perfiles,
+    clave_perfil,
+    invalidar_perfil,
+    serializar,
+)
+from app.services.importacion import FORMATOS, importar_candidatos
+from app.services.indice_usuarios import indexar_usuario, desindexar_usuario, skills_de
+from app.services.candidatos import (
+    COLACION_NOMBRE,
+    buscar_candidato,
+    buscar_candidato_async,
+    diff_alta,
+    documento_nuevo,
+    filtro_nombre,
+)
+from app.utils.campos import parsear_campos, proyeccion, query_fields
+from app.utils.encoder import RutaJSON
 
-from bson import json_util
-import json
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=RutaJSON)
 #Todas las rutas de este archivo van a empezar con /users
 
 # ----------------------------
@@ -48,7 +67,6 @@ class UpdateUserIn(BaseModel):
 def create_user(u: UserIn):
     db = conectar_mongo()
     r = conectar_redis()
-    graph = conectar_neo4j()
     if db is None or r is None:
         raise HTTPException(500, "Conexiones no disponibles")
 
@@ -56,54 +74,24 @@ def create_user(u: UserIn):
         nombre = u.nombre.strip().lower()
         skills_norm = [s.strip().lower() for s in u.skills]
 
-        exists = db.candidatos.find_one(
-            {"informacion_personal.nombre_apellido": nombre},
-            {"_id": 1},
-        )
+        exists = buscar_candidato(db, nombre, {"_id": 1})
         if exists:
             raise HTTPException(409, "El usuario ya existe")
 
-        doc = {
-            "informacion_personal": {
-                "nombre_apellido": nombre,
-                "email": u.email,
-                "celular": u.celular,
-                "residencia": u.residencia,
-                "foto": None,
-                "CV": None,
-            },
-            "estado": "activo",
-            "fecha_creacion": datetime.utcnow(),  # BSON Date
-            "fecha_ultima_actualizacion": None,
-            "experiencia_laboral": [],
-            "experiencia_academica": [],
-            "habilidades": {
-                "tecnicas": [{"nombre": s, "nivel": 5} for s in skills_norm],
-                "blandas": [],
-            },
-            "ultimo_evento_seleccion": None,
-        }
+        doc = documento_nuevo(nombre, u.email, u.celular, u.residencia, skills_norm)
 
         # Mongo
         ins = db.candidatos.insert_one(doc)
         cand_id = ins.inserted_id
 
-        # Redis: índices por skill
-        for s in skills_norm:
-            r.sadd(f"skill:{s}:users", nombre)
+        # Redis (un solo round trip): índices por skill + cache de perfil
+        pipe = r.pipeline(transaction=False)
+        indexar_usuario(pipe, nombre, skills_norm)
         #Actualiza índices en Redis para búsquedas rápidas por skill
 
-        # Cache perfil
-        payload = json.dumps(
-            {
-                "informacion_personal": doc["informacion_personal"],
-                "estado": doc["estado"],
-                "habilidades": doc["habilidades"],
-            },
-            ensure_ascii=False,
-            default=str,  # serializa datetime
-        )
-        r.setex(f"user:{nombre}", 1800, payload)
+        # Cache perfil: el documento completo, tal como lo devuelve GET /users/{nombre}
+        pipe.setex(clave_perfil(nombre), TTL_PERFIL_SECONDS, serializar(doc))
+        pipe.execute()
         #Guarda un cache del perfil en Redis por 30 minutos (setex).
 
         # Versionado en Mongo
@@ -111,40 +99,20 @@ def create_user(u: UserIn):
             db,
             cand_id,
             cambio="Usuario creado",
-            diff={
-                "informacion_personal": doc["informacion_personal"],
-                "estado": doc["estado"],
-                "habilidades": doc["habilidades"],
-            },
+            diff=diff_alta(doc),
         )
 
-        #Crear nodo en Neo4j
-        graph.run(
-            """
-            MERGE (u:Usuario {nombre:$nombre})
-            SET u.email = $email,
-                u.celular = $celular,
-                u.residencia = $residencia,
-                u.estado = 'activo',
-                u.fecha_creacion = datetime()
-            """,
+        #Crear nodo y relaciones con las skills en Neo4j (write-behind: una transacción UNWIND)
+        escritor_grafo.encolar(
+            "usuario",
             nombre=nombre,
             email=u.email,
             celular=u.celular,
             residencia=u.residencia,
         )
-
-        #Crear relaciones con las skills
-        for s in skills_norm:
-            graph.run(
-                """
-                MERGE (u:Usuario {nombre:$nombre})
-                MERGE (h:Habilidad {nombre:$skill})
-                MERGE (u)-[:TIENE_HABILIDAD]->(h)
-                """,
-                nombre=nombre,
-                skill=s
-            )
+        escritor_grafo.encolar_varios(
+            "habilidad", [{"nombre": nombre, "skill": s} for s in skills_norm]
+        )
 
         return {"ok": True, "user": nombre}
 
@@ -175,9 +143,9 @@ def update_user(nombre: str, data: UpdateUserIn):
     if not set_doc:
         return {"ok": True, "updated": 0}
 
-    res = db.candidatos.update_one({"informacion_personal.nombre_apellido": nombre}, {"$set": set_doc})
-    r.delete(f"user:{nombre}")
-    #Borra la copia en caché en Redis del perfil de ese usuario
+    res = db.candidatos.update_one(filtro_nombre(nombre), {"$set": set_doc}, collation=COLACION_NOMBRE)
+    invalidar_perfil(r.pipeline(transaction=False), nombre).execute()
+    #Borra la copia en caché del perfil de ese usuario (Redis + LRU de cada worker)
 
     # Versionado
     cand_id = get_candidato_id_by_nombre(db, nombre)
@@ -192,11 +160,11 @@ def update_user(nombre: str, data: UpdateUserIn):
 @router.post("/capacitacion")
 def add_capacitacion(req: CapacitacionRequest):
     """
-    Actualiza Mongo, crea la relación en Neo4j y registra versión.
+    Actualiza Mongo, encola la relación en Neo4j, invalida el perfil cacheado y registra versión.
     """
     db = conectar_mongo()
-    graph = conectar_neo4j()
-    if db is None or graph is None:
+    r = conectar_redis()
+    if db is None:
         raise HTTPException(500, "Conexiones no disponibles")
 
     nombre = req.nombre.strip().lower()
@@ -205,22 +173,16 @@ def add_capacitacion(req: CapacitacionRequest):
     # Mongo: push de la capacitación
     users = db.candidatos
     users.update_one(
-        {"informacion_personal.nombre_apellido": nombre},
+        filtro_nombre(nombre),
         {"$push": {"capacitaciones": cap}},
+        collation=COLACION_NOMBRE,
     )
     # Actualiza MongoDB ($push para agregar la capacitación)
+    if r is not None:
+        invalidar_perfil(r.pipeline(transaction=False), nombre).execute()
 
-    # Neo4j: MERGE (Usuario)-[:REALIZO]->(Capacitacion)
-    driver = graph  # py2neo.Graph si lo usás así
-    # Si usás neo4j-driver nativo, adaptar a sesiones
-    driver.run(
-        """
-        MERGE (u:Usuario {nombre:$nombre})
-        MERGE (c:Capacitacion {nombre:$cap})
-        MERGE (u)-[:REALIZO]->(c)
-        """,
-        nombre=nombre, cap=cap
-    )
+    # Neo4j: MERGE (Usuario)-[:REALIZO]->(Capacitacion), en segundo plano
+    escritor_grafo.encolar("capacitacion", nombre=nombre, cap=cap)
 
     # Versionado
     cand_id = get_candidato_id_by_nombre(db, nombre)
@@ -235,29 +197,91 @@ def add_capacitacion(req: CapacitacionRequest):
     return {"message": f"Capacitación '{cap}' agregada a '{nombre}'"}
 
 
-import re
+# ----------------------------
+# Importación masiva
+# ----------------------------
+def _lineas_del_body(request: Request) -> Iterator[str]:
+    """
+    Líneas del body (UTF-8, con o sin BOM) a medida que llegan los chunks. Corre en el threadpool:
+    cada chunk se pide al event loop con from_thread, así el archivo nunca está entero en memoria.
+    Cada línea se decodifica por separado: un byte inválido corta en esa línea, no en el chunk.
+    """
+    chunks = request.stream()
+
+    async def siguiente() -> Optional[bytes]:
+        try:
+            return await chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    codificacion = "utf-8-sig"  # solo la primera línea puede traer BOM
+    resto = b""
+    while (chunk := from_thread.run(siguiente)) is not None:
+        *lineas, resto = (resto + chunk).split(b"\n")
+        for linea in lineas:
+            yield (linea + b"\n").decode(codificacion)
+            codificacion = "utf-8"
+    if resto:
+        yield resto.decode(codificacion)
+
+
+@router.post("/import")
+async def import_users(
+    request: Request,
+    formato: Optional[str] = Query(None, description="ndjson o csv (por defecto, según Content-Type)"),
+    batch: int = Query(1000, ge=1, le=10_000, description="Filas por lote"),
+):
+    """
+    Alta masiva: el body es el archivo (NDJSON, un usuario por línea con los campos de POST /users,
+    o CSV con encabezado nombre,email,celular,residencia,skills), leído en streaming. Responde el
+    resumen con los errores por número de fila.
+    """
+    db = conectar_mongo()
+    r = conectar_redis()
+    if db is None or r is None:
+        raise HTTPException(500, "Conexiones no disponibles")
+
+    if formato is None:
+        formato = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    if formato not in FORMATOS:
+        raise HTTPException(400, f"Formato inválido: {formato} (válidos: {', '.join(FORMATOS)})")
+
+    try:
+        # pymongo/redis sync: fuera del event loop, consumiendo el body a medida que llega
+        return await run_in_threadpool(
+            importar_candidatos, db, r, _lineas_del_body(request), formato, batch
+        )
+    except Exception as e:
+        print("ERROR import_users:", repr(e))
+        raise HTTPException(500, "Error interno importando usuarios")
 
 # ----------------------------
 # Obtener usuario por nombre
 # ----------------------------
 @router.get("/{nombre}")
-def get_user(nombre: str):
+async def get_user(nombre: str, fields: Optional[str] = query_fields()):
     try:
-        db = conectar_mongo()
+        db = conectar_mongo_async()
         if db is None:
             raise HTTPException(500, "Conexión Mongo no disponible")
 
-        regex = re.compile(f"^{re.escape(nombre.strip())}$", re.IGNORECASE)
-        user = db.candidatos.find_one(
-            {"informacion_personal.nombre_apellido": regex}
-        )
+        # ?fields=informacion_personal.email,habilidades: solo esos campos, proyectados en Mongo
+        # (el cache guarda el documento completo, así que este camino no pasa por él)
+        campos = parsear_campos(fields)
+        if campos:
+            user = await buscar_candidato_async(db, nombre, proyeccion(campos))
+            if not user:
+                raise HTTPException(404, f"Usuario '{nombre}' no encontrado")
+            return Response(content=serializar(user), media_type="application/json")
+
+        # Read-through: LRU del worker -> Redis user:{nombre} -> Mongo. Devuelve el JSON ya
+        # serializado (ObjectId y fechas como JSON extendido): un acierto no se vuelve a codificar
+        user = await cache_perfiles.obtener(db, conectar_redis_async(), nombre)
 
         if not user:
             raise HTTPException(404, f"Usuario '{nombre}' no encontrado")
 
-        #Serializamos correctamente ObjectId y fechas
-        user_json = json.loads(json_util.dumps(user))
-        return user_json
+        return Response(content=user, media_type="application/json")
 
     except HTTPException:
         raise
@@ -272,29 +296,27 @@ def get_user(nombre: str):
 def delete_user(nombre: str):
     db = conectar_mongo()
     r = conectar_redis()
-    graph = conectar_neo4j() 
     if db is None or r is None:
         raise HTTPException(500, "Conexiones no disponibles")
 
     nombre = nombre.strip().lower()
-    res = db.candidatos.delete_one({
-        "informacion_personal.nombre_apellido": {"$regex": f"^{nombre}$", "$options": "i"}
-    })
+    borrado = db.candidatos.find_one_and_delete(
+        filtro_nombre(nombre),
+        projection={"habilidades.tecnicas.nombre": 1},
+        collation=COLACION_NOMBRE,
+    )
 
-    #Borra el cache directo del usuario
-    r.delete(f"user:{nombre}")
+    # Redis (un solo round trip): sacarlo de skill:{skill}:users y borrar el cache directo del usuario
+    pipe = r.pipeline(transaction=False)
+    if borrado:
+        desindexar_usuario(pipe, nombre, skills_de((borrado.get("habilidades") or {}).get("tecnicas")))
+    invalidar_perfil(pipe, nombre)
+    pipe.execute()
 
-    # Neo4j: eliminar nodo y todas sus relaciones
-    try:
-        graph.run(
-            "MATCH (u:Usuario {nombre:$nombre}) "
-            "DETACH DELETE u", #para eliminar el nodo y todas sus relaciones
-            nombre=nombre
-        )
-    except Exception as e:
-        print("ERROR eliminando en Neo4j:", repr(e))
+    # Neo4j: eliminar nodo y todas sus relaciones (DETACH DELETE), en segundo plano
+    escritor_grafo.encolar("borrar_usuario", nombre=nombre)
 
-    return {"deleted": res.deleted_count}
+    return {"deleted": 1 if borrado else 0}
 
 
 # ----------------------------
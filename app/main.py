@@ -1,6 +1,21 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.services.conexion_nosql import gestor
+from app.services.conexion_async import calentar_async, cerrar_async
+from app.services.indices import asegurar_indices
+from app.services.indice_ofertas import asegurar_indice
+from app.services.escritor_grafo import escritor_grafo
+from app.services.cache_perfiles import cache_perfiles
+from app.services.metricas import MiddlewareMetricas
+from app.services.perfilador import MiddlewarePerfilador
+from app.services.operaciones_lentas import registro_lento
+from app.utils.encoder import MongoJSONResponse
+
 #Rutas 
 from app.api.users import router as users_router
 from app.api.skills import router as skills_router
@@ -10,8 +25,55 @@ from app.api.posiciones import router as posiciones_router
 from app.api.dashboard import router as dashboard_router
 from app.api.cursos import router as cursos_router
 from app.api.inscripciones import router as inscripciones_router
+from app.api.health import router as health_router
+from app.api.export import router as export_router
+from app.api.metricas import router as metricas_router
+from app.api.admin import router as admin_router
+
+# Referencias a las tareas del arranque que siguen en segundo plano (evita que el GC las cancele)
+_tareas_fondo = set()
+
+
+async def _asegurar_indice_ofertas(db, r):
+    try:
+        n = await run_in_threadpool(asegurar_indice, db, r)
+    except Exception as e:
+        print("ERROR construyendo el índice skill -> ofertas:", repr(e))
+        return
+    if n is not None:
+        print("Índice skill -> ofertas reconstruido:", n)
+
 
-app = FastAPI(title="Talentum+ API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Corre una vez por worker, después del fork: cada proceso crea y calienta sus propios pools
+    estado = await run_in_threadpool(gestor.calentar)
+    estado.update(await calentar_async())
+    print("Conexiones al arrancar:", estado)
+    if estado.get("mongo"):
+        await run_in_threadpool(asegurar_indices, gestor.mongo())
+        # Primer arranque (o Redis vaciado): construir el índice skill -> ofertas en segundo plano,
+        # sin demorar el arranque del worker (lo construye un solo worker: lock en Redis)
+        r = gestor.redis()
+        if r is not None:
+            tarea = asyncio.create_task(_asegurar_indice_ofertas(gestor.mongo(), r))
+            _tareas_fondo.add(tarea)
+            tarea.add_done_callback(_tareas_fondo.discard)
+    escritor_grafo.iniciar()
+    # Suscripción a invalidaciones de perfiles: habilita el LRU local de GET /users/{nombre}
+    cache_perfiles.iniciar(gestor.redis())
+    yield
+    cache_perfiles.detener()
+    # Escribe en Neo4j lo que quedó encolado antes de cerrar las conexiones
+    await run_in_threadpool(escritor_grafo.detener)
+    await cerrar_async()
+    gestor.cerrar()
+
+
+# Registro de operaciones lentas de Mongo y Neo4j (antes de crear los clientes, en el lifespan)
+registro_lento.activar()
+
+app = FastAPI(title="Talentum+ API", lifespan=lifespan, default_response_class=MongoJSONResponse)
 
 app.include_router(users_router)        # /users
 app.include_router(skills_router)       # /skills
@@ -21,6 +83,10 @@ app.include_router(posiciones_router)   # /posiciones
 app.include_router(dashboard_router)    # /dashboard
 app.include_router(cursos_router)       # /cursos
 app.include_router(inscripciones_router) # /inscripciones
+app.include_router(health_router)       # /health
+app.include_router(export_router)       # /export
+app.include_router(metricas_router)     # /metrics
+app.include_router(admin_router)        # /admin
 
 #Agrega cada módulo de endpoints a la aplicación principal
 
@@ -31,4 +97,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # permite POST, GET, OPTIONS, etc.
     allow_headers=["*"],
-)
\ No newline at end of file
+)
+
+# Latencia por endpoint y por backend (GET /metrics)
+app.add_middleware(MiddlewareMetricas)
+
+# Perfilado bajo demanda (X-Perfilar / PERFILADOR_MUESTREO), descargable desde /admin/perfiles
+app.add_middleware(MiddlewarePerfilador)
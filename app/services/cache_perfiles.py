@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from bson import json_util
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import redis
+import redis.asyncio as aioredis
+
+from app.services.candidatos import buscar_candidato_async, normalizar_nombre
+from app.services.conexion_nosql import _env_float, _env_int
+from app.services.metricas import cache
+
+# Cache read-through de perfiles (GET /users/{nombre}) en dos niveles:
+#   1. LRU en memoria del proceso (solo mientras escucha las invalidaciones por pub/sub)
+#   2. Redis: user:{nombre} con el documento serializado (JSON extendido de bson.json_util)
+#   3. Mongo: fuente de verdad; lo leído se guarda en 2 y 1
+# Los dos niveles guardan el JSON ya serializado: un acierto se devuelve tal cual, sin parsear.
+# Toda escritura de perfil llama a invalidar_perfil: incrementa perfil:gen:{nombre}, borra user:{nombre}
+# y publica el nombre en CANAL_INVALIDACION para que cada worker lo saque de su LRU.
+# Un llenado desde Mongo solo escribe user:{nombre} si la generación no cambió desde que empezó a leer:
+# si una escritura invalidó en el medio, el documento leído puede ser viejo y no se cachea.
+CANAL_INVALIDACION = "perfil:invalidar"
+TTL_PERFIL_SECONDS = 1800  # 30 minutos en Redis
+
+# SET del perfil solo si perfil:gen:{nombre} sigue valiendo lo leído antes de ir a Mongo ('' = no existía)
+_LUA_GUARDAR = """
+if (redis.call('get', KEYS[2]) or '') == ARGV[1] then
+    return redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+end
+return 0
+"""
+
+
+def clave_perfil(nombre: str) -> str:
+    return f"user:{normalizar_nombre(nombre)}"
+
+
+def clave_generacion(nombre: str) -> str:
+    return f"perfil:gen:{normalizar_nombre(nombre)}"
+
+
+def serializar(doc: Dict) -> str:
+    # ObjectId y fechas como JSON extendido ({"$oid": ...}, {"$date": ...}), igual que antes en get_user
+    return json_util.dumps(doc, ensure_ascii=False)
+
+
+def invalidar_perfil(r, nombre: str):
+    """
+    Borra el perfil cacheado y avisa a todos los workers. `r` puede ser un cliente o un pipeline
+    (en ese caso se ejecuta junto con el resto de las escrituras del caller). Retorna `r`.
+    """
+    nombre = normalizar_nombre(nombre)
+    cache_perfiles.descartar(nombre)
+    # La generación vive al menos lo que un perfil cacheado: alcanza para cualquier llenado en curso
+    r.incr(clave_generacion(nombre))
+    r.expire(clave_generacion(nombre), TTL_PERFIL_SECONDS)
+    r.delete(clave_perfil(nombre))
+    r.publish(CANAL_INVALIDACION, nombre)
+    return r
+
+
+class CachePerfiles:
+    """
+    LRU local + contadores de aciertos por nivel. El LRU solo se usa si el proceso está
+    suscripto a CANAL_INVALIDACION (iniciar); si no, se lee directo de Redis.
+    """
+
+    def __init__(self):
+        self.max_items = _env_int("PERFIL_LRU_MAX", 10_000)
+        self.ttl_local_s = _env_float("PERFIL_LRU_TTL_S", 300.0)
+        self._reiniciar()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reiniciar)
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()  # nombre -> (vence, json)
+        # nombre -> [llenados en curso, descartes]: un llenado que vio un descarte de SU nombre mientras
+        # leía no entra al LRU. Solo hay entradas para nombres con un llenado en curso.
+        self._en_curso: Dict[str, list] = {}
+        self._pubsub = None
+        self._hilo = None
+        self.contadores = {
+            "lru_hits": 0, "lru_misses": 0,
+            "redis_hits": 0, "redis_misses": 0,
+            "mongo_hits": 0, "mongo_misses": 0,
+            "invalidaciones": 0,
+        }
+
+    def _contar(self, nivel: str, resultado: str):
+        with self._lock:
+            self.contadores[f"{nivel}_{resultado}"] += 1
+        cache("perfil", nivel, resultado)
+
+    # -------- Suscripción a invalidaciones --------
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid()
+
+    def iniciar(self, r: redis.Redis):
+        if self.activo or r is None:
+            return
+        self._pubsub = r.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{CANAL_INVALIDACION: self._al_invalidar})
+        self._hilo = self._pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True, exception_handler=self._al_fallar
+        )
+
+    def detener(self):
+        if self._hilo is not None and self._pid == os.getpid():
+            self._hilo.stop()
+            self._pubsub.close()
+        self._hilo = None
+        self.limpiar()
+
+    def _al_invalidar(self, msg):
+        with self._lock:
+            self.contadores["invalidaciones"] += 1
+        self.descartar(msg["data"])
+
+    def _al_fallar(self, ex, pubsub, hilo):
+        # Mientras no estamos suscriptos se pueden perder invalidaciones: vaciar el LRU
+        print("ERROR suscripción de invalidación de perfiles:", repr(ex))
+        self.limpiar()
+        time.sleep(1.0)
+
+    # -------- LRU local --------
+    def descartar(self, nombre: str):
+        with self._lock:
+            llenado = self._en_curso.get(nombre)
+            if llenado is not None:
+                llenado[1] += 1
+            self._lru.pop(nombre, None)
+
+    def limpiar(self):
+        with self._lock:
+            for llenado in self._en_curso.values():
+                llenado[1] += 1
+            self._lru.clear()
+
+    def _empezar_llenado(self, nombre: str) -> int:
+        with self._lock:
+            llenado = self._en_curso.setdefault(nombre, [0, 0])
+            llenado[0] += 1
+            return llenado[1]
+
+    def _terminar_llenado(self, nombre: str):
+        with self._lock:
+            llenado = self._en_curso[nombre]
+            llenado[0] -= 1
+            if not llenado[0]:
+                del self._en_curso[nombre]
+
+    def _get_local(self, nombre: str) -> Optional[str]:
+        with self._lock:
+            item = self._lru.get(nombre)
+            if item is None or item[0] < time.monotonic():
+                self._lru.pop(nombre, None)
+                return None
+            self._lru.move_to_end(nombre)
+            return item[1]
+
+    def _put_local(self, nombre: str, perfil: str, descartes: int):
+        with self._lock:
+            llenado = self._en_curso.get(nombre)
+            if llenado is None or llenado[1] != descartes:
+                return  # se invalidó este nombre mientras se leía: el perfil puede estar viejo
+            self._lru[nombre] = (time.monotonic() + self.ttl_local_s, perfil)
+            self._lru.move_to_end(nombre)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+
+    # -------- Read-through --------
+    async def obtener(
+        self, db: AsyncIOMotorDatabase, r: Optional[aioredis.Redis], nombre: str
+    ) -> Optional[str]:
+        """
+        Perfil (documento de candidatos serializado a JSON) por nombre: LRU -> Redis -> Mongo.
+        None si el candidato no existe. Si Redis no está disponible se sigue contra Mongo.
+        """
+        nombre = normalizar_nombre(nombre)
+        if not self.activo:
+            return await self._leer(db, r, nombre, None)
+        perfil = self._get_local(nombre)
+        if perfil is not None:
+            self._contar("lru", "hits")
+            return perfil
+        self._contar("lru", "misses")
+        descartes = self._empezar_llenado(nombre)
+        try:
+            return await self._leer(db, r, nombre, descartes)
+        finally:
+            self._terminar_llenado(nombre)
+
+    async def _leer(
+        self, db: AsyncIOMotorDatabase, r: Optional[aioredis.Redis], nombre: str, descartes: Optional[int]
+    ) -> Optional[str]:
+        # Redis -> Mongo; con `descartes` (LRU activo) lo leído se guarda también en el LRU
+        generacion = None
+        if r is not None:
+            try:
+                raw, generacion = await r.mget(clave_perfil(nombre), clave_generacion(nombre))
+            except Exception as e:
+                print("ERROR leyendo perfil de Redis:", repr(e))
+                raw = None
+            if raw is not None:
+                self._contar("redis", "hits")
+                if descartes is not None:
+                    self._put_local(nombre, raw, descartes)
+                return raw
+            self._contar("redis", "misses")
+
+        doc = await buscar_candidato_async(db, nombre)
+        if doc is None:
+            self._contar("mongo", "misses")
+            return None
+        self._contar("mongo", "hits")
+        raw = serializar(doc)
+        if r is not None:
+            try:
+                await r.eval(
+                    _LUA_GUARDAR, 2, clave_perfil(nombre), clave_generacion(nombre),
+                    generacion or "", raw, TTL_PERFIL_SECONDS,
+                )
+            except Exception as e:
+                print("ERROR guardando perfil en Redis:", repr(e))
+        if descartes is not None:
+            self._put_local(nombre, raw, descartes)
+        return raw
+
+    def stats(self) -> Dict:
+        with self._lock:
+            out = dict(self.contadores)
+            out["lru_items"] = len(self._lru)
+        out["lru_activo"] = self.activo
+        for nivel in ("lru", "redis", "mongo"):
+            total = out[f"{nivel}_hits"] + out[f"{nivel}_misses"]
+            out[f"{nivel}_hit_ratio"] = round(out[f"{nivel}_hits"] / total, 4) if total else None
+        return out
+
+
+cache_perfiles = CachePerfiles()
@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.collation import Collation
+from pymongo.database import Database
+
+# Los nombres se comparan sin distinguir mayúsculas (strength 2: "Camila Gebara" == "camila gebara",
+# pero "lucia" != "lucía"), igual que el viejo regex ^nombre$ con opción "i".
+# El índice candidatos.nombre_apellido_ci (app/services/indices.py) está creado con esta misma
+# collation: las consultas SOLO lo usan si la pasan, por eso toda búsqueda por nombre va por acá.
+COLACION_NOMBRE = Collation(locale="es", strength=2)
+CAMPO_NOMBRE = "informacion_personal.nombre_apellido"
+
+
+def normalizar_nombre(nombre: Optional[str]) -> str:
+    return (nombre or "").strip().lower()
+
+
+def filtro_nombre(nombre: Optional[str]) -> Dict:
+    """
+    Filtro exacto por nombre (usar siempre junto con collation=COLACION_NOMBRE).
+    """
+    return {CAMPO_NOMBRE: normalizar_nombre(nombre)}
+
+
+def filtro_nombres(nombres: Iterable[str]) -> Dict:
+    """
+    Filtro $in por varios nombres (usar siempre junto con collation=COLACION_NOMBRE).
+    """
+    return {CAMPO_NOMBRE: {"$in": sorted({normalizar_nombre(n) for n in nombres})}}
+
+
+def buscar_candidato(db: Database, nombre: str, projection: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Candidato por nombre (case-insensitive, por índice). None si no existe.
+    """
+    return db.candidatos.find_one(filtro_nombre(nombre), projection, collation=COLACION_NOMBRE)
+
+
+async def buscar_candidato_async(
+    db: AsyncIOMotorDatabase, nombre: str, projection: Optional[Dict] = None
+) -> Optional[Dict]:
+    return await db.candidatos.find_one(filtro_nombre(nombre), projection, collation=COLACION_NOMBRE)
+
+
+def candidato_id(db: Database, nombre: str) -> Optional[ObjectId]:
+    doc = buscar_candidato(db, nombre, {"_id": 1})
+    return doc["_id"] if doc else None
+
+
+def documento_nuevo(
+    nombre: str,
+    email: str,
+    celular: Optional[str] = None,
+    residencia: Optional[str] = None,
+    skills: Iterable[str] = (),
+) -> Dict:
+    """
+    Documento de candidatos para un alta (POST /users y la importación masiva).
+    `nombre` y `skills` ya normalizados.
+    """
+    return {
+        "informacion_personal": {
+            "nombre_apellido": nombre,
+            "email": email,
+            "celular": celular,
+            "residencia": residencia,
+            "foto": None,
+            "CV": None,
+        },
+        "estado": "activo",
+        "fecha_creacion": datetime.utcnow(),  # BSON Date
+        "fecha_ultima_actualizacion": None,
+        "experiencia_laboral": [],
+        "experiencia_academica": [],
+        "habilidades": {
+            "tecnicas": [{"nombre": s, "nivel": 5} for s in skills],
+            "blandas": [],
+        },
+        "ultimo_evento_seleccion": None,
+    }
+
+
+def diff_alta(doc: Dict) -> Dict:
+    # Lo que se guarda en versiones_perfil como "Usuario creado"
+    return {
+        "informacion_personal": doc["informacion_personal"],
+        "estado": doc["estado"],
+        "habilidades": doc["habilidades"],
+    }
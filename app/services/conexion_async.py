@@ -0,0 +1,138 @@
+import time
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from neo4j import AsyncGraphDatabase
+
+from app.services.conexion_nosql import MonitorPoolMongo, gestor
+from app.services.metricas import MonitorComandosMongo, RedisMedidoAsync, cypher_terminado, observar
+
+# Variante async de conexion_nosql: mismos servidores y misma configuración (ConfigConexiones),
+# clientes no bloqueantes. Los administra el mismo GestorConexiones, así que también se
+# recrean por proceso después de un fork.
+
+def _crear_mongo_async():
+    cfg = gestor.config
+    monitor = MonitorPoolMongo()
+    client = AsyncIOMotorClient(
+        cfg.mongo_uri,
+        authSource=cfg.mongo_auth_source,
+        maxPoolSize=cfg.mongo_max_pool,
+        minPoolSize=cfg.mongo_min_pool,
+        serverSelectionTimeoutMS=cfg.mongo_timeout_ms,
+        connectTimeoutMS=cfg.mongo_timeout_ms,
+        event_listeners=[monitor, MonitorComandosMongo()],
+    )
+    gestor.monitores["mongo_async"] = monitor
+    return client[cfg.mongo_db]
+
+def _crear_neo4j_async():
+    cfg = gestor.config
+    return AsyncGraphDatabase.driver(
+        cfg.neo4j_uri,
+        auth=(cfg.neo4j_user, cfg.neo4j_password),
+        max_connection_pool_size=cfg.neo4j_max_pool,
+        connection_timeout=cfg.neo4j_timeout_s,
+        connection_acquisition_timeout=cfg.neo4j_timeout_s,
+    )
+
+def _crear_redis_async():
+    cfg = gestor.config
+    return RedisMedidoAsync(
+        host=cfg.redis_host,
+        port=cfg.redis_port,
+        db=cfg.redis_db,
+        decode_responses=True,
+        max_connections=cfg.redis_max_conn,
+        socket_timeout=cfg.redis_timeout_s,
+        socket_connect_timeout=cfg.redis_timeout_s,
+    )
+
+def conectar_mongo_async():
+    return gestor.obtener("mongo_async", _crear_mongo_async)
+
+def conectar_neo4j_async():
+    return gestor.obtener("neo4j_async", _crear_neo4j_async)
+
+def conectar_redis_async():
+    return gestor.obtener("redis_async", _crear_redis_async)
+
+async def run_cypher(driver, query: str, **params) -> List[Dict]:
+    """
+    Ejecuta una consulta Cypher en una sesión async y devuelve las filas como dicts
+    (equivalente a graph.run(...).data() de py2neo).
+    """
+    t0 = time.perf_counter()
+    try:
+        async with driver.session() as session:
+            result = await session.run(query, **params)
+            filas = await result.data()
+    except Exception:
+        observar("neo4j", "run", time.perf_counter() - t0, error=True)
+        raise
+    segundos = time.perf_counter() - t0
+    observar("neo4j", "run", segundos)
+    cypher_terminado(query, params, segundos)
+    return filas
+
+async def salud_async() -> Dict[str, Dict]:
+    """
+    Health probe de los clientes async: ping a cada backend con su latencia o el error.
+    """
+    probes = {
+        "mongo_async": (conectar_mongo_async, lambda db: db.command("ping")),
+        "neo4j_async": (conectar_neo4j_async, lambda d: d.verify_connectivity()),
+        "redis_async": (conectar_redis_async, lambda r: r.ping()),
+    }
+    out = {}
+    for backend, (obtener, ping) in probes.items():
+        cliente = obtener()
+        if cliente is None:
+            out[backend] = {"ok": False, "error": gestor.error(backend)}
+            continue
+        t0 = time.perf_counter()
+        try:
+            await ping(cliente)
+            out[backend] = {"ok": True, "latencia_ms": round((time.perf_counter() - t0) * 1000, 2)}
+        except Exception as e:
+            gestor.registrar_error(backend, e)
+            out[backend] = {"ok": False, "error": repr(e)}
+    return out
+
+async def calentar_async() -> Dict[str, bool]:
+    """
+    Pre-conecta los clientes async dentro del event loop del worker.
+    """
+    return {backend: probe["ok"] for backend, probe in (await salud_async()).items()}
+
+def stats_async() -> Dict[str, Dict]:
+    """
+    Utilización de los pools async de este proceso.
+    """
+    cfg = gestor.config
+    mongo = {"max": cfg.mongo_max_pool, "min": cfg.mongo_min_pool}
+    if "mongo_async" in gestor.monitores:
+        mongo.update(gestor.monitores["mongo_async"].stats())
+
+    red = {"max": cfg.redis_max_conn}
+    r = gestor.cliente("redis_async")
+    if r is not None:
+        pool = r.connection_pool
+        red["en_uso"] = len(pool._in_use_connections)
+        red["libres"] = len(pool._available_connections)
+
+    return {"mongo_async": mongo, "neo4j_async": {"max": cfg.neo4j_max_pool}, "redis_async": red}
+
+async def cerrar_async():
+    """
+    Cierra los clientes async (al apagar el worker).
+    """
+    db = gestor.cliente("mongo_async")
+    if db is not None:
+        db.client.close()
+    driver = gestor.cliente("neo4j_async")
+    if driver is not None:
+        await driver.close()
+    r = gestor.cliente("redis_async")
+    if r is not None:
+        await r.aclose()
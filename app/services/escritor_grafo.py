@@ -0,0 +1,234 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.conexion_nosql import _env_float, _env_int, gestor
+from app.services.metricas import cypher_terminado, observar
+
+# Una sentencia UNWIND por tipo de mutación: un lote de N filas del mismo tipo
+# viaja como UNA sentencia con $filas en lugar de N graph.run.
+CYPHER = {
+    "usuario": """
+        UNWIND $filas AS f
+        MERGE (u:Usuario {nombre:f.nombre})
+        SET u.email = f.email,
+            u.celular = f.celular,
+            u.residencia = f.residencia,
+            u.estado = 'activo',
+            u.fecha_creacion = datetime()
+    """,
+    "habilidad": """
+        UNWIND $filas AS f
+        MERGE (u:Usuario {nombre:f.nombre})
+        MERGE (h:Habilidad {nombre:f.skill})
+        MERGE (u)-[:TIENE_HABILIDAD]->(h)
+    """,
+    "capacitacion": """
+        UNWIND $filas AS f
+        MERGE (u:Usuario {nombre:f.nombre})
+        MERGE (c:Capacitacion {nombre:f.cap})
+        MERGE (u)-[:REALIZO]->(c)
+    """,
+    "curso": """
+        UNWIND $filas AS f
+        MERGE (u:Usuario {nombre:f.nombre})
+        MERGE (c:Curso {titulo:f.curso})
+        MERGE (u)-[:REALIZO]->(c)
+    """,
+    "skill": """
+        UNWIND $filas AS f
+        MERGE (u:Usuario {nombre:f.nombre})
+        MERGE (s:Skill {nombre:f.skill})
+        MERGE (u)-[:TIENE]->(s)
+    """,
+    "borrar_usuario": """
+        UNWIND $filas AS f
+        MATCH (u:Usuario {nombre:f.nombre})
+        DETACH DELETE u
+    """,
+}
+
+
+def agrupar(ops: List[Tuple[str, Dict]]) -> List[Tuple[str, List[Dict]]]:
+    """
+    Junta las mutaciones CONSECUTIVAS del mismo tipo en una sola (tipo, filas), sin filas
+    repetidas. Solo se agrupan vecinas para respetar el orden (p. ej. crear -> borrar -> crear).
+    """
+    grupos: List[Tuple[str, List[Dict]]] = []
+    vistas: set = set()
+    for tipo, fila in ops:
+        if not grupos or grupos[-1][0] != tipo:
+            grupos.append((tipo, []))
+            vistas = set()
+        clave = tuple(sorted(fila.items()))
+        if clave not in vistas:
+            vistas.add(clave)
+            grupos[-1][1].append(fila)
+    return grupos
+
+
+class EscritorGrafo:
+    """
+    Write-behind de las mutaciones de Neo4j: los endpoints encolan y responden sin esperar
+    a Neo4j; un thread de fondo junta lo encolado (hasta `lote` mutaciones o `flush_ms`
+    de espera), lo agrupa en sentencias UNWIND y lo escribe en UNA transacción.
+    Si la transacción falla se reintenta el mismo lote con backoff exponencial.
+    """
+
+    def __init__(self):
+        self.lote = _env_int("GRAFO_LOTE", 500)
+        self.flush_s = _env_int("GRAFO_FLUSH_MS", 50) / 1000
+        self.reintentos = _env_int("GRAFO_REINTENTOS", 5)
+        self.backoff_s = _env_float("GRAFO_BACKOFF_S", 0.5)
+        self.cola_max = _env_int("GRAFO_COLA_MAX", 100_000)
+        self._reiniciar()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reiniciar)
+        atexit.register(self.detener)
+
+    def _reiniciar(self):
+        # Después de un fork el thread del padre no existe en el hijo: arranca de cero
+        self._pid = os.getpid()
+        self._cola: "queue.Queue[Tuple[float, str, Dict]]" = queue.Queue(self.cola_max)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._mas_vieja: Optional[float] = None  # encolado de la mutación pendiente más vieja
+        self.escritas = 0
+        self.lotes = 0
+        self.sentencias = 0
+        self.fallos = 0
+        self.descartadas = 0
+        self.ultimo_error: Optional[str] = None
+
+    # -------- API para los endpoints --------
+    def encolar(self, tipo: str, **fila):
+        self.encolar_varios(tipo, [fila])
+
+    def encolar_varios(self, tipo: str, filas: Iterable[Dict]):
+        if tipo not in CYPHER:
+            raise ValueError(f"Mutación de grafo desconocida: {tipo}")
+        self.iniciar()
+        ahora = time.monotonic()
+        for fila in filas:
+            # Nunca bloquear al request: con la cola llena (Neo4j caído más de lo que aguanta
+            # GRAFO_COLA_MAX) la mutación se descarta y se cuenta; el grafo se repara con una recarga
+            try:
+                self._cola.put_nowait((ahora, tipo, fila))
+            except queue.Full:
+                with self._lock:
+                    self.descartadas += 1
+
+    # -------- Ciclo de vida --------
+    def iniciar(self):
+        if self._pid != os.getpid():
+            self._reiniciar()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="escritor-grafo", daemon=True)
+            self._thread.start()
+
+    def detener(self, timeout_s: float = 10.0):
+        """
+        Vacía la cola (escribe lo pendiente) y frena el thread. Se llama al apagar el worker.
+        """
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._parar.set()
+        self._thread.join(timeout_s)
+        self._thread = None
+
+    # -------- Thread de fondo --------
+    def _tomar_lote(self) -> List[Tuple[float, str, Dict]]:
+        try:
+            primero = self._cola.get(timeout=0.2)
+        except queue.Empty:
+            return []
+        lote = [primero]
+        limite = time.monotonic() + self.flush_s
+        while len(lote) < self.lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _loop(self):
+        while not (self._parar.is_set() and self._cola.empty()):
+            lote = self._tomar_lote()
+            if not lote:
+                continue
+            with self._lock:
+                self._mas_vieja = lote[0][0]
+            self._escribir_con_reintentos(agrupar([(tipo, fila) for _t, tipo, fila in lote]), len(lote))
+            with self._lock:
+                self._mas_vieja = None
+
+    def _escribir_con_reintentos(self, grupos: List[Tuple[str, List[Dict]]], n: int):
+        for intento in range(self.reintentos + 1):
+            try:
+                self._escribir(grupos)
+                with self._lock:
+                    self.escritas += n
+                    self.lotes += 1
+                    self.sentencias += len(grupos)
+                return
+            except Exception as e:
+                with self._lock:
+                    self.fallos += 1
+                    self.ultimo_error = repr(e)
+                print("ERROR escritor de grafo (intento %d):" % (intento + 1), repr(e))
+                if intento < self.reintentos:
+                    time.sleep(self.backoff_s * (2 ** intento))
+        with self._lock:
+            self.descartadas += n
+
+    def _escribir(self, grupos: List[Tuple[str, List[Dict]]]):
+        graph = gestor.neo4j()
+        if graph is None:
+            raise ConnectionError(gestor.error("neo4j") or "Neo4j no disponible")
+        t0 = time.perf_counter()
+        tx = graph.begin()
+        try:
+            for tipo, filas in grupos:
+                t_sentencia = time.perf_counter()
+                tx.run(CYPHER[tipo], filas=filas)
+                cypher_terminado(CYPHER[tipo], {"filas": filas}, time.perf_counter() - t_sentencia)
+        except Exception:
+            graph.rollback(tx)
+            observar("neo4j", "lote", time.perf_counter() - t0, error=True)
+            raise
+        graph.commit(tx)
+        observar("neo4j", "lote", time.perf_counter() - t0)
+
+    # -------- Observabilidad --------
+    def stats(self) -> Dict:
+        """
+        Profundidad de la cola y lag (antigüedad de la mutación pendiente más vieja).
+        """
+        with self._lock:
+            pendiente = self._mas_vieja
+            out = {
+                "activo": self._thread is not None and self._thread.is_alive(),
+                "en_cola": self._cola.qsize(),
+                "escritas": self.escritas,
+                "lotes": self.lotes,
+                "sentencias": self.sentencias,
+                "fallos": self.fallos,
+                "descartadas": self.descartadas,
+                "ultimo_error": self.ultimo_error,
+            }
+        if pendiente is None:
+            with self._cola.mutex:
+                pendiente = self._cola.queue[0][0] if self._cola.queue else None
+        out["lag_s"] = round(time.monotonic() - pendiente, 3) if pendiente is not None else 0.0
+        return out
+
+
+escritor_grafo = EscritorGrafo()
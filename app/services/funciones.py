@@ -1,9 +1,62 @@
+import asyncio
+import json
+import time
 from typing import Iterable, List, Dict, Tuple
-from pymongo.database import Database
-from py2neo import Graph
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from neo4j import AsyncDriver
 import redis
+import redis.asyncio as aioredis
+
+from app.services.candidatos import COLACION_NOMBRE, filtro_nombres, normalizar_nombre
+from app.services.conexion_async import run_cypher
+from app.services.metricas import RECOMPUTE_SEGUNDOS, cache
+from app.services.puntaje import score_bulk
+from app.services.singleflight import LockRedis, SingleFlight, esperar_notificacion
+
+# Stale-while-revalidate: pasado el TTL "soft" el ZSET se sigue sirviendo (marcado como stale)
+# mientras una tarea en segundo plano lo refresca; recién al TTL "hard" desaparece de Redis.
+# Cada oferta puede pisarlos con los campos cache_ttl_soft / cache_ttl_hard (segundos).
+# Los cambios de skills de un candidato se aplican incrementalmente (actualizar_score_candidato),
+# así que el recompute completo solo repara lo que no se mantiene solo (p.ej. postulaciones nuevas).
+# Cada actualización incremental incrementa cand:{nombre}:v; el recompute lee esas versiones antes
+# de leer los perfiles y después de escribir el ZSET, y vuelve a puntuar a los que cambiaron en el
+# medio: un score viejo no pisa al incremental durante las horas de TTL.
+TTL_MATCH_SECONDS = 3600  # 1 hora (soft)
+TTL_MATCH_HARD_SECONDS = 6 * 3600  # 6 horas (hard)
+LOCK_MATCH_MS = 10_000   # TTL del lock de recompute (se renueva mientras dura)
+ESPERA_MATCH_SECONDS = 30  # máximo que un worker espera el recompute de otro
+
+# Recomputes en curso en este proceso, compartidos por los requests concurrentes
+_recomputes = SingleFlight()
+# Referencias a los refresh en segundo plano (evita que el GC los cancele)
+_refrescos = set()
+
+
+def _canal_listo(oferta_id: str) -> str:
+    return f"match:listo:{oferta_id}"
+
 
-TTL_MATCH_SECONDS = 900  # 15 minutos
+def clave_version(nombre: str) -> str:
+    return f"cand:{normalizar_nombre(nombre)}:v"
+
+
+def clave_meta(oferta_id: str) -> str:
+    """
+    HASH con fresco_hasta y reqs del ZSET cache:match:{oferta_id}. Vive fuera de cache:match:*
+    para que ese patrón (SCAN, invalidaciones masivas) solo encuentre los ZSET.
+    """
+    return f"meta:match:{oferta_id}"
+
+
+def _ttls_oferta(oferta: Dict) -> Tuple[int, int]:
+    """
+    (soft, hard) de la cache de recomendaciones de una oferta; hard nunca menor que soft.
+    """
+    soft = int(oferta.get("cache_ttl_soft") or TTL_MATCH_SECONDS)
+    hard = int(oferta.get("cache_ttl_hard") or TTL_MATCH_HARD_SECONDS)
+    return soft, max(soft, hard)
 
 
 def _puesto_por_oferta_id(oferta_id: str) -> str:
@@ -18,18 +71,14 @@ def _puesto_por_oferta_id(oferta_id: str) -> str:
     return mapa.get(oferta_id, "")
 
 
-def enrich_from_mongo(db: Database, candidatos_por_nombre: Iterable[str]) -> List[Dict]:
+async def enrich_from_mongo(db: AsyncIOMotorDatabase, candidatos_por_nombre: Iterable[str]) -> List[Dict]:
     """
     Devuelve perfiles compactos desde Mongo por nombre (nombre_apellido).
     """
     if db is None or not candidatos_por_nombre:
         return []
     cur = db.candidatos.find(
-        {
-            "informacion_personal.nombre_apellido": {
-                "$in": list(set(candidatos_por_nombre))
-            }
-        },
+        filtro_nombres(candidatos_por_nombre),
         {
             "_id": 0,
             "informacion_personal.nombre_apellido": 1,
@@ -37,8 +86,9 @@ def enrich_from_mongo(db: Database, candidatos_por_nombre: Iterable[str]) -> Lis
             "estado": 1,
             "habilidades.tecnicas": 1,
         },
+        collation=COLACION_NOMBRE,
     )
-    return list(cur)
+    return await cur.to_list(length=None)
 
 
 def explain_match(cand_doc: Dict, requerimientos: List[str]) -> Dict:
@@ -61,89 +111,253 @@ def explain_match(cand_doc: Dict, requerimientos: List[str]) -> Dict:
     return {"matches": matches, "total": total}
 
 
-def _buscar_oferta_en_mongo(db: Database, oferta_id: str) -> Dict:
+async def _buscar_oferta_en_mongo(db: AsyncIOMotorDatabase, oferta_id: str) -> Dict:
     """
-    Busca la oferta en Mongo por el 'puesto' exacto según el ID simbólico.
+    Busca la oferta en Mongo por el 'puesto' exacto según el ID simbólico o, si no es uno
+    de ellos, por _id (ofertas creadas con POST /posiciones o por el generador de datos).
     """
     if db is None or not oferta_id:
         return {}
     puesto = _puesto_por_oferta_id(oferta_id)
-    if not puesto:
-        return {}
-    return db.ofertas.find_one({"puesto": puesto}) or {}
+    if puesto:
+        return await db.ofertas.find_one({"puesto": puesto}) or {}
+    if ObjectId.is_valid(oferta_id):
+        return await db.ofertas.find_one({"_id": ObjectId(oferta_id)}) or {}
+    return {}
 
 
-def recompute_matches(
-    db: Database, graph: Graph, r: redis.Redis, oferta_id: str
+async def recompute_matches(
+    db: AsyncIOMotorDatabase, graph: AsyncDriver, r: aioredis.Redis, oferta_id: str
 ) -> List[Tuple[str, float]]:
     """
     Calcula afinidad para una oferta y escribe el ZSET en Redis.
     Retorna [(nombre, score)].
     """
-    # 1) Requerimientos de la oferta desde Mongo (por puesto exacto)
-    oferta = _buscar_oferta_en_mongo(db, oferta_id)
+    t0 = time.perf_counter()
+    try:
+        return await _recompute_matches(db, graph, r, oferta_id)
+    finally:
+        RECOMPUTE_SEGUNDOS.observe(time.perf_counter() - t0)
+
+
+async def _recompute_matches(
+    db: AsyncIOMotorDatabase, graph: AsyncDriver, r: aioredis.Redis, oferta_id: str
+) -> List[Tuple[str, float]]:
+    # 1) Requerimientos de la oferta desde Mongo (por puesto exacto) y
+    # 2) candidatos postulados a esa oferta en Neo4j (por nombre): son independientes, van en paralelo
+    oferta, rows = await asyncio.gather(
+        _buscar_oferta_en_mongo(db, oferta_id),
+        run_cypher(
+            graph,
+            """
+            MATCH (c:Candidato)-[:POSTULA_A]->(o:Oferta {id:$ofid})
+            RETURN DISTINCT c.nombre AS nombre
+            UNION
+            MATCH (c:Candidato)-[:POSTULO_A]->(o:Oferta {id:$ofid})
+            RETURN DISTINCT c.nombre AS nombre
+            """,
+            ofid=oferta_id,
+        ),
+    )
     reqs = [x.get("habilidad") for x in (oferta.get("requerimientos") or [])]
     reqs = [x for x in reqs if x]
-
-    # 2) Candidatos postulados a esa oferta en Neo4j (por nombre)
-    rows = graph.run(
-        """
-        MATCH (c:Candidato)-[:POSTULA_A]->(o:Oferta {id:$ofid})
-        RETURN DISTINCT c.nombre AS nombre
-        UNION
-        MATCH (c:Candidato)-[:POSTULO_A]->(o:Oferta {id:$ofid})
-        RETURN DISTINCT c.nombre AS nombre
-        """,
-        ofid=oferta_id,
-    ).data()
     cand_nombres = [row["nombre"] for row in rows]
+    versiones = await r.mget([clave_version(n) for n in cand_nombres]) if cand_nombres else []
 
     # 3) Enriquecimiento Mongo
-    perfiles = enrich_from_mongo(db, cand_nombres)
+    perfiles = await enrich_from_mongo(db, cand_nombres)
 
     # 4) Calcular score y cargar Redis
     zkey = f"cache:match:{oferta_id}"
-    r.delete(zkey)
-    resultados: List[Tuple[str, float]] = []
-    for p in perfiles:
-        nombre = p["informacion_personal"]["nombre_apellido"]
-        info = explain_match(p, reqs)
-        s = float(info["total"])  # mínimo 1 si no hay matches
-        resultados.append((nombre, s))
+    meta_key = clave_meta(oferta_id)
+    soft, hard = _ttls_oferta(oferta)
+    # Puntaje de todos los postulados en una sola pasada (mismo total que explain_match)
+    totales = score_bulk(perfiles, reqs)  # mínimo 1 si no hay matches
+    resultados: List[Tuple[str, float]] = [
+        (p["informacion_personal"]["nombre_apellido"], float(t))
+        for p, t in zip(perfiles, totales.tolist())
+    ]
+    # índice inverso candidato -> ofertas + delete + zadd + expire + vencimiento soft + aviso a
+    # quienes esperan, en un único round trip (MULTI/EXEC): los lectores nunca ven el ZSET a medio
+    # escribir ni el índice inverso desfasado del ZSET
+    pipe = r.pipeline(transaction=True)
+    for nombre, _s in resultados:
+        pipe.sadd(f"cand:{nombre}:ofertas", oferta_id)
+        pipe.expire(f"cand:{nombre}:ofertas", hard)
+    pipe.delete(zkey, meta_key)
     if resultados:
-        r.zadd(zkey, dict(resultados))
-        r.expire(zkey, TTL_MATCH_SECONDS)
+        pipe.zadd(zkey, dict(resultados))
+        pipe.hset(meta_key, mapping={
+            "fresco_hasta": time.time() + soft,
+            "reqs": json.dumps(reqs, ensure_ascii=False),
+        })
+        pipe.expire(zkey, hard)
+        pipe.expire(meta_key, hard)
+    pipe.publish(_canal_listo(oferta_id), len(resultados))
+    await pipe.execute()
+
+    # 5) Candidatos cuyo perfil cambió entre la lectura de Mongo y la escritura del ZSET: su
+    # ZADD XX incremental pudo llegar antes y quedar pisado. Se releen y se vuelven a puntuar.
+    if cand_nombres:
+        despues = await r.mget([clave_version(n) for n in cand_nombres])
+        cambiados = [n for n, antes, ahora in zip(cand_nombres, versiones, despues) if antes != ahora]
+        if cambiados:
+            frescos = await enrich_from_mongo(db, cambiados)
+            nuevos = {
+                p["informacion_personal"]["nombre_apellido"]: float(t)
+                for p, t in zip(frescos, score_bulk(frescos, reqs).tolist())
+            }
+            if nuevos:
+                await r.zadd(zkey, nuevos, xx=True)
+                resultados = [(n, nuevos.get(n, sc)) for n, sc in resultados]
     return resultados
 
 
-def get_recommendations(
-    db: Database, graph: Graph, r: redis.Redis, oferta_id: str
+async def get_recommendations(
+    db: AsyncIOMotorDatabase, graph: AsyncDriver, r: aioredis.Redis, oferta_id: str
 ) -> Dict:
     """
-    Fast-path: leer desde Redis. Si no hay, usar lock, recalcular (Neo4j+Mongo),
-    poblar Redis y devolver.
+    Fast-path: leer desde Redis. Si el ZSET pasó su TTL soft se sirve igual
+    (source "redis-stale") y se dispara un único refresh en segundo plano.
+    Si no hay, recalcular (Neo4j+Mongo) una sola vez:
+      - dentro del proceso, los requests concurrentes comparten el mismo recompute;
+      - entre procesos, gana quien toma el lock y el resto espera su aviso por pub/sub.
     """
     zkey = f"cache:match:{oferta_id}"
-    recs = r.zrange(zkey, 0, -1, withscores=True)
+    pipe = r.pipeline(transaction=False)
+    pipe.zrange(zkey, 0, -1, withscores=True)
+    pipe.hget(clave_meta(oferta_id), "fresco_hasta")
+    recs, fresco_hasta = await pipe.execute()
     if recs:
+        source = "redis"
+        if fresco_hasta is not None and time.time() > float(fresco_hasta):
+            source = "redis-stale"
+            _refrescar_en_fondo(db, graph, r, oferta_id)
+        cache("match", "redis", "stale" if source == "redis-stale" else "hits")
         nombres = [n for (n, _s) in recs]
-        perfiles = enrich_from_mongo(db, nombres)
-        return {"source": "redis", "recs": recs, "perfiles": perfiles}
+        perfiles = await enrich_from_mongo(db, nombres)
+        return {"source": source, "recs": recs, "perfiles": perfiles}
+
+    cache("match", "redis", "misses")
+    source, recs = await _recomputes.ejecutar(
+        oferta_id, lambda: _recompute_o_esperar(db, graph, r, oferta_id)
+    )
+    perfiles = await enrich_from_mongo(db, [n for (n, _s) in recs])
+    return {"source": source, "recs": recs, "perfiles": perfiles}
+
+
+def _refrescar_en_fondo(
+    db: AsyncIOMotorDatabase, graph: AsyncDriver, r: aioredis.Redis, oferta_id: str
+) -> None:
+    """
+    Lanza el refresh de un ZSET vencido (soft) sin bloquear al request.
+    Un solo refresh por oferta: el singleflight lo deduplica dentro del proceso
+    y el lock de Redis entre procesos (si otro worker ya refresca, no se hace nada).
+    Usa su propia clave de singleflight: un request en frío que se sumara a este vuelo
+    recibiría el ("redis-stale", []) de cuando el lock lo tiene otro worker.
+    """
+    clave = f"refresco:{oferta_id}"
+    if _recomputes.en_vuelo(oferta_id) or _recomputes.en_vuelo(clave):
+        return
+
+    async def _refrescar():
+        lock = LockRedis(r, f"lock:match:{oferta_id}", LOCK_MATCH_MS)
+        if not await lock.adquirir():
+            return "redis-stale", []
+        try:
+            return "recomputed", await recompute_matches(db, graph, r, oferta_id)
+        finally:
+            await lock.liberar()
+
+    async def _tarea():
+        try:
+            await _recomputes.ejecutar(clave, _refrescar)
+        except Exception as e:
+            print(f"ERROR refrescando recomendaciones de {oferta_id}:", repr(e))
+
+    tarea = asyncio.create_task(_tarea())
+    _refrescos.add(tarea)
+    tarea.add_done_callback(_refrescos.discard)
+
+
+async def _recompute_o_esperar(
+    db: AsyncIOMotorDatabase, graph: AsyncDriver, r: aioredis.Redis, oferta_id: str
+) -> Tuple[str, List[Tuple[str, float]]]:
+    """
+    Recalcula si este worker consigue el lock de la oferta; si no, espera a que el dueño
+    escriba el ZSET (aviso pub/sub) y lo lee. Retorna (source, recs).
+    """
+    zkey = f"cache:match:{oferta_id}"
+    lock = LockRedis(r, f"lock:match:{oferta_id}", LOCK_MATCH_MS)
+    if await lock.adquirir():
+        try:
+            return "recomputed", await recompute_matches(db, graph, r, oferta_id)
+        finally:
+            await lock.liberar()
+
+    async def _listo() -> bool:
+        return bool(await r.exists(zkey))
 
-    lock_key = f"lock:match:{oferta_id}"
-    locked = r.set(lock_key, "worker", nx=True, ex=10)
-    if locked:
-        resultados = recompute_matches(db, graph, r, oferta_id)
-        perfiles = enrich_from_mongo(db, [n for (n, _s) in resultados])
-        return {"source": "recomputed", "recs": resultados, "perfiles": perfiles}
+    await esperar_notificacion(
+        r, _canal_listo(oferta_id), _listo, lock.key, ESPERA_MATCH_SECONDS
+    )
+    return "delayed-redis", await r.zrange(zkey, 0, -1, withscores=True)
+
+
+def actualizar_score_candidato(r: redis.Redis, perfil: Dict) -> int:
+    """
+    Recalcula el score de UN candidato en cada cache:match:* de las ofertas donde figura
+    (índice inverso cand:{nombre}:ofertas), con un ZADD XX por oferta y sin recompute completo.
+    `perfil` es el documento actualizado (informacion_personal.nombre_apellido + habilidades.tecnicas).
+    Retorna la cantidad de ZSETs actualizados.
+    """
+    if not perfil:
+        return 0
+    return actualizar_scores_candidatos(r, [perfil])
+
+
+def actualizar_scores_candidatos(r: redis.Redis, perfiles: List[Dict]) -> int:
+    """
+    Igual que actualizar_score_candidato para varios perfiles, en tres round trips en total
+    (ofertas de cada candidato, requerimientos de cada oferta, ZADD XX).
+    Retorna la cantidad de ZADD enviados.
+    """
+    perfiles = [p for p in perfiles or [] if p]
+    if r is None or not perfiles:
+        return 0
+
+    # La versión se incrementa junto con la lectura del índice inverso: un recompute en curso
+    # que no llegue a verse acá lo detecta por la versión y vuelve a puntuar al candidato
+    pipe = r.pipeline(transaction=False)
+    for perfil in perfiles:
+        nombre = perfil["informacion_personal"]["nombre_apellido"]
+        pipe.incr(clave_version(nombre))
+        pipe.expire(clave_version(nombre), TTL_MATCH_HARD_SECONDS)
+        pipe.smembers(f"cand:{nombre}:ofertas")
+    ofertas_por_perfil = [sorted(o) for o in pipe.execute()[2::3]]
+    ofertas = sorted({o for lista in ofertas_por_perfil for o in lista})
+    if not ofertas:
+        return 0
 
-    import time
+    pipe = r.pipeline(transaction=False)
+    for oferta_id in ofertas:
+        pipe.hget(clave_meta(oferta_id), "reqs")
+    reqs = {o: json.loads(x) for o, x in zip(ofertas, pipe.execute()) if x is not None}
 
-    time.sleep(2)
-    recs = r.zrange(zkey, 0, -1, withscores=True)
-    nombres = [n for (n, _s) in recs]
-    perfiles = enrich_from_mongo(db, nombres)
-    return {"source": "delayed-redis", "recs": recs, "perfiles": perfiles}
+    pipe = r.pipeline(transaction=False)
+    n = 0
+    for perfil, ofertas_cand in zip(perfiles, ofertas_por_perfil):
+        nombre = perfil["informacion_personal"]["nombre_apellido"]
+        for oferta_id in ofertas_cand:
+            if oferta_id not in reqs:
+                continue  # ZSET vencido: lo reconstruye el próximo recompute
+            total = explain_match(perfil, reqs[oferta_id])["total"]
+            # XX: solo actualiza si el candidato sigue en el ZSET (no recrea uno vencido)
+            pipe.zadd(f"cache:match:{oferta_id}", {nombre: float(total)}, xx=True)
+            n += 1
+    if n:
+        pipe.execute()
+    return n
 
 
 def clear_offer_cache(r: redis.Redis, oferta_id: str) -> int:
@@ -153,4 +367,8 @@ def clear_offer_cache(r: redis.Redis, oferta_id: str) -> int:
     """
     if r is None or not oferta_id:
         return 0
-    return r.delete(f"cache:match:{oferta_id}")
\ No newline at end of file
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(f"cache:match:{oferta_id}")
+    pipe.delete(clave_meta(oferta_id))
+    borrados, _meta = pipe.execute()
+    return borrados
\ No newline at end of file
@@ -0,0 +1,408 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId, json_util
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+import redis
+
+from app.services.indice_ofertas import reconstruir_indice
+from app.services.indice_usuarios import reconstruir_indice_usuarios
+
+# Dataset sintético con la forma de insertar_Mongo.js / insertar_Neo4j.cql, a escala:
+#   - popularidad de skills Zipf (pocas skills muy comunes, cola larga de skills raras)
+#   - postulados por oferta con ley de potencias (Pareto): la mayoría pocas, algunas miles
+#   - los _id se derivan del tipo y el número de documento (sin tablas de ids en memoria),
+#     así las postulaciones e inscripciones referencian candidatos sin releerlos
+# Se genera por lotes: 1M de candidatos no se arma nunca entero en memoria.
+SKILLS_BASE = [
+    "python", "sql", "excel", "javascript", "java", "git", "power bi", "node.js", "react",
+    "mongodb", "apis rest", "docker", "aws", "machine learning", "estadística", "linux",
+    "typescript", "express", "kubernetes", "tensorflow", "fastapi", "redis", "neo4j", "c#",
+    ".net", "php", "go", "scala", "spark", "airflow", "tableau", "figma", "scrum", "azure",
+    "gcp", "terraform", "angular", "vue", "django", "flask", "pandas", "numpy", "pytorch",
+    "análisis de datos", "data analysis", "kotlin", "swift", "rust", "graphql", "jenkins",
+]
+NOMBRES = [
+    "rosario", "marcos", "camila", "lucía", "julián", "tomás", "valentina", "santiago", "martina",
+    "mateo", "sofía", "benjamín", "agustina", "joaquín", "florencia", "nicolás", "micaela", "franco",
+]
+APELLIDOS = [
+    "martinez", "pereyra", "gebara", "fernández", "torres", "herrera", "ruiz", "lópez", "gómez",
+    "rodríguez", "díaz", "romero", "sosa", "álvarez", "benítez", "acosta", "medina", "castro",
+]
+RESIDENCIAS = ["CABA", "Santa Fe", "Córdoba", "Rosario", "Mendoza", "La Plata", "Remoto"]
+INDUSTRIAS = ["Software", "Consultoría", "Tecnología", "Finanzas", "Salud", "Retail", "Educación"]
+MODALIDADES = ["remoto", "presencial", "híbrido"]
+ESTADOS_POSTULACION = ["aplicado", "en proceso", "rechazado"]
+FORMATOS_CURSO = ["video", "pdf", "live"]
+
+# Un byte por tipo de documento en el ObjectId: (timestamp fijo | tipo | número)
+_TIPOS = {"empresa": 1, "curso": 2, "oferta": 3, "candidato": 4}
+_TS = int(datetime(2024, 1, 1).timestamp()).to_bytes(4, "big")
+_BASE = datetime(2024, 1, 1)
+
+# Neo4j: nodos y aristas del modelo de insertar_Neo4j.cql, en sentencias UNWIND
+CYPHER_CARGA = {
+    "empresas": """
+        UNWIND $filas AS f
+        MERGE (e:Empresa {id:f.id}) SET e.nombre = f.nombre, e.industria = f.industria
+    """,
+    "cursos": """
+        UNWIND $filas AS f
+        MERGE (c:Curso {id:f.id}) SET c.titulo = f.titulo, c.formato = f.formato, c.duracion_h = f.duracion_h
+    """,
+    "ofertas": """
+        UNWIND $filas AS f
+        MERGE (o:Oferta {id:f.id})
+        SET o.puesto = f.puesto, o.modalidad = f.modalidad, o.estado = f.estado, o.requisitos = f.requisitos
+        WITH o, f
+        MATCH (e:Empresa {id:f.empresa})
+        MERGE (e)-[:PUBLICO]->(o)
+    """,
+    "candidatos": """
+        UNWIND $filas AS f
+        MERGE (c:Candidato {id:f.id})
+        SET c.nombre = f.nombre, c.estado = 'activo', c.residencia = f.residencia, c.habilidades = f.habilidades
+    """,
+    "postulo_a": """
+        UNWIND $filas AS f
+        MATCH (c:Candidato {id:f.candidato}), (o:Oferta {id:f.oferta})
+        MERGE (c)-[:POSTULO_A {estado:f.estado, fecha:f.fecha}]->(o)
+    """,
+}
+CONSTRAINTS = [
+    "CREATE CONSTRAINT candidato_id IF NOT EXISTS FOR (c:Candidato) REQUIRE c.id IS UNIQUE",
+    "CREATE CONSTRAINT empresa_id IF NOT EXISTS FOR (e:Empresa) REQUIRE e.id IS UNIQUE",
+    "CREATE CONSTRAINT oferta_id IF NOT EXISTS FOR (o:Oferta) REQUIRE o.id IS UNIQUE",
+    "CREATE CONSTRAINT curso_id IF NOT EXISTS FOR (c:Curso) REQUIRE c.id IS UNIQUE",
+]
+
+
+def oid(tipo: str, i: int) -> ObjectId:
+    return ObjectId(_TS + bytes([_TIPOS[tipo]]) + i.to_bytes(7, "big"))
+
+
+def nombre_candidato(i: int) -> str:
+    n = len(NOMBRES)
+    return f"{NOMBRES[i % n]} {APELLIDOS[(i // n) % len(APELLIDOS)]} {i}"
+
+
+class ConfigGenerador:
+    def __init__(
+        self,
+        candidatos: int = 10_000,
+        ofertas: int = 1_000,
+        empresas: int = 100,
+        cursos: int = 200,
+        skills: int = 300,
+        zipf_s: float = 1.1,
+        postulados_alpha: float = 1.3,
+        postulados_min: int = 3,
+        skills_por_candidato: float = 5.0,
+        inscripciones_por_candidato: float = 0.5,
+        versiones_por_candidato: float = 1.0,
+        batch: int = 5_000,
+        seed: int = 42,
+    ):
+        self.candidatos = candidatos
+        self.ofertas = ofertas
+        self.empresas = empresas
+        self.cursos = cursos
+        self.skills = max(skills, 1)
+        self.zipf_s = zipf_s
+        self.postulados_alpha = postulados_alpha
+        self.postulados_min = postulados_min
+        self.skills_por_candidato = skills_por_candidato
+        self.inscripciones_por_candidato = inscripciones_por_candidato
+        self.versiones_por_candidato = versiones_por_candidato
+        self.batch = batch
+        self.seed = seed
+
+
+class Generador:
+    """
+    Produce (colección, lote de documentos) en orden de dependencia: empresas, cursos, ofertas,
+    candidatos (+ versiones_perfil, contadores_version, inscripciones) y postulaciones (+ aristas
+    POSTULO_A del grafo, colección "postulo_a").
+    """
+
+    def __init__(self, cfg: ConfigGenerador):
+        self.cfg = cfg
+        self.rng = np.random.default_rng(cfg.seed)
+        extra = [f"skill {i}" for i in range(max(0, cfg.skills - len(SKILLS_BASE)))]
+        self.vocab = np.array((SKILLS_BASE + extra)[: cfg.skills], dtype=object)
+        # Zipf: la skill de rango k tiene peso 1 / k^s
+        pesos = 1.0 / np.arange(1, len(self.vocab) + 1) ** cfg.zipf_s
+        self.p_skills = pesos / pesos.sum()
+
+    # -------- Helpers --------
+    def _skills(self, cantidades: np.ndarray) -> List[List[str]]:
+        """
+        Skills Zipf sin repetir para cada candidato/oferta (cantidades[i] = cuántas pedir).
+        Se sortea todo el lote de una vez, con reemplazo, y se deduplica por fila.
+        """
+        total = int(cantidades.sum())
+        idx = self.rng.choice(len(self.vocab), size=total, p=self.p_skills)
+        out, pos = [], 0
+        for k in cantidades:
+            out.append(list(dict.fromkeys(self.vocab[idx[pos:pos + k]])))
+            pos += k
+        return out
+
+    def _lotes(self, total: int):
+        for inicio in range(0, total, self.cfg.batch):
+            yield inicio, min(inicio + self.cfg.batch, total)
+
+    def _fecha(self, dias_max: int) -> datetime:
+        return _BASE + timedelta(days=int(self.rng.integers(0, dias_max)), minutes=int(self.rng.integers(0, 1440)))
+
+    # -------- Colecciones --------
+    def empresas(self) -> Iterator[Tuple[str, List[Dict]]]:
+        for a, b in self._lotes(self.cfg.empresas):
+            yield "empresas", [
+                {
+                    "_id": oid("empresa", i),
+                    "nombre": f"Empresa {i}",
+                    "industria": INDUSTRIAS[i % len(INDUSTRIAS)],
+                    "descripcion": None,
+                    "contacto": {"email": f"rrhh@empresa{i}.example.com"},
+                    "fecha_creacion": self._fecha(365),
+                }
+                for i in range(a, b)
+            ]
+
+    def cursos(self) -> Iterator[Tuple[str, List[Dict]]]:
+        for a, b in self._lotes(self.cfg.cursos):
+            skills = self.vocab[self.rng.choice(len(self.vocab), size=b - a, p=self.p_skills)]
+            yield "cursos", [
+                {
+                    "_id": oid("curso", i),
+                    "titulo": f"Curso {i}: {skill}",
+                    "formato": FORMATOS_CURSO[i % len(FORMATOS_CURSO)],
+                    "duracion_h": int(self.rng.integers(2, 40)),
+                    "etiquetas": skill,
+                    "contenido_url": f"https://cursos.example.com/{i}",
+                    "skill_asociada": skill,
+                }
+                for i, skill in zip(range(a, b), skills)
+            ]
+
+    def ofertas(self) -> Iterator[Tuple[str, List[Dict]]]:
+        for a, b in self._lotes(self.cfg.ofertas):
+            reqs = self._skills(self.rng.integers(3, 7, size=b - a))
+            yield "ofertas", [
+                {
+                    "_id": oid("oferta", i),
+                    "empresa_id": oid("empresa", int(self.rng.integers(0, max(self.cfg.empresas, 1)))),
+                    "puesto": f"Puesto {i}",
+                    "descripcion": None,
+                    "requerimientos": [{"habilidad": s, "nivel": int(self.rng.integers(5, 9))} for s in rs],
+                    "ubicacion": RESIDENCIAS[i % len(RESIDENCIAS)],
+                    "modalidad": MODALIDADES[i % len(MODALIDADES)],
+                    "estado": "abierta" if self.rng.random() < 0.8 else "cerrada",
+                    "experiencia_requerida": str(int(self.rng.integers(0, 6))),
+                    "fecha_creacion": self._fecha(700),
+                }
+                for i, rs in zip(range(a, b), reqs)
+            ]
+
+    def candidatos(self) -> Iterator[Tuple[str, List[Dict]]]:
+        cfg = self.cfg
+        for a, b in self._lotes(cfg.candidatos):
+            n = b - a
+            skills = self._skills(np.maximum(1, self.rng.poisson(cfg.skills_por_candidato, size=n)))
+            extras = self.rng.poisson(cfg.versiones_por_candidato, size=n)
+            cursos_por = self.rng.poisson(cfg.inscripciones_por_candidato, size=n) if cfg.cursos else np.zeros(n, int)
+            candidatos, versiones, contadores, inscripciones = [], [], [], []
+            for j, i in enumerate(range(a, b)):
+                cid = oid("candidato", i)
+                alta = self._fecha(700)
+                tecnicas = [{"nombre": s, "nivel": int(self.rng.integers(1, 11))} for s in skills[j]]
+                candidatos.append({
+                    "_id": cid,
+                    "informacion_personal": {
+                        "nombre_apellido": nombre_candidato(i),
+                        "email": f"candidato{i}@example.com",
+                        "celular": None,
+                        "residencia": RESIDENCIAS[int(self.rng.integers(0, len(RESIDENCIAS)))],
+                        "foto": None,
+                        "CV": None,
+                    },
+                    "estado": "activo",
+                    "fecha_creacion": alta,
+                    "fecha_ultima_actualizacion": alta,
+                    "experiencia_laboral": [],
+                    "experiencia_academica": [],
+                    "habilidades": {"tecnicas": tecnicas, "blandas": []},
+                    "ultimo_evento_seleccion": None,
+                })
+                n_versiones = 1 + int(extras[j])
+                for v in range(1, n_versiones + 1):
+                    versiones.append({
+                        "candidato_id": cid,
+                        "version": v,
+                        "fecha": alta + timedelta(days=v - 1),
+                        "cambio": "Creación de perfil inicial" if v == 1 else "Actualización de habilidades técnicas",
+                        "diff": None if v == 1 else {"habilidades": [t["nombre"] for t in tecnicas[: v - 1]]},
+                    })
+                contadores.append({"_id": cid, "version": n_versiones})
+                k = min(int(cursos_por[j]), cfg.cursos)
+                for curso in (self.rng.choice(cfg.cursos, size=k, replace=False) if k else []):
+                    progreso = int(self.rng.choice([0, 25, 50, 80, 100]))
+                    inscripciones.append({
+                        "candidato_id": cid,
+                        "curso_id": oid("curso", int(curso)),
+                        "progreso": progreso,
+                        "nota": int(self.rng.integers(4, 11)) if progreso == 100 else None,
+                        "fecha_inicio": alta,
+                        "fecha_fin": alta + timedelta(days=30) if progreso == 100 else None,
+                    })
+            yield "candidatos", candidatos
+            yield "versiones_perfil", versiones
+            yield "contadores_version", contadores
+            if inscripciones:
+                yield "inscripciones", inscripciones
+
+    def postulaciones(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Postulados por oferta ~ Pareto(alpha) * postulados_min, tope = total de candidatos.
+        """
+        cfg = self.cfg
+        if not cfg.candidatos:
+            return
+        docs, aristas = [], []
+        for o in range(cfg.ofertas):
+            n = int(min(cfg.candidatos, cfg.postulados_min * (1 + self.rng.pareto(cfg.postulados_alpha))))
+            oferta_id = oid("oferta", o)
+            for c in np.unique(self.rng.integers(0, cfg.candidatos, size=n)):
+                c = int(c)
+                estado = ESTADOS_POSTULACION[int(self.rng.integers(0, len(ESTADOS_POSTULACION)))]
+                fecha = self._fecha(700)
+                docs.append({
+                    "candidato_id": oid("candidato", c),
+                    "trabajo_id": oferta_id,
+                    "estado": estado,
+                    "fecha_creacion": fecha,
+                })
+                aristas.append({
+                    "candidato": str(oid("candidato", c)),
+                    "nombre": nombre_candidato(c),
+                    "oferta": str(oferta_id),
+                    "estado": estado,
+                    "fecha": fecha.date().isoformat(),
+                })
+            if len(docs) >= cfg.batch:
+                yield "postulaciones", docs
+                yield "postulo_a", aristas
+                docs, aristas = [], []
+        if docs:
+            yield "postulaciones", docs
+            yield "postulo_a", aristas
+
+    def lotes(self) -> Iterator[Tuple[str, List[Dict]]]:
+        yield from self.empresas()
+        yield from self.cursos()
+        yield from self.ofertas()
+        yield from self.candidatos()
+        yield from self.postulaciones()
+
+
+# ----------------------------
+# Destinos
+# ----------------------------
+def _fila_grafo(coleccion: str, doc: Dict) -> Optional[Dict]:
+    if coleccion == "empresas":
+        return {"id": str(doc["_id"]), "nombre": doc["nombre"], "industria": doc["industria"]}
+    if coleccion == "cursos":
+        return {"id": str(doc["_id"]), "titulo": doc["titulo"], "formato": doc["formato"],
+                "duracion_h": doc["duracion_h"]}
+    if coleccion == "ofertas":
+        return {"id": str(doc["_id"]), "puesto": doc["puesto"], "modalidad": doc["modalidad"],
+                "estado": doc["estado"], "empresa": str(doc["empresa_id"]),
+                "requisitos": [r["habilidad"] for r in doc["requerimientos"]]}
+    if coleccion == "candidatos":
+        return {"id": str(doc["_id"]), "nombre": doc["informacion_personal"]["nombre_apellido"],
+                "residencia": doc["informacion_personal"]["residencia"],
+                "habilidades": [t["nombre"] for t in doc["habilidades"]["tecnicas"]]}
+    if coleccion == "postulo_a":
+        return doc
+    return None
+
+
+def cargar(
+    cfg: ConfigGenerador,
+    db: Optional[Database] = None,
+    r: Optional[redis.Redis] = None,
+    graph=None,
+    directorio: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Genera el dataset y lo escribe en los destinos dados:
+      - db: insert_many(ordered=False) por lote (las aristas "postulo_a" no van a Mongo)
+      - graph (py2neo): constraints + UNWIND por lote
+      - r: al final reconstruye skill:{s}:users y skill:{s}:ofertas desde Mongo (requiere db)
+      - directorio: un NDJSON (JSON extendido de Mongo) por colección, para cargar_archivos
+    Retorna la cantidad de documentos por colección.
+    """
+    archivos = {}
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    if graph is not None:
+        for c in CONSTRAINTS:
+            graph.run(c)
+
+    conteo: Dict[str, int] = {}
+    try:
+        for coleccion, docs in Generador(cfg).lotes():
+            conteo[coleccion] = conteo.get(coleccion, 0) + len(docs)
+            if db is not None and coleccion != "postulo_a":
+                try:
+                    db[coleccion].insert_many(docs, ordered=False)
+                except BulkWriteError as e:
+                    # Re-ejecutar sobre una base ya cargada: los duplicados se ignoran
+                    otros = [x for x in e.details.get("writeErrors", []) if x.get("code") != 11000]
+                    if otros:
+                        raise
+            if graph is not None and coleccion in CYPHER_CARGA:
+                graph.run(CYPHER_CARGA[coleccion], filas=[_fila_grafo(coleccion, d) for d in docs])
+            if directorio:
+                if coleccion not in archivos:
+                    archivos[coleccion] = open(os.path.join(directorio, f"{coleccion}.ndjson"), "w", encoding="utf-8")
+                archivos[coleccion].write("".join(json_util.dumps(d) + "\n" for d in docs))
+    finally:
+        for fh in archivos.values():
+            fh.close()
+
+    if r is not None and db is not None:
+        reconstruir_indice_usuarios(db, r, batch_size=cfg.batch)
+        reconstruir_indice(db, r, batch_size=cfg.batch)
+    return conteo
+
+
+def cargar_archivos(directorio: str, db: Database, batch: int = 5_000) -> Dict[str, List[str]]:
+    """
+    Carga en `db` los NDJSON escritos por cargar(directorio=...) (p. ej. en mongomock para los
+    benchmarks) y devuelve las postulaciones del grafo como {oferta_id: [nombres]}.
+    """
+    postulaciones: Dict[str, List[str]] = {}
+    for archivo in sorted(os.listdir(directorio)):
+        if not archivo.endswith(".ndjson"):
+            continue
+        coleccion = archivo[: -len(".ndjson")]
+        lote = []
+        with open(os.path.join(directorio, archivo), encoding="utf-8") as fh:
+            for linea in fh:
+                doc = json_util.loads(linea)
+                if coleccion == "postulo_a":
+                    postulaciones.setdefault(doc["oferta"], []).append(doc["nombre"])
+                    continue
+                lote.append(doc)
+                if len(lote) >= batch:
+                    db[coleccion].insert_many(lote, ordered=False)
+                    lote = []
+        if lote:
+            db[coleccion].insert_many(lote, ordered=False)
+    return postulaciones
@@ -0,0 +1,257 @@
+import csv
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, EmailStr, ValidationError
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+import redis
+
+from app.services.cache_perfiles import TTL_PERFIL_SECONDS, clave_perfil, serializar
+from app.services.candidatos import (
+    CAMPO_NOMBRE,
+    COLACION_NOMBRE,
+    diff_alta,
+    documento_nuevo,
+    filtro_nombres,
+    normalizar_nombre,
+)
+from app.services.escritor_grafo import escritor_grafo
+from app.services.indice_usuarios import indexar_usuario
+from app.services.versiones import log_versions
+
+# Alta masiva de candidatos con la misma semántica que POST /users, pero por lotes:
+#   - duplicados: un find $in (índice con collation) por lote, más los repetidos dentro del archivo
+#   - Mongo: insert_many(ordered=False); un choque con el índice único queda como error de esa fila
+#   - Redis: un pipeline por lote (sets skill:{skill}:users + cache de perfil)
+#   - versiones_perfil: un insert_many por lote (log_versions con nuevos=True); si falla, los candidatos
+#     quedan creados sin su versión inicial y se informan en sin_versionar
+#   - Neo4j: se encola en el escritor de grafo, que lo escribe en sentencias UNWIND
+# Los errores se informan por fila (número de línea del archivo) y no frenan la importación. Un archivo que
+# no es UTF-8 corta la lectura en ese punto: lo leído antes queda importado y el resumen lo indica.
+FORMATOS = ("ndjson", "csv")
+SEPARADORES_SKILLS = (";", "|")
+MAX_ERRORES = 1000  # detalle de errores devuelto; el total se cuenta siempre
+
+
+class FilaCandidato(BaseModel):
+    # Mismos campos que UserIn de POST /users
+    nombre: str
+    email: EmailStr
+    celular: Optional[str] = None
+    residencia: Optional[str] = None
+    skills: List[str] = []
+
+
+def _skills_csv(valor: Optional[str]) -> List[str]:
+    valor = valor or ""
+    for sep in SEPARADORES_SKILLS:
+        valor = valor.replace(sep, ",")
+    return [s for s in valor.split(",") if s.strip()]
+
+
+def leer_ndjson(lineas: Iterable[str]) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    (número de línea, fila, error) por cada línea no vacía.
+    """
+    for n, linea in enumerate(lineas, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield n, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(fila, dict):
+            yield n, None, "Se esperaba un objeto JSON por línea"
+            continue
+        yield n, fila, None
+
+
+def leer_csv(lineas: Iterable[str]) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    CSV con encabezado: nombre,email,celular,residencia,skills (skills separadas por ";", "|" o ",").
+    """
+    lector = csv.DictReader(lineas)
+    for fila in lector:
+        n = lector.line_num
+        if not any((v or "").strip() for v in fila.values() if isinstance(v, str)):
+            continue
+        fila = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in fila.items() if k}
+        fila["skills"] = _skills_csv(fila.get("skills"))
+        for campo in ("celular", "residencia"):
+            if not fila.get(campo):
+                fila[campo] = None
+        yield n, fila, None
+
+
+def _normalizar(fila: Dict) -> Tuple[str, Dict]:
+    u = FilaCandidato(**fila)
+    nombre = normalizar_nombre(u.nombre)
+    if not nombre:
+        raise ValueError("nombre vacío")
+    skills = []
+    for s in u.skills:
+        s = s.strip().lower()
+        if s and s not in skills:
+            skills.append(s)
+    return nombre, documento_nuevo(nombre, u.email, u.celular, u.residencia, skills)
+
+
+def _mensaje(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+class _Resultado:
+    def __init__(self):
+        self.recibidos = 0
+        self.creados = 0
+        self.lotes = 0
+        self.errores_total = 0
+        self.errores: List[Dict] = []
+        self.sin_indexar = 0
+        self.sin_versionar = 0
+        self.abortado: Optional[str] = None
+
+    def error(self, fila: int, nombre: Optional[str], error: str):
+        self.errores_total += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({"fila": fila, "nombre": nombre, "error": error})
+
+    def dict(self) -> Dict:
+        out = {
+            "ok": self.abortado is None,
+            "recibidos": self.recibidos,
+            "creados": self.creados,
+            "rechazados": self.errores_total,
+            "lotes": self.lotes,
+            "errores": sorted(self.errores, key=lambda e: e["fila"]),
+        }
+        if self.sin_indexar:
+            # El alta en Mongo quedó hecha; reconstruir con `cli.py reindex-usuarios`
+            out["sin_indexar_en_redis"] = self.sin_indexar
+        if self.sin_versionar:
+            # Creados sin la versión "Usuario creado" en versiones_perfil
+            out["sin_versionar"] = self.sin_versionar
+        if self.abortado:
+            out["error"] = self.abortado
+        return out
+
+
+def _importar_lote(db: Database, r: redis.Redis, lote: List[Tuple[int, str, Dict]], res: _Resultado):
+    # 1) Los que ya existen en Mongo (un find por lote, por el índice con collation)
+    existentes = {
+        normalizar_nombre(d["informacion_personal"]["nombre_apellido"])
+        for d in db.candidatos.find(
+            filtro_nombres(n for _f, n, _d in lote), {CAMPO_NOMBRE: 1, "_id": 0}, collation=COLACION_NOMBRE
+        )
+    }
+    nuevos = []
+    for fila, nombre, doc in lote:
+        if nombre in existentes:
+            res.error(fila, nombre, "El usuario ya existe")
+        else:
+            nuevos.append((fila, nombre, doc))
+    if not nuevos:
+        return
+
+    # 2) Mongo: los _id se asignan antes de insertar; los que fallan salen de writeErrors
+    fallidos = set()
+    try:
+        db.candidatos.insert_many([d for _f, _n, d in nuevos], ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            fallidos.add(err["index"])
+            fila, nombre, _d = nuevos[err["index"]]
+            msg = "El usuario ya existe" if err.get("code") == 11000 else err.get("errmsg", "Error de Mongo")
+            res.error(fila, nombre, msg)
+    creados = [x for i, x in enumerate(nuevos) if i not in fallidos]
+    if not creados:
+        return
+    res.creados += len(creados)
+
+    # 3) Redis: índices por skill + cache de perfil, en un round trip
+    try:
+        pipe = r.pipeline(transaction=False)
+        for _f, nombre, doc in creados:
+            indexar_usuario(pipe, nombre, [t["nombre"] for t in doc["habilidades"]["tecnicas"]])
+            pipe.setex(clave_perfil(nombre), TTL_PERFIL_SECONDS, serializar(doc))
+        pipe.execute()
+    except Exception as e:
+        print("ERROR importación (Redis):", repr(e))
+        res.sin_indexar += len(creados)
+
+    # 4) Versionado: un insert_many para todo el lote
+    try:
+        log_versions(
+            db, [(doc["_id"], "Usuario creado", diff_alta(doc)) for _f, _n, doc in creados], nuevos=True
+        )
+    except Exception as e:
+        print("ERROR importación (versiones):", repr(e))
+        res.sin_versionar += len(creados)
+
+    # 5) Neo4j (write-behind)
+    escritor_grafo.encolar_varios("usuario", [
+        {
+            "nombre": nombre,
+            "email": doc["informacion_personal"]["email"],
+            "celular": doc["informacion_personal"]["celular"],
+            "residencia": doc["informacion_personal"]["residencia"],
+        }
+        for _f, nombre, doc in creados
+    ])
+    escritor_grafo.encolar_varios("habilidad", [
+        {"nombre": nombre, "skill": t["nombre"]}
+        for _f, nombre, doc in creados
+        for t in doc["habilidades"]["tecnicas"]
+    ])
+
+
+def importar_candidatos(
+    db: Database,
+    r: redis.Redis,
+    lineas: Iterable[str],
+    formato: str = "ndjson",
+    batch_size: int = 1000,
+) -> Dict:
+    """
+    Importa candidatos desde líneas NDJSON o CSV, de a `batch_size` filas. `lineas` se consume de a
+    una (archivo abierto, stream del request): nunca se carga el archivo entero.
+    Retorna el resumen: recibidos, creados, rechazados y el detalle de errores por fila.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato} (válidos: {', '.join(FORMATOS)})")
+    filas = leer_csv(lineas) if formato == "csv" else leer_ndjson(lineas)
+
+    res = _Resultado()
+    vistos = set()
+    lote: List[Tuple[int, str, Dict]] = []
+    try:
+        for n, fila, error in filas:
+            res.recibidos += 1
+            if error:
+                res.error(n, None, error)
+                continue
+            try:
+                nombre, doc = _normalizar(fila)
+            except (ValidationError, ValueError, TypeError) as e:
+                res.error(n, fila.get("nombre"), _mensaje(e))
+                continue
+            if nombre in vistos:
+                res.error(n, nombre, "Repetido en el archivo")
+                continue
+            vistos.add(nombre)
+            lote.append((n, nombre, doc))
+            if len(lote) >= batch_size:
+                _importar_lote(db, r, lote, res)
+                res.lotes += 1
+                lote = []
+    except UnicodeDecodeError as e:
+        res.abortado = f"El archivo debe estar en UTF-8 (lectura cortada tras {res.recibidos} filas): {e}"
+    if lote:
+        _importar_lote(db, r, lote, res)
+        res.lotes += 1
+    return res.dict()
@@ -0,0 +1,182 @@
+import uuid
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo.database import Database
+import redis
+import redis.asyncio as aioredis
+
+from app.services.reconstruccion import (
+    ReconstruccionEnCurso,
+    abortar,
+    intercambiar,
+    registrar_toque,
+    renovar,
+    tmp as _tmp,
+    tomar,
+)
+
+# Índice invertido skill -> ofertas abiertas, en Redis:
+#   skill:{skill}:ofertas  ZSET  member=oferta_id, score=veces que la oferta pide la skill
+#   oferta:{oferta_id}:skills  SET  skills con las que quedó indexada (para poder desindexarla)
+#   indice:ofertas:listo  marca de que el índice fue construido al menos una vez
+MARCA_INDICE = "indice:ofertas:listo"
+
+
+def _skills_oferta(requerimientos: Optional[Iterable[Dict]]) -> Counter:
+    """
+    Skills normalizadas (strip + lower) de los requerimientos de una oferta, con multiplicidad.
+    """
+    skills = [
+        (req.get("habilidad") or "").strip().lower()
+        for req in (requerimientos or [])
+        if isinstance(req, dict)
+    ]
+    return Counter(s for s in skills if s)
+
+
+def _esta_abierta(estado: Optional[str]) -> bool:
+    return (estado or "abierta") == "abierta"
+
+
+# (Re)indexación atómica de una oferta: leer las skills previas y reemplazarlas en un solo paso, para
+# que dos PUT concurrentes no dejen la oferta en ZSETs de skills que ya no pide.
+# KEYS[1] = {prefijo}oferta:{id}:skills; ARGV = oferta_id, prefijo de claves, skill, veces, skill, veces...
+_LUA_INDEXAR = """
+local previas = redis.call('smembers', KEYS[1])
+for _, s in ipairs(previas) do
+    redis.call('zrem', ARGV[2] .. 'skill:' .. s .. ':ofertas', ARGV[1])
+end
+redis.call('del', KEYS[1])
+for i = 3, #ARGV, 2 do
+    redis.call('zadd', ARGV[2] .. 'skill:' .. ARGV[i] .. ':ofertas', ARGV[i + 1], ARGV[1])
+    redis.call('sadd', KEYS[1], ARGV[i])
+end
+return (#ARGV - 2) / 2
+"""
+INDICE = "ofertas"  # nombre del índice para el lock y los toques de app/services/reconstruccion.py
+
+
+def _indexar(pipe, oferta_id: str, skills: Counter, prefijo: str = ""):
+    args = [oferta_id, prefijo]
+    for s, veces in skills.items():
+        args += [s, veces]
+    pipe.eval(_LUA_INDEXAR, 1, f"{prefijo}oferta:{oferta_id}:skills", *args)
+
+
+def indexar_oferta(
+    r: redis.Redis, oferta_id: str, requerimientos: Optional[Iterable[Dict]], estado: Optional[str]
+) -> int:
+    """
+    (Re)indexa una oferta: la quita de las skills anteriores y, si está abierta, la agrega
+    a las de sus requerimientos actuales. Retorna la cantidad de skills indexadas.
+    Llamar después de escribir la oferta en Mongo (un rebuild en curso la relee de ahí).
+    """
+    skills = _skills_oferta(requerimientos) if _esta_abierta(estado) else Counter()
+    pipe = r.pipeline(transaction=True)
+    registrar_toque(pipe, INDICE, oferta_id)
+    _indexar(pipe, oferta_id, skills)
+    pipe.execute()
+    return len(skills)
+
+
+def desindexar_oferta(r: redis.Redis, oferta_id: str) -> int:
+    """
+    Quita una oferta del índice (al borrarla o cerrarla).
+    """
+    return indexar_oferta(r, oferta_id, None, "cerrada")
+
+
+def reconstruir_indice(db: Database, r: redis.Redis, batch_size: int = 1000) -> int:
+    """
+    Reconstruye el índice completo desde Mongo (ofertas abiertas) sin dejarlo vacío mientras tanto,
+    igual que reconstruir_indice_usuarios: carga claves temporales por lotes y al final las
+    renombra sobre las reales en un MULTI/EXEC, borrando las que ya no corresponden.
+    Las ofertas que la API reindexa mientras tanto se releen de Mongo antes del intercambio
+    (app/services/reconstruccion.py). ReconstruccionEnCurso si ya hay otro rebuild.
+    Retorna ofertas indexadas.
+    """
+    gen = tomar(r, INDICE)
+    ofertas = 0
+    pendientes = 0
+    pipe = r.pipeline(transaction=False)
+    cur = db.ofertas.find(
+        {"$or": [{"estado": "abierta"}, {"estado": None}]},
+        {"_id": 1, "requerimientos": 1},
+        batch_size=batch_size,
+    )
+    try:
+        for o in cur:
+            oferta_id = str(o["_id"])
+            propias = _skills_oferta(o.get("requerimientos"))
+            if not propias:
+                continue
+            for s, veces in propias.items():
+                pipe.zadd(_tmp(gen, f"skill:{s}:ofertas"), {oferta_id: veces})
+            pipe.sadd(_tmp(gen, f"oferta:{oferta_id}:skills"), *propias)
+            ofertas += 1
+            pendientes += 1
+            if pendientes >= batch_size:
+                pipe.execute()
+                renovar(r, INDICE, gen)
+                pendientes = 0
+        pipe.execute()
+
+        def reaplicar(ids: Set[str]):
+            docs = {
+                str(o["_id"]): o for o in db.ofertas.find(
+                    {"_id": {"$in": [ObjectId(i) for i in ids if ObjectId.is_valid(i)]}},
+                    {"_id": 1, "requerimientos": 1, "estado": 1},
+                )
+            }
+            p = r.pipeline(transaction=False)
+            for oferta_id in ids:
+                o = docs.get(oferta_id)  # None: la borraron
+                skills = Counter()
+                if o is not None and _esta_abierta(o.get("estado")):
+                    skills = _skills_oferta(o.get("requerimientos"))
+                _indexar(p, oferta_id, skills, _tmp(gen, ""))
+            p.execute()
+
+        intercambiar(
+            r, INDICE, gen, ("skill:*:ofertas", "oferta:*:skills"), reaplicar,
+            extra=lambda swap: swap.set(MARCA_INDICE, 1),
+        )
+    except Exception:
+        abortar(r, INDICE, gen)
+        raise
+    return ofertas
+
+
+def asegurar_indice(db: Database, r: redis.Redis) -> Optional[int]:
+    """
+    Construye el índice si nunca se construyó (primer arranque o Redis vaciado).
+    Retorna las ofertas indexadas, o None si ya existía o si otro worker lo está construyendo.
+    """
+    if r.exists(MARCA_INDICE):
+        return None
+    try:
+        return reconstruir_indice(db, r)
+    except ReconstruccionEnCurso:
+        return None
+
+
+async def top_ofertas_por_skills(
+    r: aioredis.Redis, skills: Iterable[str], k: int
+) -> List[Tuple[str, float]]:
+    """
+    Top-K ofertas por coincidencias con `skills`, sobre todo el catálogo.
+    ZUNIONSTORE suma, por oferta, cuántos requerimientos cubre el usuario; el ranking
+    se resuelve en Redis y solo viajan las K ofertas. Retorna [(oferta_id, coincidencias)].
+    """
+    keys = [f"skill:{s}:ofertas" for s in sorted(set(skills)) if s]
+    if not keys or k <= 0:
+        return []
+    tmp = f"tmp:match:ofertas:{uuid.uuid4().hex}"
+    pipe = r.pipeline(transaction=False)
+    pipe.zunionstore(tmp, keys)
+    pipe.zrange(tmp, 0, k - 1, desc=True, withscores=True)
+    pipe.delete(tmp)
+    _n, top, _del = await pipe.execute()
+    return top
@@ -0,0 +1,111 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+from pymongo.database import Database
+import redis
+
+from app.services.candidatos import CAMPO_NOMBRE, COLACION_NOMBRE, filtro_nombres, normalizar_nombre
+from app.services.reconstruccion import abortar, intercambiar, registrar_toque, renovar, tomar
+
+# Índice skill -> usuarios, en Redis:
+#   skill:{skill}:users  SET  nombres (normalizados) de los candidatos que tienen la skill
+INDICE = "usuarios"  # nombre del índice para el lock y los toques de app/services/reconstruccion.py
+
+
+def skills_de(tecnicas: Optional[Iterable[Dict]]) -> List[str]:
+    """
+    Skills normalizadas (strip + lower, sin repetir) de habilidades.tecnicas.
+    """
+    skills = {
+        (t.get("nombre") or "").strip().lower()
+        for t in (tecnicas or [])
+        if isinstance(t, dict)
+    }
+    return sorted(s for s in skills if s)
+
+
+def indexar_usuario(pipe, nombre: str, skills: Iterable[str]):
+    """
+    Encola en `pipe` (pipeline de Redis) el alta del usuario en cada skill:{skill}:users.
+    No ejecuta: el caller junta esto con el resto de sus escrituras en un solo round trip.
+    Llamar después de escribir el candidato en Mongo (un rebuild en curso lo relee de ahí).
+    """
+    registrar_toque(pipe, INDICE, normalizar_nombre(nombre))
+    for s in skills:
+        pipe.sadd(f"skill:{s}:users", nombre)
+
+
+def desindexar_usuario(pipe, nombre: str, skills: Iterable[str]):
+    registrar_toque(pipe, INDICE, normalizar_nombre(nombre))
+    for s in skills:
+        pipe.srem(f"skill:{s}:users", nombre)
+
+
+def reconstruir_indice_usuarios(db: Database, r: redis.Redis, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Reconstruye todos los skill:{skill}:users desde Mongo sin dejar el índice vacío mientras tanto:
+      1. recorre `candidatos` en lotes y carga los sets en claves temporales (pipeline por lote)
+      2. relee de Mongo los usuarios que la API indexó o desindexó mientras tanto
+      3. en una transacción MULTI/EXEC renombra cada temporal sobre su clave final (RENAME)
+         y borra los sets de skills que ya no tiene ningún candidato; si la API escribe en el
+         medio, se vuelve a 2 (app/services/reconstruccion.py): no se pierde ninguna escritura
+    Un solo rebuild a la vez: ReconstruccionEnCurso si ya hay otro.
+    Retorna {"usuarios": ..., "skills": ..., "reaplicados": ...}.
+    """
+    gen = tomar(r, INDICE)
+
+    skills: Set[str] = set()
+    usuarios = 0
+    pendientes = 0  # usuarios encolados en `pipe` desde el último execute
+    pipe = r.pipeline(transaction=False)
+    cur = db.candidatos.find(
+        {},
+        {"_id": 0, "informacion_personal.nombre_apellido": 1, "habilidades.tecnicas.nombre": 1},
+        batch_size=batch_size,
+    )
+    try:
+        for c in cur:
+            nombre = normalizar_nombre((c.get("informacion_personal") or {}).get("nombre_apellido"))
+            propias = skills_de((c.get("habilidades") or {}).get("tecnicas"))
+            if not nombre or not propias:
+                continue
+            for s in propias:
+                pipe.sadd(_tmp(gen, s), nombre)
+            skills.update(propias)
+            usuarios += 1
+            pendientes += 1
+            if pendientes >= batch_size:
+                pipe.execute()
+                renovar(r, INDICE, gen)
+                pendientes = 0
+        pipe.execute()
+
+        def reaplicar(nombres: Set[str]):
+            actuales = {
+                normalizar_nombre((c.get("informacion_personal") or {}).get("nombre_apellido")):
+                    skills_de((c.get("habilidades") or {}).get("tecnicas"))
+                for c in db.candidatos.find(
+                    filtro_nombres(nombres),
+                    {"_id": 0, CAMPO_NOMBRE: 1, "habilidades.tecnicas.nombre": 1},
+                    collation=COLACION_NOMBRE,
+                )
+            }
+            # No hay índice inverso usuario -> skills: se lo saca de todos los sets temporales
+            temporales = list(r.scan_iter(match=_tmp(gen, "*"), count=1000))
+            p = r.pipeline(transaction=False)
+            for nombre in nombres:
+                for k in temporales:
+                    p.srem(k, nombre)
+                for s in actuales.get(nombre, []):
+                    p.sadd(_tmp(gen, s), nombre)
+                    skills.add(s)
+            p.execute()
+
+        reaplicados = intercambiar(r, INDICE, gen, ("skill:*:users",), reaplicar)
+    except Exception:
+        abortar(r, INDICE, gen)
+        raise
+    return {"usuarios": usuarios, "skills": len(skills), "reaplicados": reaplicados}
+
+
+def _tmp(gen: str, skill: str) -> str:
+    return f"tmp:{gen}:skill:{skill}:users"
@@ -0,0 +1,189 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.database import Database
+
+from app.services.candidatos import COLACION_NOMBRE, filtro_nombre, filtro_nombres
+from app.services.ofertas import codificar_cursor, decodificar_cursor
+
+# Índices requeridos por las consultas de app/api, por colección.
+# Cada entrada: (keys, opciones de create_index)
+INDICES: Dict[str, List[tuple]] = {
+    "candidatos": [
+        # Alta / lookup / update / delete por nombre, sin distinguir mayúsculas: las consultas
+        # pasan la misma collation (app/services/candidatos.py) para poder usarlo
+        ([("informacion_personal.nombre_apellido", ASCENDING)],
+         {"name": "nombre_apellido_ci", "unique": True, "collation": COLACION_NOMBRE}),
+    ],
+    "empresas": [
+        ([("nombre", ASCENDING)], {"name": "nombre", "unique": True}),
+    ],
+    "cursos": [
+        ([("titulo", ASCENDING)], {"name": "titulo", "unique": True}),
+    ],
+    "inscripciones": [
+        # Una inscripción por (candidato, curso); el prefijo sirve a /inscripciones/usuario/{nombre}
+        ([("candidato_id", ASCENDING), ("curso_id", ASCENDING)], {"name": "candidato_curso", "unique": True}),
+    ],
+    "ofertas": [
+        # Recomendaciones: oferta por "puesto" (ID simbólico); no es único entre empresas
+        ([("puesto", ASCENDING)], {"name": "puesto"}),
+        # Listado paginado de /posiciones: orden (fecha_creacion, _id) con y sin filtros
+        ([("fecha_creacion", DESCENDING), ("_id", DESCENDING)], {"name": "fecha_id"}),
+        ([("empresa_id", ASCENDING), ("fecha_creacion", DESCENDING), ("_id", DESCENDING)],
+         {"name": "empresa_fecha_id"}),
+        ([("estado", ASCENDING), ("fecha_creacion", DESCENDING), ("_id", DESCENDING)],
+         {"name": "estado_fecha_id"}),
+        ([("empresa_id", ASCENDING), ("estado", ASCENDING), ("fecha_creacion", DESCENDING), ("_id", DESCENDING)],
+         {"name": "empresa_estado_fecha_id"}),
+    ],
+    "versiones_perfil": [
+        # Historial ordenado por versión; unique: dos escritores nunca registran el mismo número
+        ([("candidato_id", ASCENDING), ("version", ASCENDING)],
+         {"name": "candidato_version", "unique": True}),
+    ],
+}
+
+
+# Índices reemplazados por otros de INDICES, por colección. Se eliminan una vez creado su reemplazo.
+OBSOLETOS: Dict[str, List[str]] = {
+    # Unique exacto sobre el nombre: el índice con collation lo cubre (y es más estricto)
+    "candidatos": ["nombre_apellido"],
+}
+
+
+def _eliminar_obsoletos(db: Database, coleccion: str) -> List[str]:
+    existentes = db[coleccion].index_information()
+    eliminados = []
+    for nombre in OBSOLETOS.get(coleccion, []):
+        if nombre in existentes:
+            db[coleccion].drop_index(nombre)
+            eliminados.append(nombre)
+    return eliminados
+
+
+def asegurar_indices(db: Database) -> Dict[str, List[str]]:
+    """
+    Crea (idempotente) los índices declarados en INDICES y elimina los OBSOLETOS de la colección
+    si todos sus índices se crearon (si el reemplazo falla, el índice viejo se conserva).
+    Retorna {coleccion: [nombres de índice]}; un índice que no se pudo crear (p. ej. unique sobre
+    datos con duplicados) se informa como "ERROR <nombre>: <motivo>" (ver indices_fallidos).
+    """
+    out: Dict[str, List[str]] = {}
+    for coleccion, indices in INDICES.items():
+        nombres = []
+        for keys, opciones in indices:
+            try:
+                nombres.append(db[coleccion].create_index(keys, **opciones))
+            except Exception as e:
+                print(f"Error creando índice {opciones.get('name')} en {coleccion}:", e)
+                nombres.append(f"ERROR {opciones.get('name')}: {e}")
+        if not indices_fallidos({coleccion: nombres}):
+            try:
+                for nombre in _eliminar_obsoletos(db, coleccion):
+                    print(f"Índice obsoleto {nombre} eliminado de {coleccion}")
+            except Exception as e:
+                print(f"Error eliminando índices obsoletos de {coleccion}:", e)
+                nombres.append(f"ERROR obsoletos: {e}")
+        out[coleccion] = nombres
+    return out
+
+
+def indices_fallidos(creados: Dict[str, List[str]]) -> List[str]:
+    """Entradas de asegurar_indices que no se pudieron crear."""
+    return [n for nombres in creados.values() for n in nombres if n.startswith("ERROR ")]
+
+
+# Cursor de ejemplo de /posiciones: el filtro keyset ($or sobre fecha_creacion/_id) que arma
+# ofertas.decodificar_cursor para la página siguiente
+_CURSOR = decodificar_cursor(codificar_cursor(datetime(2024, 1, 1), ObjectId()))
+_ORDEN_OFERTAS = [("fecha_creacion", DESCENDING), ("_id", DESCENDING)]
+
+# Formas de consulta de app/api y app/services que tienen que resolverse con un índice.
+# Cada entrada: nombre -> (colección, filtro, sort[, collation]). Los valores son de ejemplo: el plan
+# elegido depende de la forma del filtro, no de que el documento exista.
+CONSULTAS: Dict[str, tuple] = {
+    # Los mismos filtros y collation que arman candidatos.filtro_nombre / filtro_nombres
+    "candidato por nombre": ("candidatos", filtro_nombre("Ejemplo Nombre"), None, COLACION_NOMBRE),
+    "candidatos por nombres ($in)": (
+        "candidatos", filtro_nombres(["Nombre A", "nombre b"]), None, COLACION_NOMBRE),
+    "empresa por nombre": ("empresas", {"nombre": "ejemplo"}, None),
+    "curso por titulo": ("cursos", {"titulo": "ejemplo"}, None),
+    "inscripcion por candidato y curso": (
+        "inscripciones", {"candidato_id": ObjectId(), "curso_id": ObjectId()}, None),
+    "inscripciones de un candidato": ("inscripciones", {"candidato_id": ObjectId()}, None),
+    "oferta por puesto": ("ofertas", {"puesto": "ejemplo"}, None),
+    "ofertas paginadas": ("ofertas", {}, _ORDEN_OFERTAS),
+    "ofertas paginadas (cursor)": ("ofertas", _CURSOR, _ORDEN_OFERTAS),
+    "ofertas por estado (cursor)": ("ofertas", {"$and": [{"estado": "abierta"}, _CURSOR]}, _ORDEN_OFERTAS),
+    # ?puesto= es un regex sin anclar: no acota el índice, pero no debe caer en COLLSCAN ni SORT
+    "ofertas por puesto (regex)": (
+        "ofertas", {"puesto": {"$regex": "ejemplo", "$options": "i"}}, _ORDEN_OFERTAS),
+    "ofertas por puesto (regex, cursor)": (
+        "ofertas", {"$and": [{"puesto": {"$regex": "ejemplo", "$options": "i"}}, _CURSOR]}, _ORDEN_OFERTAS),
+    "ofertas de una empresa": (
+        "ofertas", {"empresa_id": ObjectId()}, [("fecha_creacion", DESCENDING), ("_id", DESCENDING)]),
+    "ofertas por estado": (
+        "ofertas", {"estado": "abierta"}, [("fecha_creacion", DESCENDING), ("_id", DESCENDING)]),
+    "ofertas de una empresa por estado": (
+        "ofertas", {"empresa_id": ObjectId(), "estado": "abierta"},
+        [("fecha_creacion", DESCENDING), ("_id", DESCENDING)]),
+    "historial de versiones": (
+        "versiones_perfil", {"candidato_id": ObjectId()}, [("version", ASCENDING)]),
+    "ultima version": (
+        "versiones_perfil", {"candidato_id": ObjectId()}, [("version", DESCENDING)]),
+}
+
+
+def _etapas(plan) -> List[str]:
+    """
+    Todas las etapas (stage) de un plan de explain(), recorriendo inputStage(s)/queryPlan.
+    """
+    etapas: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            etapas.append(plan["stage"])
+        for v in plan.values():
+            etapas.extend(_etapas(v))
+    elif isinstance(plan, list):
+        for v in plan:
+            etapas.extend(_etapas(v))
+    return etapas
+
+
+def explicar(
+    db: Database, coleccion: str, filtro: dict, sort: Optional[list] = None, collation=None
+) -> List[str]:
+    """
+    Etapas del plan ganador de un find (explain, verbosity queryPlanner: no ejecuta la consulta).
+    """
+    cmd = {"find": coleccion, "filter": filtro}
+    if sort:
+        cmd["sort"] = dict(sort)
+    if collation is not None:
+        cmd["collation"] = collation.document
+    res = db.command("explain", cmd, verbosity="queryPlanner")
+    return _etapas(res["queryPlanner"]["winningPlan"])
+
+
+def verificar_indices(db: Database) -> List[Dict]:
+    """
+    Corre explain() sobre cada forma de CONSULTAS y reporta si usa un índice.
+    ok=False (regresión) si el plan tiene COLLSCAN, no tiene IXSCAN/IDHACK, o tiene un SORT en memoria.
+    """
+    out = []
+    for nombre, (coleccion, filtro, sort, *collation) in CONSULTAS.items():
+        try:
+            etapas = explicar(db, coleccion, filtro, sort, *collation)
+        except Exception as e:
+            out.append({"consulta": nombre, "coleccion": coleccion, "ok": False, "error": repr(e)})
+            continue
+        ok = (
+            "COLLSCAN" not in etapas
+            and "SORT" not in etapas
+            and any(e in ("IXSCAN", "IDHACK", "EXPRESS_IXSCAN") for e in etapas)
+        )
+        out.append({"consulta": nombre, "coleccion": coleccion, "ok": ok, "etapas": etapas})
+    return out
@@ -0,0 +1,225 @@
+import contextvars
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import REGISTRY, multiprocess
+from py2neo import Graph
+from pymongo import monitoring
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline as PipelineAsync
+from redis.client import Pipeline
+
+# Métricas de Prometheus del worker, expuestas en GET /metrics:
+#   talentum_request_segundos{endpoint, metodo, status}      latencia de cada request
+#   talentum_backend_segundos{backend, operacion, endpoint}  cada llamada a Mongo / Redis / Neo4j
+#   talentum_cache_total{cache, nivel, resultado}            aciertos y fallos de cache:match:* y user:*
+#   talentum_recompute_segundos                              duración de recompute_matches
+# `endpoint` es la ruta declarada (p. ej. /users/{nombre}), no la URL: la cardinalidad queda acotada.
+# Con varios workers, definir PROMETHEUS_MULTIPROC_DIR (un directorio vacío) para que /metrics sume
+# los de todos los procesos.
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_BUCKETS_BACKEND = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REQUEST_SEGUNDOS = Histogram(
+    "talentum_request_segundos", "Latencia de los requests HTTP", ["endpoint", "metodo", "status"]
+)
+BACKEND_SEGUNDOS = Histogram(
+    "talentum_backend_segundos", "Latencia de las llamadas a Mongo, Redis y Neo4j",
+    ["backend", "operacion", "endpoint"], buckets=_BUCKETS_BACKEND,
+)
+BACKEND_ERRORES = Counter(
+    "talentum_backend_errores_total", "Llamadas a backends que fallaron", ["backend", "operacion", "endpoint"]
+)
+CACHE_TOTAL = Counter(
+    "talentum_cache_total", "Consultas a los caches por resultado", ["cache", "nivel", "resultado"]
+)
+RECOMPUTE_SEGUNDOS = Histogram(
+    "talentum_recompute_segundos", "Duración de recompute_matches (Neo4j + Mongo + puntaje + Redis)",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+# Scope ASGI del request en curso. La ruta se resuelve después del middleware (en el router),
+# por eso se guarda el scope y se lee scope["route"] recién al registrar cada llamada.
+# run_in_threadpool y Motor copian el contexto: el endpoint llega también a los threads.
+_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("metricas_scope", default=None)
+
+
+def endpoint_actual() -> str:
+    scope = _scope.get()
+    if scope is None:
+        return "fuera_de_request"
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "sin_ruta"
+
+
+def observar(backend: str, operacion: str, segundos: float, error: bool = False):
+    endpoint = endpoint_actual()
+    BACKEND_SEGUNDOS.labels(backend, operacion, endpoint).observe(segundos)
+    if error:
+        BACKEND_ERRORES.labels(backend, operacion, endpoint).inc()
+
+
+def cache(cache: str, nivel: str, resultado: str):
+    CACHE_TOTAL.labels(cache, nivel, resultado).inc()
+
+
+# Oyentes de cada consulta Cypher terminada (query, params, segundos): el equivalente para Neo4j
+# de los CommandListener de pymongo (p. ej. el registro de operaciones lentas).
+_oyentes_cypher: List[Callable[[str, Dict, float], None]] = []
+
+
+def registrar_oyente_cypher(oyente: Callable[[str, Dict, float], None]):
+    if oyente not in _oyentes_cypher:
+        _oyentes_cypher.append(oyente)
+
+
+def cypher_terminado(query: str, params: Dict, segundos: float):
+    for oyente in _oyentes_cypher:
+        try:
+            oyente(query, params, segundos)
+        except Exception as e:
+            print("ERROR en oyente de Cypher:", repr(e))
+
+
+def exponer() -> bytes:
+    """
+    Texto de Prometheus con las métricas del worker (o de todos, en modo multiproceso).
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+# ----------------------------
+# Requests
+# ----------------------------
+class MiddlewareMetricas:
+    """
+    Middleware ASGI: publica el scope para las métricas de backends y mide cada request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _scope.set(scope)
+        status = {"code": 500}
+
+        async def enviar(msg):
+            if msg["type"] == "http.response.start":
+                status["code"] = msg["status"]
+            await send(msg)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            REQUEST_SEGUNDOS.labels(endpoint_actual(), scope["method"], str(status["code"])).observe(
+                time.perf_counter() - t0
+            )
+            _scope.reset(token)
+
+
+# ----------------------------
+# Mongo (pymongo / Motor): command monitoring
+# ----------------------------
+class MonitorComandosMongo(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        observar("mongo", event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        observar("mongo", event.command_name, event.duration_micros / 1e6, error=True)
+
+
+# ----------------------------
+# Redis: clientes que miden cada comando y cada pipeline
+# ----------------------------
+class PipelineMedido(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        operacion = "multi" if self.transaction else "pipeline"
+        t0 = time.perf_counter()
+        try:
+            res = super().execute(raise_on_error)
+        except Exception:
+            observar("redis", operacion, time.perf_counter() - t0, error=True)
+            raise
+        observar("redis", operacion, time.perf_counter() - t0)
+        return res
+
+
+class RedisMedido(redis.Redis):
+    def execute_command(self, *args, **options):
+        t0 = time.perf_counter()
+        try:
+            res = super().execute_command(*args, **options)
+        except Exception:
+            observar("redis", str(args[0]).lower(), time.perf_counter() - t0, error=True)
+            raise
+        observar("redis", str(args[0]).lower(), time.perf_counter() - t0)
+        return res
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return PipelineMedido(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class PipelineMedidoAsync(PipelineAsync):
+    async def execute(self, raise_on_error: bool = True):
+        operacion = "multi" if self.is_transaction else "pipeline"
+        t0 = time.perf_counter()
+        try:
+            res = await super().execute(raise_on_error)
+        except Exception:
+            observar("redis", operacion, time.perf_counter() - t0, error=True)
+            raise
+        observar("redis", operacion, time.perf_counter() - t0)
+        return res
+
+
+class RedisMedidoAsync(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        t0 = time.perf_counter()
+        try:
+            res = await super().execute_command(*args, **options)
+        except Exception:
+            observar("redis", str(args[0]).lower(), time.perf_counter() - t0, error=True)
+            raise
+        observar("redis", str(args[0]).lower(), time.perf_counter() - t0)
+        return res
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return PipelineMedidoAsync(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# ----------------------------
+# Neo4j (py2neo): Graph.run medido
+# ----------------------------
+class GrafoMedido(Graph):
+    def run(self, cypher, parameters=None, **kwparameters):
+        operacion = (cypher.strip().split(None, 1) or ["run"])[0].lower()
+        t0 = time.perf_counter()
+        try:
+            res = super().run(cypher, parameters, **kwparameters)
+        except Exception:
+            observar("neo4j", operacion, time.perf_counter() - t0, error=True)
+            raise
+        segundos = time.perf_counter() - t0
+        observar("neo4j", operacion, segundos)
+        cypher_terminado(cypher, dict(parameters or {}, **kwparameters), segundos)
+        return res
@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+
+def lookup_empresa(campo: str = "empresa_nombre") -> List[Dict]:
+    """
+    Etapas de aggregation que agregan a cada oferta el nombre de su empresa en `campo`
+    ("" si la empresa no existe), resolviendo el join en el servidor en vez de un
+    find_one por oferta.
+    """
+    return [
+        {"$lookup": {
+            "from": "empresas",
+            "localField": "empresa_id",
+            "foreignField": "_id",
+            "as": "_empresa",
+        }},
+        {"$addFields": {
+            campo: {"$ifNull": [{"$arrayElemAt": ["$_empresa.nombre", 0]}, ""]},
+        }},
+        {"$project": {"_empresa": 0}},
+    ]
+
+
+def codificar_cursor(fecha: Optional[datetime], _id: ObjectId) -> str:
+    """
+    Token opaco de paginación con la clave (fecha_creacion, _id) de la última oferta devuelta.
+    """
+    raw = json.dumps({"f": fecha.isoformat() if fecha else None, "i": str(_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(token: str) -> Dict:
+    """
+    Traduce un token de codificar_cursor al filtro keyset "ofertas posteriores en el orden
+    (fecha_creacion desc, _id desc)". Lanza ValueError si el token es inválido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        fecha = datetime.fromisoformat(data["f"]) if data["f"] else None
+        _id = ObjectId(data["i"])
+    except Exception as e:
+        raise ValueError(f"cursor inválido: {e}")
+
+    if fecha is None:
+        # En orden descendente las ofertas sin fecha van al final: solo queda desempatar por _id
+        return {"fecha_creacion": None, "_id": {"$lt": _id}}
+    return {"$or": [
+        {"fecha_creacion": {"$lt": fecha}},
+        {"fecha_creacion": fecha, "_id": {"$lt": _id}},
+        {"fecha_creacion": None},
+    ]}
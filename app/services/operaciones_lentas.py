@@ -0,0 +1,408 @@
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from bson.regex import Regex
+from pymongo import monitoring
+
+from app.services.conexion_nosql import _env_float, _env_int, gestor
+from app.services.metricas import endpoint_actual, registrar_oyente_cypher
+
+# Registro de operaciones lentas: todo comando de Mongo o consulta Cypher que tarde más de
+# LENTAS_UMBRAL_MS queda en la lista de Redis `lentas:ops` (las últimas LENTAS_MAX) con:
+#   - su forma normalizada (valores reemplazados por "?": los datos no se guardan) y una huella
+#     de la forma para agrupar, los parámetros de Cypher solo con su tipo,
+#   - el endpoint que la ejecutó y la duración,
+#   - para una muestra (LENTAS_PLAN_MUESTREO, a lo sumo LENTAS_PLANES_POR_MIN por minuto y una vez
+#     por forma cada LENTAS_PLAN_CADA_S), el plan: explain("executionStats") en Mongo; PROFILE en
+#     Cypher de lectura y EXPLAIN en Cypher que escribe (PROFILE la ejecutaría de nuevo).
+# Lo que se guarda en memoria está acotado: la última vez que se pidió plan por forma (a lo sumo
+# LENTAS_FORMAS_MAX, LRU) y los comandos de Mongo en curso (a lo sumo LENTAS_EN_CURSO_MAX, y se
+# olvidan pasados LENTAS_EN_CURSO_S sin respuesta).
+# La detección corre en el thread del request (solo compara la duración); explain, PROFILE y la
+# escritura en Redis los hace un thread de fondo. Se consulta con `scripts/cli.py slowlog`.
+CLAVE = "lentas:ops"
+
+# Comandos internos del driver o sin interés (y los explain que lanza este registro)
+_IGNORAR_MONGO = {
+    "explain", "hello", "ismaster", "isMaster", "ping", "buildInfo", "saslStart", "saslContinue",
+    "authenticate", "endSessions", "killCursors", "getLastError",
+}
+# Los explain de escrituras no modifican datos; aggregate con $out/$merge no se explica
+_EXPLICABLES_MONGO = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Campos de sesión/cluster del comando original que no van en la forma ni en el explain
+_CAMPOS_SESION = {
+    "lsid", "txnNumber", "autocommit", "startTransaction", "$clusterTime", "$db", "$readPreference",
+    "readConcern", "writeConcern", "signature",
+}
+# Campos de un explain con valores de la consulta
+_CAMPOS_CON_VALORES = {"parsedQuery", "filter", "indexBounds", "query", "q", "u", "$match"}
+
+_RE_CYPHER_ESCRITURA = re.compile(
+    r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|FOREACH|LOAD\s+CSV|CALL)\b", re.IGNORECASE
+)
+_RE_CYPHER_PLAN = re.compile(r"^\s*(PROFILE|EXPLAIN)\b", re.IGNORECASE)
+_RE_CYPHER_TEXTO = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_RE_CYPHER_NUMERO = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+# Argumentos del plan de Neo4j que describen el motor, no la consulta: se guardan tal cual
+_ARGS_PLAN_MOTOR = {
+    "version", "planner", "plannerimpl", "plannerversion", "runtime", "runtimeimpl", "runtimeversion",
+}
+
+
+def forma(valor):
+    """
+    Forma de un documento/consulta: mismas claves y operadores, valores reemplazados por "?".
+    Las listas se reducen a su primer elemento más la cantidad ($in de 500 nombres -> ["?", "... 500"]).
+    """
+    if isinstance(valor, dict):
+        return {k: forma(v) for k, v in valor.items() if k not in _CAMPOS_SESION}
+    if isinstance(valor, (list, tuple)):
+        if not valor:
+            return []
+        return [forma(valor[0])] + ([f"... {len(valor)}"] if len(valor) > 1 else [])
+    if isinstance(valor, (Regex, re.Pattern)):
+        return "/?/"
+    return "?"
+
+
+def forma_comando(comando: Dict) -> Dict:
+    """Forma de un comando de Mongo: conserva el nombre del comando y la colección."""
+    items = iter(comando.items())
+    nombre, coleccion = next(items)
+    out = {nombre: coleccion}
+    out.update(forma(dict(items)))
+    return out
+
+
+def forma_cypher(query: str) -> str:
+    query = _RE_CYPHER_TEXTO.sub("?", query)
+    query = _RE_CYPHER_NUMERO.sub("?", query)
+    return " ".join(query.split())
+
+
+def tipo_parametro(valor) -> str:
+    if isinstance(valor, (list, tuple)):
+        return f"list[{len(valor)}]"
+    if isinstance(valor, dict):
+        return "map"
+    return type(valor).__name__
+
+
+def huella(forma_op) -> str:
+    texto = forma_op if isinstance(forma_op, str) else json.dumps(forma_op, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode()).hexdigest()[:12]
+
+
+def _sin_valores(plan):
+    """Recorre un explain y reemplaza por su forma las partes con valores de la consulta."""
+    if isinstance(plan, dict):
+        return {k: forma(v) if k in _CAMPOS_CON_VALORES else _sin_valores(v) for k, v in plan.items()}
+    if isinstance(plan, list):
+        return [_sin_valores(x) for x in plan]
+    return plan
+
+
+def _resumir_explain(res: Dict) -> Dict:
+    res = {
+        k: v for k, v in res.items()
+        if k not in ("command", "serverInfo", "serverParameters", "ok", "$clusterTime", "operationTime")
+    }
+    stats = res.get("executionStats")
+    if isinstance(stats, dict):
+        res["executionStats"] = {k: v for k, v in stats.items() if k != "allPlansExecution"}
+    planner = res.get("queryPlanner")
+    if isinstance(planner, dict) and "rejectedPlans" in planner:
+        planner = dict(planner)
+        planner["rejectedPlans"] = len(planner["rejectedPlans"])
+        res["queryPlanner"] = planner
+    return _sin_valores(res)
+
+
+def _cypher_sin_valores(plan, clave: str = ""):
+    """Como _sin_valores, para planes de Neo4j: los textos (Details, expresiones) pasan por forma_cypher."""
+    if isinstance(plan, dict):
+        return {k: _cypher_sin_valores(v, k) for k, v in plan.items()}
+    if isinstance(plan, list):
+        return [_cypher_sin_valores(x, clave) for x in plan]
+    if isinstance(plan, str) and re.sub(r"[\s_-]", "", clave).lower() not in _ARGS_PLAN_MOTOR:
+        return forma_cypher(plan)
+    return plan
+
+
+def _plan_cypher(plan) -> Optional[Dict]:
+    """
+    Plan de py2neo (dict anidado) sin los objetos del driver, apto para JSON y sin los literales
+    de la consulta (los Details de cada operador pueden traer textos y números tal cual).
+    """
+    if plan is None:
+        return None
+    return _cypher_sin_valores(json.loads(json.dumps(plan, default=str)))
+
+
+class RegistroLento:
+    def __init__(self):
+        self.umbral_s = _env_float("LENTAS_UMBRAL_MS", 100) / 1000
+        self.max = _env_int("LENTAS_MAX", 1000)
+        self.muestreo_plan = _env_float("LENTAS_PLAN_MUESTREO", 0.25)
+        self.planes_por_min = _env_int("LENTAS_PLANES_POR_MIN", 6)
+        self.plan_cada_s = _env_float("LENTAS_PLAN_CADA_S", 600)
+        self.cola_max = _env_int("LENTAS_COLA_MAX", 1000)
+        self.formas_max = _env_int("LENTAS_FORMAS_MAX", 5000)
+        self.en_curso_max = _env_int("LENTAS_EN_CURSO_MAX", 10000)
+        self.en_curso_s = _env_float("LENTAS_EN_CURSO_S", 600)
+        self._activado = False
+        self._reiniciar()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reiniciar)
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        self._cola: "queue.Queue[Tuple[Dict, Optional[Dict]]]" = queue.Queue(self.cola_max)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._planes: deque = deque()  # momentos de los últimos planes (límite por minuto)
+        # huella -> momento del último plan, del más viejo al más nuevo
+        self._plan_por_forma: "OrderedDict[str, float]" = OrderedDict()
+        self.registradas = 0
+        self.descartadas = 0
+
+    @property
+    def activo(self) -> bool:
+        return self.umbral_s > 0
+
+    def activar(self):
+        """
+        Engancha el registro a pymongo/Motor (listener global: aplica a los clientes creados
+        después) y a las consultas Cypher de la capa de conexión.
+        """
+        if self.activo and not self._activado:
+            self._activado = True
+            monitoring.register(MonitorLentasMongo(self))
+            registrar_oyente_cypher(self.cypher)
+
+    # -------- Detección (thread del request) --------
+    def _quiere_plan(self, huella_op: str) -> bool:
+        if random.random() >= self.muestreo_plan:
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            while self._planes and ahora - self._planes[0] > 60:
+                self._planes.popleft()
+            if len(self._planes) >= self.planes_por_min:
+                return False
+            # Las formas con plan de hace más de plan_cada_s ya no frenan nada: se olvidan
+            formas = self._plan_por_forma
+            while formas and ahora - next(iter(formas.values())) >= self.plan_cada_s:
+                formas.popitem(last=False)
+            if huella_op in formas:
+                return False
+            while len(formas) >= self.formas_max:
+                formas.popitem(last=False)
+            self._planes.append(ahora)
+            formas[huella_op] = ahora
+            return True
+
+    def _encolar(self, entrada: Dict, plan: Optional[Dict]):
+        if self._pid != os.getpid():
+            self._reiniciar()
+        try:
+            self._cola.put_nowait((entrada, plan))
+        except queue.Full:
+            self.descartadas += 1
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="operaciones-lentas", daemon=True)
+                self._thread.start()
+
+    def _entrada(self, backend: str, operacion: str, forma_op, segundos: float) -> Dict:
+        return {
+            "backend": backend,
+            "operacion": operacion,
+            "forma": forma_op,
+            "huella": huella(forma_op),
+            "endpoint": endpoint_actual(),
+            "duracion_ms": round(segundos * 1000, 2),
+            "fecha": datetime.now(timezone.utc).isoformat(),
+        }
+
+    @staticmethod
+    def preparar_mongo(comando: Dict) -> Optional[Tuple[str, Optional[Dict], Optional[Dict]]]:
+        """
+        Lo que hace falta de un comando para registrarlo si resulta lento: (nombre, forma, explicar).
+        Si se le puede pedir el plan, el comando sin campos de sesión (la forma sale de ahí); si no,
+        solo su forma (los documentos de un insert no se retienen).
+        """
+        if not comando:
+            return None
+        nombre = next(iter(comando))
+        pipeline = comando.get("pipeline") or []
+        escribe = any("$out" in etapa or "$merge" in etapa for etapa in pipeline if isinstance(etapa, dict))
+        if nombre in _EXPLICABLES_MONGO and not escribe:
+            return nombre, None, {k: v for k, v in comando.items() if k not in _CAMPOS_SESION}
+        return nombre, forma_comando(comando), None
+
+    def mongo(self, base_datos: str, preparado: Tuple[str, Optional[Dict], Optional[Dict]], segundos: float):
+        if segundos < self.umbral_s:
+            return
+        nombre, forma_op, explicar = preparado
+        entrada = self._entrada("mongo", nombre, forma_op or forma_comando(explicar), segundos)
+        entrada["base_datos"] = base_datos
+        plan = None
+        if explicar is not None and self._quiere_plan(entrada["huella"]):
+            plan = {"base_datos": base_datos, "comando": explicar}
+        self._encolar(entrada, plan)
+
+    def cypher(self, query: str, params: Dict, segundos: float):
+        if segundos < self.umbral_s or _RE_CYPHER_PLAN.match(query):
+            return
+        entrada = self._entrada("neo4j", "cypher", forma_cypher(query), segundos)
+        entrada["parametros"] = {k: tipo_parametro(v) for k, v in (params or {}).items()}
+        plan = None
+        if self._quiere_plan(entrada["huella"]):
+            modo = "EXPLAIN" if _RE_CYPHER_ESCRITURA.search(query) else "PROFILE"
+            plan = {"modo": modo, "query": query, "params": params}
+        self._encolar(entrada, plan)
+
+    # -------- Thread de fondo: planes y escritura en Redis --------
+    def _plan_mongo(self, pedido: Dict) -> Dict:
+        db = gestor.mongo()
+        if db is None:
+            raise ConnectionError(gestor.error("mongo") or "Mongo no disponible")
+        res = db.client[pedido["base_datos"]].command(
+            {"explain": pedido["comando"], "verbosity": "executionStats"}
+        )
+        return {"modo": "executionStats", "explain": _resumir_explain(res)}
+
+    def _plan_neo4j(self, pedido: Dict) -> Dict:
+        graph = gestor.neo4j()
+        if graph is None:
+            raise ConnectionError(gestor.error("neo4j") or "Neo4j no disponible")
+        cursor = graph.run(f"{pedido['modo']} {pedido['query']}", pedido["params"])
+        cursor.data()  # el plan llega en el resumen, al consumir el resultado
+        return {"modo": pedido["modo"], "plan": _plan_cypher(cursor.plan())}
+
+    def _loop(self):
+        while True:
+            entrada, pedido = self._cola.get()
+            if pedido is not None:
+                try:
+                    if entrada["backend"] == "mongo":
+                        entrada["plan"] = self._plan_mongo(pedido)
+                    else:
+                        entrada["plan"] = self._plan_neo4j(pedido)
+                except Exception as e:
+                    entrada["plan"] = {"error": repr(e)}
+            r = gestor.redis()
+            if r is None:
+                self.descartadas += 1
+                continue
+            try:
+                pipe = r.pipeline(transaction=False)
+                # json (no json_util): las formas tienen claves como $regex o $date que json_util
+                # volvería a leer como tipos BSON
+                pipe.lpush(CLAVE, json.dumps(entrada, ensure_ascii=False, default=str))
+                pipe.ltrim(CLAVE, 0, self.max - 1)
+                pipe.execute()
+                self.registradas += 1
+            except Exception as e:
+                print("ERROR guardando operación lenta:", repr(e))
+                self.descartadas += 1
+
+
+class MonitorLentasMongo(monitoring.CommandListener):
+    """
+    Guarda lo necesario de cada operación en curso para poder registrarla si resulta lenta
+    (CommandSucceededEvent trae la duración pero no el comando). Un comando del que nunca llega
+    la respuesta (conexión perdida, listener registrado a mitad) se olvida pasados
+    LENTAS_EN_CURSO_S, y nunca se guardan más de LENTAS_EN_CURSO_MAX.
+    """
+
+    def __init__(self, registro: RegistroLento):
+        self.registro = registro
+        # (connection_id, request_id) -> (momento, base de datos, preparado), en orden de llegada
+        self._en_curso: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.olvidados = 0
+
+    def started(self, event):
+        if event.command_name in _IGNORAR_MONGO:
+            return
+        preparado = self.registro.preparar_mongo(event.command)
+        if preparado is None:
+            return
+        ahora = time.monotonic()
+        with self._lock:
+            en_curso = self._en_curso
+            while en_curso and (
+                len(en_curso) >= self.registro.en_curso_max
+                or ahora - next(iter(en_curso.values()))[0] >= self.registro.en_curso_s
+            ):
+                en_curso.popitem(last=False)
+                self.olvidados += 1
+            en_curso[(event.connection_id, event.request_id)] = (ahora, event.database_name, preparado)
+
+    def _terminar(self, event):
+        with self._lock:
+            en_curso = self._en_curso.pop((event.connection_id, event.request_id), None)
+        if en_curso is not None:
+            self.registro.mongo(en_curso[1], en_curso[2], event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._terminar(event)
+
+    def failed(self, event):
+        self._terminar(event)
+
+
+registro_lento = RegistroLento()
+
+
+def leer(r, limite: int = 50, backend: Optional[str] = None, endpoint: Optional[str] = None) -> List[Dict]:
+    """
+    Operaciones lentas registradas, la más reciente primero (filtradas sobre las últimas LENTAS_MAX).
+    """
+    out = []
+    for raw in r.lrange(CLAVE, 0, -1):
+        op = json.loads(raw)
+        if backend and op["backend"] != backend:
+            continue
+        if endpoint and op["endpoint"] != endpoint:
+            continue
+        out.append(op)
+        if len(out) >= limite:
+            break
+    return out
+
+
+def agrupar(ops: List[Dict]) -> List[Dict]:
+    """
+    Una fila por forma (huella): cantidad, duración máxima y mediana, endpoints y el último plan.
+    Ordenado por tiempo total.
+    """
+    grupos: Dict[str, Dict] = {}
+    for op in ops:
+        g = grupos.setdefault(op["huella"], {
+            "huella": op["huella"], "backend": op["backend"], "operacion": op["operacion"],
+            "forma": op["forma"], "duraciones": [], "endpoints": set(), "plan": None,
+        })
+        g["duraciones"].append(op["duracion_ms"])
+        g["endpoints"].add(op["endpoint"])
+        if g["plan"] is None and op.get("plan"):
+            g["plan"] = op["plan"]
+    out = []
+    for g in grupos.values():
+        d = sorted(g.pop("duraciones"))
+        g.update(n=len(d), total_ms=round(sum(d), 2), max_ms=d[-1], p50_ms=d[len(d) // 2],
+                 endpoints=sorted(g["endpoints"]))
+        out.append(g)
+    return sorted(out, key=lambda g: g["total_ms"], reverse=True)
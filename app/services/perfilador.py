@@ -0,0 +1,241 @@
+import cProfile
+import hmac
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app.services.conexion_nosql import _env_float, _env_int
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+except ImportError:  # sin pyinstrument se perfila con cProfile (determinista, más overhead)
+    Profiler = None
+
+# Perfilador de requests bajo demanda. Un request se perfila si:
+#   - trae el header X-Perfilar con el valor de ADMIN_TOKEN, o
+#   - trae ?perfilar=1 junto con el header X-Admin-Token (el token nunca va en la URL: quedaría en logs
+#     de acceso, historial y Referer), o
+#   - cae en el muestreo aleatorio PERFILADOR_MUESTREO (0..1, por defecto 0 = apagado).
+# El perfil (pyinstrument: muestreo estadístico del stack, también a través de los await) se guarda
+# con la ruta declarada en un ring buffer en memoria del worker (PERFILADOR_MAX perfiles) y se
+# descarga desde /admin/perfiles. La respuesta perfilada lleva el id en el header X-Perfil-Id.
+# Como mucho PERFILADOR_CONCURRENTES requests se perfilan a la vez por worker: el resto pasa sin perfilar.
+# Con cProfile es siempre 1: hay un solo perfilador activo por thread (sys.setprofile) y un segundo
+# enable() reemplaza al del request en curso, que quedaría con un perfil cortado.
+# Los endpoints sync corren en el threadpool y el perfilador solo ve el thread del event loop:
+# en esos casos el perfil muestra la espera, no el detalle.
+HEADER = "x-perfilar"
+HEADER_ADMIN = "x-admin-token"
+QUERY = "perfilar"
+VERDADEROS = ("1", "true", "si", "sí")
+FORMATOS = ("html", "texto", "speedscope", "pstats")
+
+
+class PerfilGuardado:
+    def __init__(self, id: int, ruta: str, metodo: str, path: str, status: int,
+                 duracion_s: float, motor: str, datos):
+        self.id = id
+        self.ruta = ruta
+        self.metodo = metodo
+        self.path = path
+        self.status = status
+        self.duracion_s = duracion_s
+        self.motor = motor
+        self.datos = datos  # Session de pyinstrument o dict de stats de cProfile
+        self.fecha = datetime.now(timezone.utc)
+
+    def resumen(self) -> Dict:
+        return {
+            "id": self.id,
+            "ruta": self.ruta,
+            "metodo": self.metodo,
+            "path": self.path,
+            "status": self.status,
+            "duracion_ms": round(self.duracion_s * 1000, 2),
+            "motor": self.motor,
+            "fecha": self.fecha,
+        }
+
+    def formatos(self) -> Tuple[str, ...]:
+        return ("html", "texto", "speedscope") if self.motor == "pyinstrument" else ("texto", "pstats")
+
+    def render(self, formato: str) -> Tuple[bytes, str]:
+        """
+        (contenido, media_type) del perfil. ValueError si el formato no aplica a su motor.
+        """
+        if formato not in self.formatos():
+            raise ValueError(f"Formato '{formato}' no disponible para perfiles de {self.motor}")
+        if formato == "html":
+            return HTMLRenderer().render(self.datos).encode(), "text/html; charset=utf-8"
+        if formato == "speedscope":
+            return SpeedscopeRenderer().render(self.datos).encode(), "application/json"
+        if formato == "pstats":
+            # Mismo formato que Stats.dump_stats: se abre con pstats / snakeviz
+            return marshal.dumps(self.datos), "application/octet-stream"
+        if self.motor == "pyinstrument":
+            texto = ConsoleRenderer(unicode=True, show_all=False).render(self.datos)
+        else:
+            salida = io.StringIO()
+            stats = pstats.Stats(stream=salida)
+            stats.stats = self.datos
+            stats.get_top_level_stats()
+            stats.sort_stats("cumulative").print_stats(60)
+            texto = salida.getvalue()
+        return texto.encode(), "text/plain; charset=utf-8"
+
+
+class Perfilador:
+    def __init__(self):
+        self.token = os.getenv("ADMIN_TOKEN") or None
+        self.muestreo = min(max(_env_float("PERFILADOR_MUESTREO", 0.0), 0.0), 1.0)
+        self.intervalo_s = _env_float("PERFILADOR_INTERVALO_S", 0.001)
+        self.max_concurrentes = _env_int("PERFILADOR_CONCURRENTES", 1)
+        if Profiler is None and self.max_concurrentes > 1:
+            print("PERFILADOR_CONCURRENTES > 1 no aplica a cProfile: se perfila de a un request")
+            self.max_concurrentes = 1
+        self._perfiles: deque = deque(maxlen=max(_env_int("PERFILADOR_MAX", 50), 1))
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._en_curso = 0
+
+    @property
+    def motor(self) -> str:
+        return "pyinstrument" if Profiler is not None else "cprofile"
+
+    def token_valido(self, valor: Optional[str]) -> bool:
+        return bool(self.token and valor) and hmac.compare_digest(valor.encode(), self.token.encode())
+
+    def pedido(self, scope) -> bool:
+        """
+        True si el request pide ser perfilado: X-Perfilar con el token de admin, o ?perfilar=1
+        autorizado por X-Admin-Token.
+        """
+        headers = {
+            nombre: valor.decode("latin-1") for nombre, valor in scope.get("headers", ())
+            if nombre in (HEADER.encode(), HEADER_ADMIN.encode())
+        }
+        if HEADER.encode() in headers:
+            return self.token_valido(headers[HEADER.encode()])
+        qs = scope.get("query_string", b"")
+        if QUERY.encode() in qs and HEADER_ADMIN.encode() in headers:
+            valores = parse_qs(qs.decode("latin-1")).get(QUERY)
+            return (
+                bool(valores) and valores[0].strip().lower() in VERDADEROS
+                and self.token_valido(headers[HEADER_ADMIN.encode()])
+            )
+        return False
+
+    def tomar_lugar(self) -> bool:
+        with self._lock:
+            if self._en_curso >= self.max_concurrentes:
+                return False
+            self._en_curso += 1
+            return True
+
+    def liberar_lugar(self):
+        with self._lock:
+            self._en_curso -= 1
+
+    def nuevo_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def iniciar(self):
+        if Profiler is not None:
+            p = Profiler(interval=self.intervalo_s, async_mode="enabled")
+            p.start()
+        else:
+            p = cProfile.Profile()
+            p.enable()
+        return p
+
+    def guardar(self, p, id: int, ruta: str, metodo: str, path: str, status: int, duracion_s: float):
+        if Profiler is not None:
+            p.stop()
+            datos = p.last_session
+        else:
+            p.disable()
+            p.create_stats()
+            datos = p.stats
+        perfil = PerfilGuardado(id, ruta, metodo, path, status, duracion_s, self.motor, datos)
+        with self._lock:
+            self._perfiles.append(perfil)
+
+    def listar(self) -> List[Dict]:
+        with self._lock:
+            return [p.resumen() for p in reversed(self._perfiles)]
+
+    def obtener(self, id: int) -> Optional[PerfilGuardado]:
+        with self._lock:
+            return next((p for p in self._perfiles if p.id == id), None)
+
+    def limpiar(self) -> int:
+        with self._lock:
+            n = len(self._perfiles)
+            self._perfiles.clear()
+            return n
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "motor": self.motor,
+                "habilitado_por_token": self.token is not None,
+                "muestreo": self.muestreo,
+                "guardados": len(self._perfiles),
+                "max": self._perfiles.maxlen,
+                "en_curso": self._en_curso,
+            }
+
+
+perfilador = Perfilador()
+
+
+class MiddlewarePerfilador:
+    """
+    Middleware ASGI: perfila los requests pedidos (header con el token) o muestreados y guarda el resultado.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        perfilar = perfilador.pedido(scope) or (
+            perfilador.muestreo > 0 and random.random() < perfilador.muestreo
+        )
+        if not perfilar or not perfilador.tomar_lugar():
+            return await self.app(scope, receive, send)
+
+        id_perfil = perfilador.nuevo_id()
+        status = {"code": 500}
+
+        async def enviar(msg):
+            if msg["type"] == "http.response.start":
+                status["code"] = msg["status"]
+                msg["headers"] = list(msg.get("headers", [])) + [(b"x-perfil-id", str(id_perfil).encode())]
+            await send(msg)
+
+        t0 = time.perf_counter()
+        p = perfilador.iniciar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            try:
+                ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+                perfilador.guardar(
+                    p, id_perfil, ruta, scope["method"], scope["path"], status["code"],
+                    time.perf_counter() - t0,
+                )
+            finally:
+                perfilador.liberar_lugar()
@@ -0,0 +1,99 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def _columnas(requerimientos: Sequence[str]) -> Tuple[Dict[str, int], np.ndarray]:
+    """
+    Interna los requerimientos: cada skill distinta recibe un ID de columna.
+    Retorna ({skill: columna}, columnas de cada requerimiento en orden).
+    Un requerimiento repetido apunta a la misma columna (y suma dos veces, igual que explain_match).
+    """
+    vocab: Dict[str, int] = {}
+    cols = []
+    for req in (requerimientos or []):
+        j = vocab.get(req)
+        if j is None:
+            j = vocab[req] = len(vocab)
+        cols.append(j)
+    return vocab, np.asarray(cols, dtype=np.int64)
+
+
+def matriz_niveles(perfiles: Sequence[Dict], vocab: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Arma la matriz compacta candidato x skill (solo columnas del vocabulario).
+    Retorna (presente[bool], nivel[int64]) de forma (len(perfiles), len(vocab)).
+    Si un perfil repite una skill, gana la última ocurrencia (como el dict de explain_match).
+    """
+    n, m = len(perfiles), len(vocab)
+    presente = np.zeros((n, m), dtype=bool)
+    nivel = np.zeros((n, m), dtype=np.int64)
+    if not n or not m:
+        return presente, nivel
+
+    # Única pasada en Python: solo se internan las skills que algún requerimiento pide
+    filas, cols, niveles = [], [], []
+    for i, p in enumerate(perfiles):
+        for s in (p.get("habilidades", {}).get("tecnicas", []) or []):
+            j = vocab.get(s.get("nombre"))
+            if j is not None:
+                filas.append(i)
+                cols.append(j)
+                niveles.append(int(s.get("nivel", 0)))
+    if not filas:
+        return presente, nivel
+
+    f = np.asarray(filas, dtype=np.int64)
+    c = np.asarray(cols, dtype=np.int64)
+    v = np.asarray(niveles, dtype=np.int64)
+    # numpy no garantiza el orden de asignación con índices repetidos:
+    # nos quedamos explícitamente con la última ocurrencia de cada (fila, columna)
+    clave = f * m + c
+    _, idx_rev = np.unique(clave[::-1], return_index=True)
+    ult = len(clave) - 1 - idx_rev
+    presente[f[ult], c[ult]] = True
+    nivel[f[ult], c[ult]] = v[ult]
+    return presente, nivel
+
+
+def _puntos(perfiles: Sequence[Dict], requerimientos: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Puntos por (candidato, requerimiento) en una sola pasada vectorizada.
+    Retorna (presente, nivel, puntos) de forma (len(perfiles), len(requerimientos)).
+    """
+    vocab, req_cols = _columnas(requerimientos)
+    presente, nivel = matriz_niveles(perfiles, vocab)
+    pres_req = presente[:, req_cols]
+    niv_req = nivel[:, req_cols]
+    puntos = np.where(pres_req, 10 + niv_req, 0)
+    return pres_req, niv_req, puntos
+
+
+def score_bulk(perfiles: Sequence[Dict], requerimientos: List[str]) -> np.ndarray:
+    """
+    Equivalente vectorizado de [explain_match(p, reqs)["total"] for p in perfiles].
+    Retorna un array int64 con el total de cada perfil (mínimo 1 si no hay match).
+    """
+    _pres, _niv, puntos = _puntos(perfiles, requerimientos)
+    total = puntos.sum(axis=1)
+    return np.where(total == 0, 1, total)
+
+
+def explain_match_bulk(perfiles: Sequence[Dict], requerimientos: List[str]) -> List[Dict]:
+    """
+    Equivalente vectorizado de [explain_match(p, reqs) for p in perfiles]:
+    mismos 'matches' (en el orden de los requerimientos) y mismo 'total'.
+    """
+    reqs = list(requerimientos or [])
+    pres, niv, puntos = _puntos(perfiles, reqs)
+    total = puntos.sum(axis=1)
+    total = np.where(total == 0, 1, total)
+
+    matches: List[List[Dict]] = [[] for _ in range(len(perfiles))]
+    # np.nonzero recorre fila por fila: los matches quedan en el orden de los requerimientos
+    filas, cols = np.nonzero(pres)
+    for i, j, nv, pt in zip(
+        filas.tolist(), cols.tolist(), niv[filas, cols].tolist(), puntos[filas, cols].tolist()
+    ):
+        matches[i].append({"skill": reqs[j], "nivel": nv, "puntos": pt})
+    return [{"matches": m, "total": t} for m, t in zip(matches, total.tolist())]
@@ -0,0 +1,139 @@
+import uuid
+from typing import Callable, Iterable, Optional, Set
+
+import redis
+from redis.exceptions import WatchError
+
+# Reconstrucción de un índice de Redis (skill -> ofertas, skill -> usuarios) sin perder las escrituras
+# que la API hace mientras tanto:
+#   indice:{indice}:reconstruyendo  generación del rebuild en curso: lock SET NX con TTL, renovado por lote
+#   indice:{indice}:tocadas:{gen}   ids que la API reindexó durante el rebuild (registrar_toque)
+#   tmp:{gen}:{clave}               claves nuevas del índice, cargadas desde Mongo
+# Antes del intercambio se reaplican desde Mongo los ids tocados; el intercambio (RENAME de las
+# temporales + DEL de las que sobran) corre en un MULTI con WATCH sobre las tocadas: si la API toca
+# otro id en el medio, se aborta, se reaplica y se reintenta.
+# Garantía: toda escritura de la API registra el toque ANTES de escribir el índice vivo (en la misma
+# transacción) y después de escribir Mongo, así que o la ve el rebuild al reaplicar, o se aplica
+# sobre el índice ya intercambiado.
+TTL_LOCK_SECONDS = 300
+
+_LUA_TOCAR = """
+local gen = redis.call('get', KEYS[1])
+if gen then
+    redis.call('sadd', ARGV[1] .. gen, ARGV[2])
+    redis.call('expire', ARGV[1] .. gen, ARGV[3])
+end
+return 0
+"""
+_LUA_RENOVAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_LUA_LIBERAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class ReconstruccionEnCurso(RuntimeError):
+    pass
+
+
+def clave_lock(indice: str) -> str:
+    return f"indice:{indice}:reconstruyendo"
+
+
+def clave_tocadas(indice: str, gen: str) -> str:
+    return f"indice:{indice}:tocadas:{gen}"
+
+
+def tmp(gen: str, clave: str) -> str:
+    return f"tmp:{gen}:{clave}"
+
+
+def registrar_toque(pipe, indice: str, id: str):
+    """
+    Encola en `pipe` el registro de `id` como tocado si hay un rebuild de `indice` en curso
+    (no hace nada si no lo hay). Tiene que ir antes de la escritura del índice vivo.
+    """
+    pipe.eval(_LUA_TOCAR, 1, clave_lock(indice), clave_tocadas(indice, ""), id, TTL_LOCK_SECONDS * 2)
+
+
+def tomar(r: redis.Redis, indice: str) -> str:
+    """
+    Toma el lock del rebuild de `indice` y retorna la generación. ReconstruccionEnCurso si ya
+    hay otro (otro worker al arrancar, un `cli.py reindex-*`).
+    """
+    gen = uuid.uuid4().hex[:8]
+    if not r.set(clave_lock(indice), gen, nx=True, ex=TTL_LOCK_SECONDS):
+        raise ReconstruccionEnCurso(f"Ya hay una reconstrucción de {indice} en curso")
+    return gen
+
+
+def renovar(r: redis.Redis, indice: str, gen: str):
+    # Por lote: un rebuild largo no pierde el lock mientras sigue vivo
+    if not r.eval(_LUA_RENOVAR, 1, clave_lock(indice), gen, TTL_LOCK_SECONDS):
+        raise ReconstruccionEnCurso(f"Se perdió el lock de la reconstrucción de {indice}")
+
+
+def abortar(r: redis.Redis, indice: str, gen: str):
+    """No dejar temporales huérfanas ni el lock tomado si Mongo o Redis fallan a mitad de camino."""
+    for clave in r.scan_iter(match=tmp(gen, "*"), count=1000):
+        r.delete(clave)
+    r.delete(clave_tocadas(indice, gen))
+    r.eval(_LUA_LIBERAR, 1, clave_lock(indice), gen)
+
+
+def intercambiar(
+    r: redis.Redis,
+    indice: str,
+    gen: str,
+    patrones: Iterable[str],
+    reaplicar: Callable[[Set[str]], None],
+    extra: Optional[Callable] = None,
+) -> int:
+    """
+    Reemplaza las claves vivas que matchean `patrones` por las temporales de `gen` y borra las que
+    sobran, en un MULTI/EXEC. Antes llama a reaplicar(ids) con los ids tocados durante el rebuild
+    (tiene que reescribir sus temporales desde Mongo). `extra(pipe)` agrega comandos a la transacción.
+    Retorna la cantidad de ids reaplicados.
+    """
+    lock, tocadas = clave_lock(indice), clave_tocadas(indice, gen)
+    prefijo = tmp(gen, "")
+    reaplicados = 0
+    with r.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                pipe.watch(tocadas, lock)
+                if pipe.get(lock) != gen:
+                    raise ReconstruccionEnCurso(f"Se perdió el lock de la reconstrucción de {indice}")
+                if pipe.scard(tocadas):
+                    pipe.unwatch()
+                    # Sacar antes de releer Mongo: un toque posterior vuelve a entrar y se reaplica
+                    ids = set(r.spop(tocadas, 1000) or [])
+                    reaplicar(ids)
+                    reaplicados += len(ids)
+                    renovar(r, indice, gen)
+                    continue
+                # Solo las temporales que existen: un set que quedó vacío al reaplicar ya no está
+                nuevas = {k[len(prefijo):] for k in r.scan_iter(match=prefijo + "*", count=1000)}
+                viejas = {
+                    k for patron in patrones for k in r.scan_iter(match=patron, count=1000)
+                    if k not in nuevas
+                }
+                pipe.multi()
+                for clave in sorted(nuevas):
+                    pipe.rename(tmp(gen, clave), clave)
+                for clave in viejas:
+                    pipe.delete(clave)
+                if extra is not None:
+                    extra(pipe)
+                pipe.delete(tocadas, lock)
+                pipe.execute()
+                return reaplicados
+            except WatchError:
+                continue
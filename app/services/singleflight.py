@@ -0,0 +1,110 @@
+import asyncio
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+import redis.asyncio as aioredis
+
+# Solo borra / renueva el lock si el token sigue siendo el nuestro
+_LUA_LIBERAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_LUA_RENOVAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LockRedis:
+    """
+    Lock distribuido con dueño: SET NX PX con un token propio, renovado en segundo plano
+    mientras se trabaja (recomputes largos) y liberado al terminar solo si sigue siendo nuestro.
+    """
+
+    def __init__(self, r: aioredis.Redis, key: str, ttl_ms: int = 10_000):
+        self.r = r
+        self.key = key
+        self.ttl_ms = ttl_ms
+        self.token = uuid.uuid4().hex
+        self._renovacion: Optional[asyncio.Task] = None
+
+    async def adquirir(self) -> bool:
+        ok = await self.r.set(self.key, self.token, nx=True, px=self.ttl_ms)
+        if ok:
+            self._renovacion = asyncio.create_task(self._renovar())
+        return bool(ok)
+
+    async def _renovar(self):
+        while True:
+            await asyncio.sleep(self.ttl_ms / 3000)
+            if not await self.r.eval(_LUA_RENOVAR, 1, self.key, self.token, self.ttl_ms):
+                return  # lo perdimos (expiró o lo tomó otro): dejar de renovar
+
+    async def liberar(self) -> bool:
+        if self._renovacion is not None:
+            self._renovacion.cancel()
+            self._renovacion = None
+        return bool(await self.r.eval(_LUA_LIBERAR, 1, self.key, self.token))
+
+
+class SingleFlight:
+    """
+    Comparte una única ejecución en curso por clave entre los callers concurrentes del
+    mismo proceso: el primero la lanza, el resto espera el mismo future.
+    """
+
+    def __init__(self):
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+
+    def en_vuelo(self, clave: str) -> bool:
+        return clave in self._en_vuelo
+
+    async def ejecutar(self, clave: str, fn: Callable[[], Awaitable]):
+        fut = self._en_vuelo.get(clave)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._en_vuelo[clave] = fut
+
+            def _limpiar(_f, clave=clave, fut=fut):
+                if self._en_vuelo.get(clave) is fut:
+                    del self._en_vuelo[clave]
+
+            fut.add_done_callback(_limpiar)
+        # shield: si un caller se cancela (cliente desconectado) el resto sigue esperando
+        return await asyncio.shield(fut)
+
+
+async def esperar_notificacion(
+    r: aioredis.Redis,
+    canal: str,
+    listo: Callable[[], Awaitable[bool]],
+    lock_key: str,
+    timeout_s: float,
+) -> bool:
+    """
+    Espera un mensaje en `canal` (pub/sub) publicado por quien tiene `lock_key`.
+    Se suscribe antes de re-chequear `listo()` para no perder una notificación que llegue
+    en el medio. Vuelve antes si el lock desaparece sin aviso (el dueño murió).
+    Retorna True si hubo notificación o el resultado ya estaba listo.
+    """
+    pubsub = r.pubsub()
+    await pubsub.subscribe(canal)
+    try:
+        if await listo() or not await r.exists(lock_key):
+            return True
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + timeout_s
+        while (restante := limite - loop.time()) > 0:
+            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(restante, 1.0))
+            if msg is not None:
+                return True
+            if not await r.exists(lock_key):
+                return await listo()
+        return False
+    finally:
+        await pubsub.unsubscribe(canal)
+        await pubsub.aclose()
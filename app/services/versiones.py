@@ -1,24 +1,66 @@
 # app/services/versiones.py
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from bson import ObjectId
+from pymongo import ReturnDocument
 from pymongo.database import Database
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
+from app.services.candidatos import candidato_id as buscar_candidato_id
 
-def _get_next_version(db: Database, candidato_id: ObjectId) -> int:
+
+def _reservar_versiones(db: Database, candidato_id: ObjectId, n: int = 1) -> int:
     """
-    Obtiene el siguiente número de versión para un candidato.
-    Busca la última versión y retorna +1. Si no hay, retorna 1.
+    Reserva atómicamente `n` números de versión consecutivos para un candidato y retorna el primero.
+
+    Usa un contador por candidato en `contadores_version` ({_id: candidato_id, version: última})
+    incrementado con $inc en un único find_one_and_update: dos escritores concurrentes nunca
+    reciben el mismo número. La primera vez se siembra el contador con la última versión
+    ya registrada en versiones_perfil (candidatos con historial previo al contador).
     """
-    doc = db.versiones_perfil.find_one(
-        {"candidato_id": candidato_id},
-        sort=[("version", -1)],
-        projection={"version": 1},
-    )
-    if not doc:
-        return 1
-    return int(doc.get("version", 0)) + 1
+    for _ in range(2):
+        doc = db.contadores_version.find_one_and_update(
+            {"_id": candidato_id},
+            {"$inc": {"version": n}},
+            projection={"version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None:
+            return int(doc["version"]) - n + 1
+        ultima = db.versiones_perfil.find_one(
+            {"candidato_id": candidato_id},
+            sort=[("version", -1)],
+            projection={"version": 1},
+        )
+        try:
+            db.contadores_version.insert_one(
+                {"_id": candidato_id, "version": int((ultima or {}).get("version", 0))}
+            )
+        except DuplicateKeyError:
+            pass  # otro escritor lo sembró primero: reintentar el $inc
+    raise RuntimeError(f"No se pudo reservar versión para {candidato_id}")
+
+
+def _a_object_id(candidato_id: ObjectId | str) -> ObjectId:
+    # Normalizar a ObjectId si viene string
+    if isinstance(candidato_id, ObjectId):
+        return candidato_id
+    try:
+        return ObjectId(str(candidato_id))
+    except Exception as e:
+        raise ValueError(f"candidato_id inválido: {e}")
+
+
+def _respuesta(doc: dict) -> dict:
+    # Retornar sin _id para respuestas limpias
+    return {
+        "candidato_id": str(doc["candidato_id"]),
+        "version": doc["version"],
+        "fecha": doc["fecha"].isoformat(),
+        "cambio": doc["cambio"],
+        "diff": doc["diff"],
+    }
 
 
 def log_version(
@@ -38,14 +80,8 @@ def log_version(
 
     Retorna el documento insertado (sin _id).
     """
-    # Normalizar a ObjectId si viene string
-    if not isinstance(candidato_id, ObjectId):
-        try:
-            candidato_id = ObjectId(str(candidato_id))
-        except Exception as e:
-            raise ValueError(f"candidato_id inválido: {e}")
-
-    version = _get_next_version(db, candidato_id)
+    candidato_id = _a_object_id(candidato_id)
+    version = _reservar_versiones(db, candidato_id)
 
     doc = {
         "candidato_id": candidato_id,
@@ -56,24 +92,65 @@ def log_version(
     }
 
     db.versiones_perfil.insert_one(doc)
-    # Retornar sin _id para respuestas limpias
-    return {
-        "candidato_id": str(candidato_id),
-        "version": version,
-        "fecha": doc["fecha"].isoformat(),
-        "cambio": cambio,
-        "diff": diff or None,
-    }
+    return _respuesta(doc)
+
+
+def log_versions(
+    db: Database,
+    cambios: Iterable[Tuple[ObjectId | str, str, Optional[dict]]],
+    nuevos: bool = False,
+) -> List[dict]:
+    """
+    Versión batch de log_version para cargas masivas: recibe (candidato_id, cambio, diff)
+    y los inserta con un único insert_many.
+
+    Los números se reservan de a rangos: un $inc por candidato distinto (no por cambio).
+    Con `nuevos=True` (candidatos recién creados, sin historial) los contadores se crean con
+    un insert_many; si alguno ya existía se cae a la reserva normal para ese candidato.
+
+    Retorna los documentos insertados (sin _id), en el orden recibido.
+    """
+    filas = [(_a_object_id(cid), cambio, diff) for cid, cambio, diff in cambios]
+    if not filas:
+        return []
+
+    cantidad: Dict[ObjectId, int] = {}
+    for cid, _cambio, _diff in filas:
+        cantidad[cid] = cantidad.get(cid, 0) + 1
+
+    siguiente: Dict[ObjectId, int] = {}
+    if nuevos:
+        contadores = [{"_id": cid, "version": n} for cid, n in cantidad.items()]
+        fallidos = set()
+        try:
+            db.contadores_version.insert_many(contadores, ordered=False)
+        except BulkWriteError as e:
+            fallidos = {err["index"] for err in e.details.get("writeErrors", [])}
+        siguiente = {c["_id"]: 1 for i, c in enumerate(contadores) if i not in fallidos}
+    for cid, n in cantidad.items():
+        if cid not in siguiente:
+            siguiente[cid] = _reservar_versiones(db, cid, n)
+
+    ahora = datetime.utcnow()
+    docs = []
+    for cid, cambio, diff in filas:
+        docs.append({
+            "candidato_id": cid,
+            "version": siguiente[cid],
+            "fecha": ahora,
+            "cambio": cambio,
+            "diff": diff or None,
+        })
+        siguiente[cid] += 1
+
+    db.versiones_perfil.insert_many(docs, ordered=False)
+    return [_respuesta(d) for d in docs]
 
 
 def get_candidato_id_by_nombre(db: Database, nombre: str) -> ObjectId | None:
     """
-    Busca el _id del candidato por informacion_personal.nombre_apellido (normalizado a lowercase).
+    Busca el _id del candidato por informacion_personal.nombre_apellido (sin distinguir mayúsculas,
+    por el índice con collation; ver app/services/candidatos.py).
     Retorna ObjectId o None si no existe.
     """
-    nombre = (nombre or "").strip().lower()
-    doc = db.candidatos.find_one(
-        {"informacion_personal.nombre_apellido": nombre},
-        {"_id": 1},
-    )
-    return doc["_id"] if doc else None
\ No newline at end of file
+    return buscar_candidato_id(db, nombre)
@@ -0,0 +1,87 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import HTTPException, Query
+
+# Sparse fieldsets: ?fields=a,b.c  ->  proyección de Mongo {"a": 1, "b.c": 1}
+# Solo se traen, decodifican y serializan los campos pedidos.
+_RE_CAMPO = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+MAX_CAMPOS = 50
+
+
+def query_fields():
+    return Query(
+        None,
+        description="Campos a devolver, separados por coma (ej.: puesto,empresa). Por defecto, todos.",
+    )
+
+
+def parsear_campos(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    "a, b.c ,a" -> ["a", "b.c"]. None o vacío = todos los campos.
+    Responde 400 ante nombres inválidos (p. ej. con "$") o demasiados campos.
+    """
+    if not fields or not fields.strip():
+        return None
+    campos = []
+    for c in fields.split(","):
+        c = c.strip()
+        if not c:
+            continue
+        if not _RE_CAMPO.match(c):
+            raise HTTPException(400, f"Campo inválido en fields: '{c}'")
+        if c not in campos:
+            campos.append(c)
+    if len(campos) > MAX_CAMPOS:
+        raise HTTPException(400, f"fields admite hasta {MAX_CAMPOS} campos")
+    return campos or None
+
+
+def proyeccion(campos: Optional[List[str]], excluir_id: bool = True) -> Optional[Dict]:
+    """
+    Proyección de Mongo para `campos` (rutas con punto). Si se pide "a" y "a.b" queda "a"
+    (Mongo rechaza rutas superpuestas). None si no hay campos (documento completo).
+    `excluir_id`: el _id no se trae salvo que se pida.
+    """
+    if not campos:
+        return None
+    rutas = sorted(set(campos))
+    final: List[str] = []
+    for r in rutas:
+        if not any(r.startswith(p + ".") for p in final):
+            final.append(r)
+    proy = {r: 1 for r in final}
+    if excluir_id and "_id" not in proy:
+        proy["_id"] = 0
+    return proy
+
+
+def proyeccion_salida(
+    campos: Optional[List[str]], mapa: Dict[str, Iterable[str]], siempre: Iterable[str] = ()
+) -> Optional[Dict]:
+    """
+    Para endpoints que devuelven campos calculados o renombrados: `mapa` indica, por cada
+    campo de salida, qué campos del documento de Mongo necesita. `siempre` son campos que el
+    endpoint usa internamente (p. ej. para el cursor de paginación).
+    Responde 400 si se pide un campo de salida que no existe.
+    """
+    if not campos:
+        return None
+    desconocidos = [c for c in campos if c not in mapa]
+    if desconocidos:
+        raise HTTPException(
+            400, f"Campos desconocidos en fields: {', '.join(desconocidos)} (válidos: {', '.join(mapa)})"
+        )
+    fuente: Set[str] = set(siempre)
+    for c in campos:
+        fuente.update(mapa[c])
+    return {f: 1 for f in sorted(fuente)} or {"_id": 1}
+
+
+def recortar(doc: Dict, campos: Optional[List[str]]) -> Dict:
+    """
+    Deja en `doc` (ya armado por el endpoint) solo los campos de salida pedidos.
+    """
+    if not campos:
+        return doc
+    return {k: v for k, v in doc.items() if k in campos}
@@ -1,12 +1,91 @@
-from bson import ObjectId
+import asyncio
+import functools
+from decimal import Decimal
+from typing import Any, Callable
 
-def custom_jsonable_encoder(obj):
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+# orjson serializa nativamente dict/list/str/int/float, datetime/date (ISO 8601), UUID y numpy;
+# _default solo se llama para lo que no conoce (ObjectId, Decimal128, modelos de pydantic).
+_OPCIONES = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any):
     if isinstance(obj, ObjectId):
         return str(obj)
-    if isinstance(obj, list):
-        return [custom_jsonable_encoder(x) for x in obj]
-    if isinstance(obj, dict):
-        return {k: custom_jsonable_encoder(v) for k, v in obj.items()}
-    return obj
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Documentos de Mongo (ObjectId, fechas, etc.) a JSON en una sola pasada, sin recorrerlos antes.
+    """
+    return orjson.dumps(obj, default=_default, option=_OPCIONES)
+
+
+class MongoJSONResponse(JSONResponse):
+    """
+    Respuesta JSON de la app: orjson con soporte de ObjectId y datetime.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _responder(resultado: Any, status_code: int):
+    if isinstance(resultado, Response):
+        return resultado
+    return MongoJSONResponse(resultado, status_code=status_code)
+
+
+class RutaJSON(APIRoute):
+    """
+    Ruta que serializa lo que devuelve el endpoint directo con MongoJSONResponse.
+
+    Sin esto FastAPI pasa todo resultado sin response_model por jsonable_encoder, que recorre
+    y reconstruye cada dict y lista (y no conoce ObjectId) antes de serializarlo. Si el endpoint
+    declara response_model se respeta el camino normal (validación + filtrado de FastAPI).
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_model = kwargs.get("response_model")
+        sin_modelo = response_model is None or isinstance(response_model, DefaultPlaceholder)
+        if sin_modelo and "return" not in getattr(endpoint, "__annotations__", {}):
+            endpoint = _envolver(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _envolver(endpoint: Callable, status_code: int) -> Callable:
+    # functools.wraps conserva la firma (__wrapped__): FastAPI sigue resolviendo parámetros y dependencias
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def envuelto(*args, **kwargs):
+            return _responder(await endpoint(*args, **kwargs), status_code)
+    else:
+        # sync: FastAPI lo sigue corriendo en el threadpool
+        @functools.wraps(endpoint)
+        def envuelto(*args, **kwargs):
+            return _responder(endpoint(*args, **kwargs), status_code)
+    return envuelto
+
+
+def custom_jsonable_encoder(obj):
+    """
+    Compatibilidad: devuelve el objeto con los ObjectId ya como string (vía orjson).
+    """
+    return orjson.loads(dumps(obj))
 
-#Convierte todo lo que viene de Mongo (ObjectIds, listas, diccionarios) en algo serializable a JSON
\ No newline at end of file
+#Convierte todo lo que viene de Mongo (ObjectIds, listas, diccionarios) en algo serializable a JSON
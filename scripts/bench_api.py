@@ -0,0 +1,208 @@
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from falsos import instalar_falsos
+
+from app.main import app
+from app.services.escritor_grafo import escritor_grafo
+from app.services.funciones import clave_meta
+from app.services.generador import cargar_archivos, nombre_candidato
+from app.services.indice_ofertas import reconstruir_indice
+from app.services.indice_usuarios import reconstruir_indice_usuarios
+
+# Benchmark de la API completa (FastAPI + servicios reales) sin Mongo, Redis ni Neo4j:
+# los clientes se reemplazan por los falsos de scripts/falsos.py. Mide latencia por request
+# (p50/p99) y throughput secuencial de cada escenario; con --guardar/--comparar detecta
+# regresiones contra una corrida anterior.
+#
+#   PYTHONPATH=. python scripts/bench_api.py --guardar base.json
+#   PYTHONPATH=. python scripts/bench_api.py --comparar base.json
+
+SKILLS = [
+    "python", "sql", "power bi", "excel", "node.js", "javascript", "mongodb", "apis rest",
+    "machine learning", "tensorflow", "estadística", "docker", "kubernetes", "java", "react",
+    "fastapi", "redis", "neo4j", "aws", "git",
+]
+# IDs simbólicos que resuelve funciones._puesto_por_oferta_id
+OFERTAS_SIMBOLICAS = {
+    "of-backend": ("Desarrollador Backend", ["python", "sql", "docker", "apis rest"]),
+    "of-analista-datos": ("Analista de Datos", ["sql", "power bi", "excel", "estadística"]),
+    "of-especialista-ia": ("Especialista en IA", ["python", "machine learning", "tensorflow"]),
+}
+
+
+def sembrar(f, candidatos: int, ofertas: int, postulados: int, seed: int = 42):
+    rnd = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    # Popularidad de skills decreciente (las primeras de la lista son las más comunes)
+    pesos = [1 / (i + 1) for i in range(len(SKILLS))]
+
+    def skills_al_azar(k):
+        return list(dict.fromkeys(rnd.choices(SKILLS, weights=pesos, k=k)))
+
+    f.db.candidatos.insert_many([
+        {
+            "informacion_personal": {"nombre_apellido": f"candidato {i}", "email": f"c{i}@example.com"},
+            "estado": "activo",
+            "fecha_creacion": base + timedelta(minutes=i),
+            "habilidades": {"tecnicas": [
+                {"nombre": s, "nivel": rnd.randint(1, 10)} for s in skills_al_azar(rnd.randint(1, 8))
+            ]},
+            "capacitaciones": [],
+        }
+        for i in range(candidatos)
+    ])
+    empresas = f.db.empresas.insert_many([{"nombre": f"empresa {i}"} for i in range(20)]).inserted_ids
+    docs = [
+        {
+            "empresa_id": rnd.choice(empresas),
+            "puesto": puesto,
+            "requerimientos": [{"habilidad": s, "nivel": 5} for s in reqs],
+            "estado": "abierta",
+            "fecha_creacion": base,
+        }
+        for puesto, reqs in OFERTAS_SIMBOLICAS.values()
+    ]
+    docs += [
+        {
+            "empresa_id": rnd.choice(empresas),
+            "puesto": f"puesto {i}",
+            "requerimientos": [{"habilidad": s, "nivel": 5} for s in skills_al_azar(rnd.randint(2, 6))],
+            "estado": rnd.choice(["abierta", "abierta", "abierta", "cerrada"]),
+            "experiencia_requerida": str(rnd.randint(0, 5)),
+            "fecha_creacion": base + timedelta(hours=i),
+        }
+        for i in range(ofertas)
+    ]
+    f.db.ofertas.insert_many(docs)
+    for oferta_id in OFERTAS_SIMBOLICAS:
+        f.grafo.postulaciones[oferta_id] = [
+            f"candidato {i}" for i in rnd.sample(range(candidatos), min(postulados, candidatos))
+        ]
+    reconstruir_indice_usuarios(f.db, f.r)
+    reconstruir_indice(f.db, f.r)
+    return "of-backend", lambda i: f"candidato {i}", candidatos
+
+
+def sembrar_de_archivos(f, directorio: str):
+    """
+    Dataset de `cli.py generar --archivos`: recomendaciones sobre la oferta con más postulados.
+    """
+    f.grafo.postulaciones.update(cargar_archivos(directorio, f.db))
+    reconstruir_indice_usuarios(f.db, f.r)
+    reconstruir_indice(f.db, f.r)
+    oferta_id = max(f.grafo.postulaciones, key=lambda o: len(f.grafo.postulaciones[o]))
+    return oferta_id, nombre_candidato, f.db.candidatos.estimated_document_count()
+
+
+def escenarios(f, oferta_id: str, nombre, candidatos: int):
+    rnd = random.Random(7)
+    nuevos = iter(range(10**9))
+    recs = f"/offers/{oferta_id}/recommendations"
+
+    def sin_cache(_i):
+        f.r.delete(f"cache:match:{oferta_id}", clave_meta(oferta_id))
+
+    # nombre -> (preparar, request); preparar corre fuera de la medición
+    return {
+        "recs frío": (sin_cache, lambda c: c.get(recs)),
+        "recs caliente": (None, lambda c: c.get(recs)),
+        "skills/segment": (None, lambda c: c.get("/skills/segment", params={"skills": ["python", "sql"]})),
+        "match_positions": (None, lambda c: c.get(
+            f"/dashboard/user/{nombre(rnd.randrange(candidatos))}/positions"
+        )),
+        "posiciones": (None, lambda c: c.get("/posiciones", params={"limit": 50})),
+        "crear usuario": (None, lambda c: c.post("/users", json={
+            "nombre": f"nuevo {next(nuevos)}", "email": "nuevo@example.com", "skills": ["python", "sql"],
+        })),
+    }
+
+
+def medir(client, preparar, request, n: int, calentamiento: int):
+    for i in range(calentamiento):
+        if preparar:
+            preparar(i)
+        request(client)
+    lat = []
+    for i in range(n):
+        if preparar:
+            preparar(i)
+        t0 = time.perf_counter()
+        resp = request(client)
+        lat.append(time.perf_counter() - t0)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"{resp.request.url} respondió {resp.status_code}: {resp.text[:200]}")
+    lat = np.array(lat) * 1000
+    return {
+        "n": n,
+        "req_s": round(n / (lat.sum() / 1000), 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+    }
+
+
+def comparar(actual, base, tolerancia: float) -> int:
+    regresiones = 0
+    for nombre, res in actual.items():
+        previo = base.get(nombre)
+        if not previo:
+            continue
+        for metrica in ("p50_ms", "p99_ms"):
+            if res[metrica] > previo[metrica] * (1 + tolerancia):
+                regresiones += 1
+                print(f"REGRESIÓN {nombre} {metrica}: {previo[metrica]} -> {res[metrica]} ms")
+    return regresiones
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de la API con Mongo/Redis/Neo4j en memoria")
+    p.add_argument("--candidatos", type=int, default=5_000)
+    p.add_argument("--ofertas", type=int, default=500)
+    p.add_argument("--postulados", type=int, default=1_000, help="Postulados a cada oferta simbólica")
+    p.add_argument("--datos", help="Directorio generado con `cli.py generar --archivos` (en vez de sembrar)")
+    p.add_argument("--requests", type=int, default=200, help="Requests medidos por escenario")
+    p.add_argument("--calentamiento", type=int, default=5)
+    p.add_argument("--solo", nargs="+", help="Correr solo estos escenarios")
+    p.add_argument("--guardar", help="Guardar los resultados en este JSON")
+    p.add_argument("--comparar", help="JSON de una corrida anterior; termina con 1 si hay regresiones")
+    p.add_argument("--tolerancia", type=float, default=0.25, help="Empeoramiento admitido (default 25%%)")
+    args = p.parse_args()
+
+    f = instalar_falsos()
+    t0 = time.perf_counter()
+    if args.datos:
+        oferta_id, nombre, candidatos = sembrar_de_archivos(f, args.datos)
+    else:
+        oferta_id, nombre, candidatos = sembrar(f, args.candidatos, args.ofertas, args.postulados)
+    print(f"Datos: {candidatos} candidatos, {f.db.ofertas.estimated_document_count()} ofertas, "
+          f"recomendaciones de {oferta_id} ({time.perf_counter() - t0:.1f}s)")
+
+    client = TestClient(app)  # sin lifespan: las conexiones ya están registradas
+    resultados = {}
+    print(f"{'escenario':>18} {'req/s':>9} {'p50':>10} {'p99':>10}")
+    for escenario, (preparar, request) in escenarios(f, oferta_id, nombre, candidatos).items():
+        if args.solo and escenario not in args.solo:
+            continue
+        res = medir(client, preparar, request, args.requests, args.calentamiento)
+        resultados[escenario] = res
+        print(f"{escenario:>18} {res['req_s']:>9} {res['p50_ms']:>8.2f}ms {res['p99_ms']:>8.2f}ms")
+    escritor_grafo.detener()
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as fh:
+            json.dump(resultados, fh, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as fh:
+            if comparar(resultados, json.load(fh), args.tolerancia):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
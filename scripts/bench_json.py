@@ -0,0 +1,101 @@
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.encoder import MongoJSONResponse
+
+SKILLS = [
+    "python", "sql", "power bi", "excel", "node.js", "javascript", "mongodb", "apis rest",
+    "machine learning", "tensorflow", "estadística", "docker", "kubernetes", "java", "react",
+]
+
+
+def generar_cursos(n: int, rnd: random.Random):
+    """
+    Misma forma que GET /cursos (sin _id).
+    """
+    return {"cursos": [
+        {
+            "titulo": f"Curso {i} de {rnd.choice(SKILLS)}",
+            "formato": rnd.choice(["video", "pdf", "live"]),
+            "duracion_h": round(rnd.uniform(1, 40), 1),
+            "etiquetas": ",".join(rnd.sample(SKILLS, 3)),
+            "contenido_url": f"https://cursos.example.com/{i}",
+            "skill_asociada": rnd.choice(SKILLS),
+        }
+        for i in range(n)
+    ]}
+
+
+def generar_segmento(n: int, rnd: random.Random):
+    """
+    Misma forma que GET /skills/segment, con perfiles completos (ObjectId y fechas de Mongo).
+    """
+    base = datetime(2024, 1, 1)
+    perfiles = []
+    for i in range(n):
+        perfiles.append({
+            "_id": ObjectId(),
+            "informacion_personal": {
+                "nombre_apellido": f"candidato {i}", "email": f"c{i}@example.com",
+                "celular": None, "residencia": "CABA",
+            },
+            "estado": "activo",
+            "fecha_creacion": base + timedelta(minutes=i),
+            "habilidades": {"tecnicas": [
+                {"nombre": s, "nivel": rnd.randint(1, 10)} for s in rnd.sample(SKILLS, rnd.randint(1, 8))
+            ]},
+        })
+    return {"skills": ["python"], "users": [p["informacion_personal"]["nombre_apellido"] for p in perfiles],
+            "perfiles": perfiles}
+
+
+def _viejo_jsonresponse(content):
+    # Camino anterior: jsonable_encoder (con ObjectId -> str) + JSONResponse (json.dumps)
+    return JSONResponse(jsonable_encoder(content, custom_encoder={ObjectId: str})).body
+
+
+def _viejo_json_util(content):
+    # Camino anterior de GET /users/{nombre}: json_util.dumps + json.loads + JSONResponse
+    return JSONResponse(json.loads(json_util.dumps(content))).body
+
+
+def medir(fn, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark de serialización de respuestas JSON")
+    p.add_argument("--tamanios", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    p.add_argument("--repeticiones", type=int, default=5)
+    args = p.parse_args()
+
+    rnd = random.Random(42)
+    print(f"{'payload':>20} {'jsonable+json':>14} {'json_util':>12} {'orjson':>10} {'speedup':>8}")
+    for n in args.tamanios:
+        for nombre, payload in (("cursos", generar_cursos(n, rnd)), ("segment", generar_segmento(n, rnd))):
+            # Verificación: mismo contenido que el camino anterior
+            assert json.loads(MongoJSONResponse(payload).body) == json.loads(_viejo_jsonresponse(payload))
+
+            t_viejo = medir(lambda: _viejo_jsonresponse(payload), args.repeticiones)
+            t_util = medir(lambda: _viejo_json_util(payload), args.repeticiones)
+            t_nuevo = medir(lambda: MongoJSONResponse(payload).body, args.repeticiones)
+            print(
+                f"{nombre + ' x' + str(n):>20} {t_viejo * 1000:>12.1f}ms {t_util * 1000:>10.1f}ms "
+                f"{t_nuevo * 1000:>8.1f}ms {t_viejo / t_nuevo:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
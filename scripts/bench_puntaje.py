@@ -0,0 +1,66 @@
+import argparse
+import random
+import time
+
+from app.services.funciones import explain_match
+from app.services.puntaje import explain_match_bulk, score_bulk
+
+SKILLS = [
+    "python", "sql", "power bi", "excel", "node.js", "javascript", "mongodb", "apis rest",
+    "machine learning", "tensorflow", "estadística", "docker", "kubernetes", "java", "react",
+    "fastapi", "redis", "neo4j", "aws", "git",
+]
+
+
+def generar_perfiles(n: int, seed: int = 42):
+    """
+    Perfiles sintéticos con la misma forma que devuelve enrich_from_mongo.
+    """
+    rnd = random.Random(seed)
+    perfiles = []
+    for i in range(n):
+        skills = rnd.sample(SKILLS, rnd.randint(0, 8))
+        perfiles.append({
+            "informacion_personal": {"nombre_apellido": f"candidato {i}", "email": f"c{i}@example.com"},
+            "estado": "activo",
+            "habilidades": {"tecnicas": [{"nombre": s, "nivel": rnd.randint(1, 10)} for s in skills]},
+        })
+    return perfiles
+
+
+def medir(fn, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark explain_match vs score_bulk")
+    p.add_argument("--tamanios", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    p.add_argument("--repeticiones", type=int, default=3)
+    args = p.parse_args()
+
+    reqs = ["python", "sql", "machine learning", "tensorflow"]
+    print(f"{'candidatos':>10} {'explain_match':>14} {'score_bulk':>12} {'bulk+matches':>13} {'speedup':>8}")
+    for n in args.tamanios:
+        perfiles = generar_perfiles(n)
+
+        # Verificación: mismos totales y matches que el camino escalar
+        esperado = [explain_match(p, reqs) for p in perfiles]
+        assert explain_match_bulk(perfiles, reqs) == esperado
+        assert score_bulk(perfiles, reqs).tolist() == [e["total"] for e in esperado]
+
+        t_escalar = medir(lambda: [explain_match(p, reqs)["total"] for p in perfiles], args.repeticiones)
+        t_bulk = medir(lambda: score_bulk(perfiles, reqs), args.repeticiones)
+        t_bulk_m = medir(lambda: explain_match_bulk(perfiles, reqs), args.repeticiones)
+        print(
+            f"{n:>10} {t_escalar * 1000:>12.1f}ms {t_bulk * 1000:>10.1f}ms "
+            f"{t_bulk_m * 1000:>11.1f}ms {t_escalar / t_bulk:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
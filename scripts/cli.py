@@ -1,11 +1,26 @@
 import argparse
+import asyncio
+import json
 
 from app.services.conexion_nosql import (
   conectar_mongo,
   conectar_neo4j,
   conectar_redis,
 )
+from app.services.conexion_async import (
+  conectar_mongo_async,
+  conectar_neo4j_async,
+  conectar_redis_async,
+)
 from app.services.funciones import get_recommendations, clear_offer_cache, recompute_matches
+from app.services.indice_ofertas import reconstruir_indice
+from app.services.indice_usuarios import reconstruir_indice_usuarios
+from app.services.reconstruccion import ReconstruccionEnCurso
+from app.services.indices import asegurar_indices, indices_fallidos, verificar_indices
+from app.services.importacion import FORMATOS, importar_candidatos
+from app.services.escritor_grafo import escritor_grafo
+from app.services.generador import ConfigGenerador, cargar
+from app.services.operaciones_lentas import CLAVE as CLAVE_LENTAS, agrupar, leer
 
 def parse_args():
     p = argparse.ArgumentParser(prog="talentum-cli", description="CLI Talentum+")
@@ -23,10 +38,119 @@ def parse_args():
     inv = sub.add_parser("invalidate", help="Borrar cache de una oferta")
     inv.add_argument("--oferta", required=True)
 
+    # reconstruir índice skill -> ofertas
+    sub.add_parser("reindex-ofertas", help="Reconstruir en Redis el índice skill -> ofertas abiertas")
+
+    # reconstruir índice skill -> usuarios
+    ru = sub.add_parser("reindex-usuarios", help="Reconstruir en Redis los sets skill:{skill}:users")
+    ru.add_argument("--batch", type=int, default=1000, help="Candidatos por lote (default 1000)")
+
+    # índices de Mongo
+    sub.add_parser("indices", help="Crear los índices de Mongo y verificar con explain() que se usan")
+
+    # importación masiva de candidatos
+    imp = sub.add_parser("import", help="Importar candidatos desde un archivo NDJSON o CSV")
+    imp.add_argument("--archivo", required=True, help="Ruta del archivo (.ndjson, .jsonl o .csv)")
+    imp.add_argument("--formato", choices=FORMATOS, help="Por defecto, según la extensión")
+    imp.add_argument("--batch", type=int, default=1000, help="Filas por lote (default 1000)")
+
+    # dataset sintético
+    gen = sub.add_parser("generar", help="Generar un dataset sintético (Zipf de skills, postulados en ley de potencias)")
+    gen.add_argument("--candidatos", type=int, default=10_000)
+    gen.add_argument("--ofertas", type=int, default=1_000)
+    gen.add_argument("--empresas", type=int, default=100)
+    gen.add_argument("--cursos", type=int, default=200)
+    gen.add_argument("--skills", type=int, default=300, help="Tamaño del vocabulario de skills")
+    gen.add_argument("--zipf", type=float, default=1.1, help="Exponente de popularidad de skills")
+    gen.add_argument("--alpha", type=float, default=1.3, help="Exponente de Pareto de postulados por oferta")
+    gen.add_argument("--batch", type=int, default=5_000, help="Documentos por lote (default 5000)")
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--destinos", nargs="+", choices=["mongo", "redis", "neo4j"], default=[],
+                     help="Dónde cargar (redis se reconstruye desde mongo)")
+    gen.add_argument("--archivos", help="Directorio donde escribir un NDJSON por colección")
+
+    # operaciones lentas registradas por la API
+    sl = sub.add_parser("slowlog", help="Ver las operaciones lentas de Mongo/Neo4j (con su plan)")
+    sl.add_argument("--limite", type=int, default=20)
+    sl.add_argument("--backend", choices=["mongo", "neo4j"])
+    sl.add_argument("--endpoint", help="Ruta declarada, ej.: /users/{nombre}")
+    sl.add_argument("--agrupar", action="store_true", help="Una fila por forma de consulta")
+    sl.add_argument("--planes", action="store_true", help="Mostrar el plan (explain / PROFILE)")
+    sl.add_argument("--borrar", action="store_true", help="Vaciar el registro")
+
     return p.parse_args()
 
+def generar(args):
+    """
+    Genera el dataset por lotes y carga cada lote en los destinos pedidos (y/o lo escribe a archivos).
+    """
+    destinos = set(args.destinos)
+    if "redis" in destinos:
+        destinos.add("mongo")  # los índices de Redis se arman leyendo Mongo
+    if not destinos and not args.archivos:
+        print("Indicar --destinos y/o --archivos.")
+        return
+    conexiones = {
+        "mongo": conectar_mongo() if "mongo" in destinos else None,
+        "redis": conectar_redis() if "redis" in destinos else None,
+        "neo4j": conectar_neo4j() if "neo4j" in destinos else None,
+    }
+    faltan = [d for d in destinos if conexiones[d] is None]
+    if faltan:
+        print("Falta alguna conexión:", ", ".join(sorted(faltan)))
+        return
+    cfg = ConfigGenerador(
+        candidatos=args.candidatos, ofertas=args.ofertas, empresas=args.empresas, cursos=args.cursos,
+        skills=args.skills, zipf_s=args.zipf, postulados_alpha=args.alpha, batch=args.batch, seed=args.seed,
+    )
+    conteo = cargar(cfg, db=conexiones["mongo"], r=conexiones["redis"], graph=conexiones["neo4j"],
+                    directorio=args.archivos)
+    for coleccion, n in conteo.items():
+        print(f"{coleccion}: {n}")
+
+def _texto_forma(forma) -> str:
+    # Cypher se guarda como texto; los comandos de Mongo como documento
+    return forma if isinstance(forma, str) else json.dumps(forma, ensure_ascii=False)
+
+def slowlog(args):
+    """
+    Lee la lista lentas:ops de Redis que llena la API (app/services/operaciones_lentas.py).
+    """
+    r = conectar_redis()
+    if r is None:
+        print("Falta la conexión a Redis.")
+        return
+    if args.borrar:
+        print("Eliminadas:", r.delete(CLAVE_LENTAS))
+        return
+    if args.agrupar:
+        ops = leer(r, limite=10**9, backend=args.backend, endpoint=args.endpoint)
+        filas = agrupar(ops)[:args.limite]
+        for g in filas:
+            print(f"[{g['huella']}] {g['backend']} {g['operacion']}  n={g['n']}  total={g['total_ms']}ms"
+                  f"  p50={g['p50_ms']}ms  max={g['max_ms']}ms  {', '.join(g['endpoints'])}")
+            print("   ", _texto_forma(g["forma"]))
+            if args.planes and g["plan"]:
+                print(json.dumps(g["plan"], ensure_ascii=False, indent=2))
+        return
+    for op in leer(r, limite=args.limite, backend=args.backend, endpoint=args.endpoint):
+        print(f"{op['fecha']}  {op['duracion_ms']:>9}ms  {op['backend']} {op['operacion']}  {op['endpoint']}"
+              f"  [{op['huella']}]")
+        print("   ", _texto_forma(op["forma"]))
+        if op.get("parametros"):
+            print("    parámetros:", op["parametros"])
+        if args.planes and op.get("plan"):
+            print(json.dumps(op["plan"], ensure_ascii=False, indent=2))
+
 def main():
     args = parse_args()
+    if args.cmd == "generar":
+        generar(args)
+        return
+    if args.cmd == "slowlog":
+        slowlog(args)
+        return
+
     db = conectar_mongo()
     graph = conectar_neo4j()
     r = conectar_redis()
@@ -37,7 +161,9 @@ def main():
     #Si alguna conexión falla, el programa termina y avisa
 
     if args.cmd == "recs":
-        res = get_recommendations(db, graph, r, args.oferta)
+        res = asyncio.run(get_recommendations(
+            conectar_mongo_async(), conectar_neo4j_async(), conectar_redis_async(), args.oferta
+        ))
         print(f"Fuente: {res['source']}")
         print("Recs:", res["recs"])
         print("Perfiles:", res["perfiles"])
@@ -45,7 +171,9 @@ def main():
     #Imprime la fuente, las recomendaciones y los perfiles asociados
 
     elif args.cmd == "recompute":
-        items = recompute_matches(db, graph, r, args.oferta)
+        items = asyncio.run(recompute_matches(
+            conectar_mongo_async(), conectar_neo4j_async(), conectar_redis_async(), args.oferta
+        ))
         print("Recomputadas:", len(items))
         print(items)
     #Recalcula todas las recomendaciones y refresca la cache de Redis
@@ -57,5 +185,64 @@ def main():
     #Borra la cache de la oferta específica en Redis
     #Imprime cuántos elementos se eliminaron
 
+    elif args.cmd == "reindex-ofertas":
+        try:
+            n = reconstruir_indice(db, r)
+        except ReconstruccionEnCurso as e:
+            print(e)
+            raise SystemExit(1)
+        print("Ofertas indexadas:", n)
+    #Recorre las ofertas abiertas de Mongo y regenera skill:{skill}:ofertas
+    #Si otro proceso ya lo está reconstruyendo, termina con código 1
+
+    elif args.cmd == "reindex-usuarios":
+        try:
+            res = reconstruir_indice_usuarios(db, r, batch_size=args.batch)
+        except ReconstruccionEnCurso as e:
+            print(e)
+            raise SystemExit(1)
+        print("Usuarios indexados:", res["usuarios"], "| Skills:", res["skills"],
+              "| Releídos por escrituras concurrentes:", res["reaplicados"])
+    #Recorre candidatos en lotes, carga sets temporales y los reemplaza con RENAME
+    #Si otro proceso ya lo está reconstruyendo, termina con código 1
+
+    elif args.cmd == "indices":
+        creados = asegurar_indices(db)
+        for coleccion, nombres in creados.items():
+            print(f"{coleccion}: {', '.join(nombres)}")
+        fallidos = indices_fallidos(creados)
+        regresiones = 0
+        for v in verificar_indices(db):
+            estado = "OK " if v["ok"] else "MAL"
+            print(f"[{estado}] {v['consulta']} ({v['coleccion']}): {v.get('etapas') or v.get('error')}")
+            regresiones += not v["ok"]
+        if fallidos:
+            print("Índices que no se pudieron crear:", len(fallidos))
+        if regresiones:
+            print("Consultas sin índice:", regresiones)
+        if fallidos or regresiones:
+            raise SystemExit(1)
+    #Crea los índices declarados y muestra el plan de cada forma de consulta
+    #Termina con código 1 si algún índice no se pudo crear (p. ej. unique con duplicados)
+    #o si alguna consulta hace COLLSCAN o sort en memoria
+
+    elif args.cmd == "import":
+        formato = args.formato or ("csv" if args.archivo.lower().endswith(".csv") else "ndjson")
+        with open(args.archivo, encoding="utf-8-sig", newline="") as f:
+            res = importar_candidatos(db, r, f, formato, batch_size=args.batch)
+        escritor_grafo.detener(timeout_s=300)
+        print("Recibidos:", res["recibidos"], "| Creados:", res["creados"], "| Rechazados:", res["rechazados"])
+        for e in res["errores"]:
+            print(f"  fila {e['fila']} ({e['nombre']}): {e['error']}")
+        if res.get("sin_indexar_en_redis"):
+            print("Sin indexar en Redis:", res["sin_indexar_en_redis"], "(correr reindex-usuarios)")
+        if res.get("sin_versionar"):
+            print("Sin versión inicial en versiones_perfil:", res["sin_versionar"])
+        if res.get("error"):
+            print("ERROR:", res["error"])
+            raise SystemExit(1)
+    #Lee el archivo en streaming y crea los candidatos por lotes
+    #Antes de salir espera a que el escritor de grafo vuelque lo encolado en Neo4j
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
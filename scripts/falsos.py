@@ -0,0 +1,137 @@
+import re
+from typing import Dict, List, Optional
+
+import fakeredis
+import fakeredis.aioredis
+import mongomock
+from mongomock_motor import AsyncMongoMockClient
+
+from app.services.conexion_nosql import gestor
+
+# Reemplazos en memoria de Mongo, Redis y Neo4j para correr la app sin servicios (benchmarks).
+# Se registran en el GestorConexiones, así que los endpoints los reciben por conectar_* como
+# a los clientes reales. Sync y async comparten los mismos datos:
+#   - Mongo: mongomock (sync) y mongomock_motor sobre el mismo cliente (async)
+#   - Redis: fakeredis sync y async sobre el mismo FakeServer
+#   - Neo4j: un grafo de postulaciones (oferta_id -> nombres) que responde la consulta de
+#     POSTULA_A / POSTULO_A de recompute_matches; las escrituras del escritor de grafo se cuentan
+_RE_POSTULADOS = re.compile(r"POSTUL[AO]_A", re.IGNORECASE)
+
+
+class ResultadoFalso:
+    def __init__(self, filas: List[Dict]):
+        self.filas = filas
+
+    def data(self) -> List[Dict]:
+        return list(self.filas)
+
+    def evaluate(self):
+        return next(iter(self.filas[0].values())) if self.filas else None
+
+
+class GrafoFalso:
+    """
+    Grafo en memoria con la interfaz de py2neo que usa la app (run, begin/commit/rollback).
+    """
+
+    def __init__(self, postulaciones: Optional[Dict[str, List[str]]] = None):
+        self.postulaciones: Dict[str, List[str]] = postulaciones if postulaciones is not None else {}
+        self.sentencias = 0
+        self.filas_escritas = 0
+
+    def consultar(self, query: str, params: Dict) -> List[Dict]:
+        if _RE_POSTULADOS.search(query):
+            return [{"nombre": n} for n in dict.fromkeys(self.postulaciones.get(params.get("ofid"), []))]
+        if query.strip().upper() == "RETURN 1":
+            return [{"1": 1}]
+        self.sentencias += 1
+        self.filas_escritas += len(params.get("filas") or [])
+        return []
+
+    # -------- py2neo (sync) --------
+    def run(self, query: str, parameters: Optional[Dict] = None, **params) -> ResultadoFalso:
+        # Misma firma que Graph.run / Transaction.run: dict posicional y/o kwargs
+        return ResultadoFalso(self.consultar(query, {**(parameters or {}), **params}))
+
+    def begin(self):
+        return self
+
+    def commit(self, tx):
+        pass
+
+    def rollback(self, tx):
+        pass
+
+
+class _ResultadoAsync:
+    def __init__(self, filas: List[Dict]):
+        self.filas = filas
+
+    async def data(self) -> List[Dict]:
+        return list(self.filas)
+
+
+class _SesionAsync:
+    def __init__(self, grafo: GrafoFalso):
+        self.grafo = grafo
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query: str, parameters: Optional[Dict] = None, **params) -> _ResultadoAsync:
+        return _ResultadoAsync(self.grafo.consultar(query, {**(parameters or {}), **params}))
+
+
+class DriverNeo4jFalso:
+    """
+    Interfaz del AsyncDriver de neo4j que usa run_cypher, sobre un GrafoFalso.
+    """
+
+    def __init__(self, grafo: GrafoFalso):
+        self.grafo = grafo
+
+    def session(self, **_kwargs) -> _SesionAsync:
+        return _SesionAsync(self.grafo)
+
+    async def verify_connectivity(self):
+        return None
+
+    async def close(self):
+        return None
+
+
+class Falsos:
+    def __init__(self, db, db_async, r, r_async, grafo: GrafoFalso):
+        self.db = db
+        self.db_async = db_async
+        self.r = r
+        self.r_async = r_async
+        self.grafo = grafo
+
+
+def instalar_falsos(nombre_db: str = "tpo_database") -> Falsos:
+    """
+    Crea los clientes en memoria y los registra en el gestor de conexiones.
+    """
+    cliente = mongomock.MongoClient()
+    servidor = fakeredis.FakeServer()
+    grafo = GrafoFalso()
+    f = Falsos(
+        db=cliente[nombre_db],
+        db_async=AsyncMongoMockClient(mock_mongo_client=cliente)[nombre_db],
+        r=fakeredis.FakeRedis(server=servidor, decode_responses=True),
+        r_async=fakeredis.aioredis.FakeRedis(server=servidor, decode_responses=True),
+        grafo=grafo,
+    )
+    gestor.usar(
+        mongo=f.db,
+        mongo_async=f.db_async,
+        redis=f.r,
+        redis_async=f.r_async,
+        neo4j=grafo,
+        neo4j_async=DriverNeo4jFalso(grafo),
+    )
+    return f
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import fakeredis
+import mongomock_motor
+import pytest
+
+import app.services.cache_perfiles as modulo
+from app.services.cache_perfiles import CANAL_INVALIDACION, CachePerfiles, clave_perfil, invalidar_perfil
+from app.services.candidatos import documento_nuevo
+
+
+def _esperar(condicion, timeout_s: float = 5.0) -> bool:
+    limite = time.monotonic() + timeout_s
+    while time.monotonic() < limite:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return condicion()
+
+
+@pytest.fixture
+def entorno():
+    servidor = fakeredis.FakeServer()
+    r = fakeredis.FakeRedis(server=servidor, decode_responses=True)
+    ra = fakeredis.FakeAsyncRedis(server=servidor, decode_responses=True)
+    db = mongomock_motor.AsyncMongoMockClient().db
+    asyncio.run(db.candidatos.insert_many([
+        documento_nuevo("ana", "ana@x.com", None, None, ["python"]),
+        documento_nuevo("beto", "beto@x.com", None, None, ["sql"]),
+    ]))
+    cp = CachePerfiles()
+    cp.iniciar(r)
+    assert _esperar(lambda: r.pubsub_numsub(CANAL_INVALIDACION)[0][1] == 1)
+    yield cp, r, ra, db
+    cp.detener()
+
+
+def test_invalidacion_publicada_solo_descarta_ese_perfil(entorno):
+    cp, r, ra, db = entorno
+    for nombre in ("ana", "beto"):
+        assert asyncio.run(cp.obtener(db, ra, nombre)) is not None
+    assert cp.stats()["lru_items"] == 2
+
+    r.publish(CANAL_INVALIDACION, "ana")
+
+    assert _esperar(lambda: cp._get_local("ana") is None)
+    assert cp._get_local("beto") is not None
+    assert cp.activo
+    assert cp.stats()["invalidaciones"] == 1
+
+
+def test_invalidar_durante_el_llenado_solo_afecta_a_ese_nombre(entorno, monkeypatch):
+    cp, r, ra, db = entorno
+    leer = modulo.buscar_candidato_async
+
+    async def lento(db_, nombre):
+        doc = await leer(db_, nombre)
+        if nombre == "beto":
+            await asyncio.sleep(0.05)  # sigue en vuelo cuando se invalida ana
+        else:
+            # Una escritura de ana llega mientras se leía Mongo (para ana y para beto)
+            invalidar_perfil(r, "ana")
+            cp.descartar("ana")
+        return doc
+
+    monkeypatch.setattr(modulo, "buscar_candidato_async", lento)
+
+    async def ambos():
+        return await asyncio.gather(cp.obtener(db, ra, "beto"), cp.obtener(db, ra, "ana"))
+
+    assert all(asyncio.run(ambos()))
+    # ana pudo leerse vieja: no entra a ningún cache. beto no se ve afectado
+    assert cp._get_local("ana") is None and r.get(clave_perfil("ana")) is None
+    assert cp._get_local("beto") is not None and r.get(clave_perfil("beto")) is not None
+    assert cp._en_curso == {}
@@ -0,0 +1,47 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils.campos import MAX_CAMPOS, parsear_campos, proyeccion, proyeccion_salida, recortar
+
+
+def test_parsear_campos():
+    assert parsear_campos(None) is None
+    assert parsear_campos("  ") is None
+    assert parsear_campos(" , ,") is None
+    assert parsear_campos("a, b.c ,a") == ["a", "b.c"]
+    assert parsear_campos("informacion_personal.email,_id") == ["informacion_personal.email", "_id"]
+
+
+@pytest.mark.parametrize("fields", ["$where", "a.$b", "a..b", "1a", "a b", ".a", "a."])
+def test_parsear_campos_invalidos(fields):
+    with pytest.raises(HTTPException) as e:
+        parsear_campos(fields)
+    assert e.value.status_code == 400
+
+
+def test_parsear_campos_demasiados():
+    assert len(parsear_campos(",".join(f"c{i}" for i in range(MAX_CAMPOS)))) == MAX_CAMPOS
+    with pytest.raises(HTTPException):
+        parsear_campos(",".join(f"c{i}" for i in range(MAX_CAMPOS + 1)))
+
+
+def test_proyeccion_sin_rutas_superpuestas():
+    assert proyeccion(None) is None
+    assert proyeccion(["a.b", "a", "c"]) == {"a": 1, "c": 1, "_id": 0}
+    assert proyeccion(["ab", "a"]) == {"a": 1, "ab": 1, "_id": 0}
+    assert proyeccion(["_id", "a"], excluir_id=True) == {"_id": 1, "a": 1}
+    assert proyeccion(["a"], excluir_id=False) == {"a": 1}
+
+
+def test_proyeccion_salida():
+    mapa = {"puesto": ["puesto"], "empresa": ["empresa_id"]}
+    assert proyeccion_salida(None, mapa) is None
+    assert proyeccion_salida(["empresa"], mapa, siempre=["fecha_creacion"]) == {"empresa_id": 1, "fecha_creacion": 1}
+    with pytest.raises(HTTPException):
+        proyeccion_salida(["sueldo"], mapa)
+
+
+def test_recortar():
+    doc = {"puesto": "dev", "empresa": "acme", "id": "1"}
+    assert recortar(doc, None) is doc
+    assert recortar(doc, ["empresa", "inexistente"]) == {"empresa": "acme"}
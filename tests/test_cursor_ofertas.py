@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.services.ofertas import codificar_cursor, decodificar_cursor
+
+ORDEN = [("fecha_creacion", -1), ("_id", -1)]
+
+
+def test_cursor_ida_y_vuelta():
+    fecha, _id = datetime(2024, 5, 1, 12, 30), ObjectId()
+    filtro = decodificar_cursor(codificar_cursor(fecha, _id))
+    assert filtro["$or"][0] == {"fecha_creacion": {"$lt": fecha}}
+    assert filtro["$or"][1] == {"fecha_creacion": fecha, "_id": {"$lt": _id}}
+
+    assert decodificar_cursor(codificar_cursor(None, _id)) == {"fecha_creacion": None, "_id": {"$lt": _id}}
+
+
+def test_cursor_invalido():
+    with pytest.raises(ValueError):
+        decodificar_cursor("no-es-un-cursor")
+
+
+def test_paginar_recorre_todo_una_vez_con_fechas_nulas_y_repetidas():
+    col = mongomock.MongoClient().db.ofertas
+    base = datetime(2024, 1, 1)
+    docs = [{"fecha_creacion": base + timedelta(days=i % 4)} for i in range(13)]  # fechas repetidas
+    docs += [{"fecha_creacion": None} for _ in range(5)]
+    col.insert_many(docs)
+    esperado = [d["_id"] for d in col.find({}, sort=ORDEN)]
+
+    vistos, filtro = [], {}
+    while True:
+        pagina = list(col.find(filtro, sort=ORDEN, limit=4))
+        if not pagina:
+            break
+        vistos += [d["_id"] for d in pagina]
+        ultimo = pagina[-1]
+        filtro = decodificar_cursor(codificar_cursor(ultimo["fecha_creacion"], ultimo["_id"]))
+    assert vistos == esperado
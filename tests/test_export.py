@@ -0,0 +1,54 @@
+import json
+
+import fakeredis
+import mongomock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import app.api.export as export
+from app.services.conexion_nosql import gestor
+
+
+def test_export_recomendaciones_es_una_foto_del_zset(monkeypatch):
+    servidor = fakeredis.FakeServer()
+    r = fakeredis.FakeRedis(server=servidor, decode_responses=True)
+    cliente = mongomock.MongoClient()
+    gestor.usar(
+        redis=r,
+        redis_async=fakeredis.FakeAsyncRedis(server=servidor, decode_responses=True),
+        mongo_async=AsyncMongoMockClient(mock_mongo_client=cliente)["tpo_database"],
+    )
+    scores = {f"c{i:02d}": float(i % 5) for i in range(23)}  # con empates
+    r.zadd("cache:match:of-1", scores)
+
+    perfiles = export._perfiles_por_lote
+    lotes = []
+
+    def recompute_en_el_medio(db, nombres, proy):
+        # Un recompute reescribe scores y agrega candidatos mientras se exporta
+        if not lotes:
+            r.zadd("cache:match:of-1", {"c00": 100.0, "c01": 99.0, "nuevo": 50.0})
+        lotes.append(nombres)
+        return perfiles(db, nombres, proy)
+
+    monkeypatch.setattr(export, "_perfiles_por_lote", recompute_en_el_medio)
+    app = FastAPI()
+    app.include_router(export.router)
+    with TestClient(app) as c:
+        resp = c.get("/export/recomendaciones/of-1?batch=4")
+    filas = [json.loads(linea) for linea in resp.text.splitlines()]
+
+    assert sorted(f["candidato"] for f in filas) == sorted(scores)
+    assert [f["score"] for f in filas] == sorted(scores.values(), reverse=True)
+    assert len(lotes) == 6
+    assert not list(r.scan_iter(match="tmp:export:*"))
+
+
+def test_export_recomendaciones_sin_cache():
+    gestor.usar(redis_async=fakeredis.FakeAsyncRedis(decode_responses=True),
+                mongo_async=AsyncMongoMockClient()["tpo_database"])
+    app = FastAPI()
+    app.include_router(export.router)
+    with TestClient(app) as c:
+        assert c.get("/export/recomendaciones/no-existe").status_code == 404
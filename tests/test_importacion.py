@@ -0,0 +1,91 @@
+import json
+
+import fakeredis
+import mongomock
+import pytest
+
+from app.services import importacion
+from app.services.importacion import importar_candidatos, leer_csv, leer_ndjson
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    # Neo4j queda fuera del test
+    monkeypatch.setattr(importacion.escritor_grafo, "encolar_varios", lambda tipo, filas: None)
+    return mongomock.MongoClient().db, fakeredis.FakeRedis(decode_responses=True)
+
+
+def test_leer_ndjson():
+    lineas = ['{"nombre": "a"}', "", "   ", "no es json", "[1, 2]", '{"nombre": "b"}']
+    filas = list(leer_ndjson(lineas))
+    assert [(n, f) for n, f, _e in filas] == [(1, {"nombre": "a"}), (4, None), (5, None), (6, {"nombre": "b"})]
+    assert filas[1][2].startswith("JSON inválido") and filas[2][2] == "Se esperaba un objeto JSON por línea"
+
+
+def test_leer_csv():
+    lineas = [
+        "nombre,email,celular,residencia,skills\n",
+        "Ana,ana@x.com,,CABA,python;SQL|docker\n",
+        ",,,,\n",
+        'Beto,beto@x.com,123,,"go, rust"\n',
+    ]
+    filas = list(leer_csv(lineas))
+    assert [n for n, _f, _e in filas] == [2, 4]
+    ana, beto = filas[0][1], filas[1][1]
+    assert ana["skills"] == ["python", "SQL", "docker"] and ana["celular"] is None and ana["residencia"] == "CABA"
+    assert beto["skills"] == ["go", " rust"] and beto["residencia"] is None
+
+
+def test_importar_errores_por_fila(entorno):
+    db, r = entorno
+    db.candidatos.insert_one({"informacion_personal": {"nombre_apellido": "existe"}})
+    lineas = [
+        json.dumps({"nombre": "Nuevo Uno", "email": "u@x.com", "skills": ["Python", "python", " sql "]}),
+        json.dumps({"nombre": "nuevo uno", "email": "otra@x.com"}),
+        json.dumps({"nombre": "Existe", "email": "e@x.com"}),
+        json.dumps({"nombre": "Sin Email"}),
+        json.dumps({"nombre": "  ", "email": "v@x.com"}),
+        "{roto",
+        json.dumps({"nombre": "Dos", "email": "d@x.com"}),
+    ]
+    res = importar_candidatos(db, r, lineas, batch_size=2)
+
+    assert res["ok"] and res["recibidos"] == 7 and res["creados"] == 2 and res["rechazados"] == 5
+    errores = {e["fila"]: e["error"] for e in res["errores"]}
+    assert errores[2] == "Repetido en el archivo"
+    assert errores[3] == "El usuario ya existe"
+    assert errores[4].startswith("email:")
+    assert errores[5] == "nombre vacío"
+    assert errores[6].startswith("JSON inválido")
+    doc = db.candidatos.find_one({"informacion_personal.nombre_apellido": "nuevo uno"})
+    assert [t["nombre"] for t in doc["habilidades"]["tecnicas"]] == ["python", "sql"]
+    assert r.smembers("skill:python:users") == {"nuevo uno"}
+    assert db.versiones_perfil.count_documents({}) == 2
+
+
+def test_importar_falla_de_versiones_no_frena(entorno, monkeypatch):
+    db, r = entorno
+
+    def falla(*_a, **_k):
+        raise RuntimeError("mongo caído")
+
+    monkeypatch.setattr(importacion, "log_versions", falla)
+    res = importar_candidatos(db, r, [json.dumps({"nombre": "a", "email": "a@x.com"})])
+    assert res["creados"] == 1 and res["sin_versionar"] == 1
+
+
+def test_importar_corta_en_utf8_invalido(entorno):
+    db, r = entorno
+
+    def lineas():
+        yield json.dumps({"nombre": "a", "email": "a@x.com"})
+        b"\xff".decode("utf-8")
+        yield json.dumps({"nombre": "b", "email": "b@x.com"})
+
+    res = importar_candidatos(db, r, lineas())
+    assert not res["ok"] and res["creados"] == 1 and "UTF-8" in res["error"]
+
+
+def test_formato_desconocido(entorno):
+    with pytest.raises(ValueError):
+        importar_candidatos(*entorno, [], formato="xml")
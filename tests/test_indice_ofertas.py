@@ -0,0 +1,101 @@
+import fakeredis
+import mongomock
+import pytest
+
+from app.services.indice_ofertas import (
+    INDICE,
+    MARCA_INDICE,
+    asegurar_indice,
+    desindexar_oferta,
+    indexar_oferta,
+    reconstruir_indice,
+)
+from app.services.reconstruccion import ReconstruccionEnCurso, clave_lock, tomar
+
+
+def _reqs(*skills):
+    return [{"habilidad": s} for s in skills]
+
+
+@pytest.fixture
+def r():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def _indice(r):
+    return {k: r.zrange(k, 0, -1) for k in sorted(r.scan_iter(match="skill:*:ofertas"))}
+
+
+def test_indexar_reemplaza_las_skills_previas(r):
+    indexar_oferta(r, "o1", _reqs("python", "sql", "python"), "abierta")
+    assert r.zscore("skill:python:ofertas", "o1") == 2
+    indexar_oferta(r, "o1", _reqs("java"), "abierta")
+    assert _indice(r) == {"skill:java:ofertas": ["o1"]}
+    assert r.smembers("oferta:o1:skills") == {"java"}
+    desindexar_oferta(r, "o1")
+    assert _indice(r) == {} and not r.exists("oferta:o1:skills")
+
+
+class _DbConEscrituras:
+    """Base de datos cuyo primer find de ofertas deja que la "API" escriba a mitad del cursor."""
+
+    def __init__(self, db, r, al_leer):
+        self.ofertas = self
+        self._col, self._al_leer, self._hecho = db.ofertas, al_leer, False
+
+    def find(self, *args, **kwargs):
+        if self._hecho:
+            return self._col.find(*args, **kwargs)
+        self._hecho = True
+        return self._cursor(list(self._col.find(*args, **kwargs)))
+
+    def _cursor(self, docs):
+        for i, d in enumerate(docs):
+            yield d
+            if i == 0:
+                self._al_leer()
+
+
+def test_rebuild_no_pisa_escrituras_concurrentes(r):
+    db = mongomock.MongoClient().db
+    ids = db.ofertas.insert_many([
+        {"estado": "abierta", "requerimientos": _reqs("python")},
+        {"estado": "abierta", "requerimientos": _reqs("sql")},
+        {"estado": "abierta", "requerimientos": _reqs("react")},
+    ]).inserted_ids
+    r.zadd("skill:cobol:ofertas", {"vieja": 1})  # ya no la pide nadie: tiene que desaparecer
+    nueva = {}
+
+    def api():
+        # POST de una oferta nueva, PUT que cierra otra y PUT que cambia skills de la tercera
+        nueva["id"] = str(db.ofertas.insert_one(
+            {"estado": "abierta", "requerimientos": _reqs("go")}).inserted_id)
+        indexar_oferta(r, nueva["id"], _reqs("go"), "abierta")
+        db.ofertas.update_one({"_id": ids[1]}, {"$set": {"estado": "cerrada"}})
+        desindexar_oferta(r, str(ids[1]))
+        db.ofertas.update_one({"_id": ids[2]}, {"$set": {"requerimientos": _reqs("vue")}})
+        indexar_oferta(r, str(ids[2]), _reqs("vue"), "abierta")
+
+    reconstruir_indice(_DbConEscrituras(db, r, api), r, batch_size=1)
+
+    assert _indice(r) == {
+        "skill:go:ofertas": [nueva["id"]],
+        "skill:python:ofertas": [str(ids[0])],
+        "skill:vue:ofertas": [str(ids[2])],
+    }
+    assert not r.exists(f"oferta:{ids[1]}:skills")
+    assert r.smembers(f"oferta:{nueva['id']}:skills") == {"go"}
+    assert r.exists(MARCA_INDICE) and not r.exists(clave_lock(INDICE))
+    assert not list(r.scan_iter(match="tmp:*")) and not list(r.scan_iter(match="indice:ofertas:tocadas:*"))
+
+
+def test_un_solo_rebuild_a_la_vez(r):
+    db = mongomock.MongoClient().db
+    db.ofertas.insert_one({"estado": "abierta", "requerimientos": _reqs("python")})
+    tomar(r, INDICE)  # otro worker
+    assert asegurar_indice(db, r) is None
+    with pytest.raises(ReconstruccionEnCurso):
+        reconstruir_indice(db, r)
+    r.delete(clave_lock(INDICE))
+    assert asegurar_indice(db, r) == 1
+    assert asegurar_indice(db, r) is None
@@ -0,0 +1,92 @@
+import fakeredis
+import mongomock
+import pytest
+
+from app.services.candidatos import documento_nuevo
+from app.services.indice_usuarios import (
+    INDICE,
+    desindexar_usuario,
+    indexar_usuario,
+    reconstruir_indice_usuarios,
+)
+from app.services.reconstruccion import ReconstruccionEnCurso, clave_lock, tomar
+
+
+@pytest.fixture
+def r():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def _indice(r):
+    return {k: r.smembers(k) for k in sorted(r.scan_iter(match="skill:*:users"))}
+
+
+class _DbConEscrituras:
+    """Base de datos cuyo primer find de candidatos deja que la "API" escriba a mitad del cursor."""
+
+    def __init__(self, db, al_leer):
+        self.candidatos = self
+        self._col, self._al_leer, self._hecho = db.candidatos, al_leer, False
+
+    def find(self, *args, **kwargs):
+        if self._hecho:
+            return self._col.find(*args, **kwargs)
+        self._hecho = True
+        return self._cursor(list(self._col.find(*args, **kwargs)))
+
+    def _cursor(self, docs):
+        for i, d in enumerate(docs):
+            yield d
+            if i == 0:
+                self._al_leer()
+
+
+def test_rebuild_no_pisa_escrituras_concurrentes(r):
+    db = mongomock.MongoClient().db
+    db.candidatos.insert_many([
+        documento_nuevo("ana", "ana@x.com", None, None, ["python"]),
+        documento_nuevo("beto", "beto@x.com", None, None, ["sql"]),
+        documento_nuevo("caro", "caro@x.com", None, None, ["react"]),
+    ])
+    r.sadd("skill:cobol:users", "nadie")
+
+    def api():
+        # POST /users, DELETE /users/beto y /skills/add para caro, mientras corre el cursor
+        db.candidatos.insert_one(documento_nuevo("dani", "dani@x.com", None, None, ["go"]))
+        db.candidatos.delete_one({"informacion_personal.nombre_apellido": "beto"})
+        db.candidatos.update_one(
+            {"informacion_personal.nombre_apellido": "caro"},
+            {"$addToSet": {"habilidades.tecnicas": {"nombre": "vue", "nivel": 5}}},
+        )
+        pipe = r.pipeline(transaction=False)
+        indexar_usuario(pipe, "dani", ["go"])
+        desindexar_usuario(pipe, "beto", ["sql"])
+        indexar_usuario(pipe, "caro", ["vue"])
+        pipe.execute()
+
+    res = reconstruir_indice_usuarios(_DbConEscrituras(db, api), r, batch_size=1)
+
+    assert res["reaplicados"] == 3
+    assert _indice(r) == {
+        "skill:go:users": {"dani"},
+        "skill:python:users": {"ana"},
+        "skill:react:users": {"caro"},
+        "skill:vue:users": {"caro"},
+    }
+    assert not r.exists(clave_lock(INDICE))
+    assert not list(r.scan_iter(match="tmp:*")) and not list(r.scan_iter(match="indice:usuarios:tocadas:*"))
+
+
+def test_un_solo_rebuild_a_la_vez(r):
+    db = mongomock.MongoClient().db
+    tomar(r, INDICE)
+    with pytest.raises(ReconstruccionEnCurso):
+        reconstruir_indice_usuarios(db, r)
+
+
+def test_sin_rebuild_en_curso_no_se_anotan_toques(r):
+    pipe = r.pipeline(transaction=False)
+    indexar_usuario(pipe, "Ana", ["python"])
+    pipe.execute()
+    assert _indice(r) == {"skill:python:users": {"Ana"}}
+    assert not list(r.scan_iter(match="indice:*"))
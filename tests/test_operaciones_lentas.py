@@ -0,0 +1,147 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+from bson.regex import Regex
+
+from app.services import operaciones_lentas
+from app.services.operaciones_lentas import (
+    MonitorLentasMongo,
+    RegistroLento,
+    _plan_cypher,
+    _resumir_explain,
+    forma,
+    forma_comando,
+    forma_cypher,
+    huella,
+)
+
+
+def test_forma():
+    filtro = {"nombre": {"$in": ["ana", "beto", "carla"]}, "edad": {"$gt": 30}, "email": Regex("^a"),
+              "tags": [], "patron": re.compile("x")}
+    assert forma(filtro) == {
+        "nombre": {"$in": ["?", "... 3"]}, "edad": {"$gt": "?"}, "email": "/?/", "tags": [], "patron": "/?/",
+    }
+    assert forma([{"a": 1}]) == [{"a": "?"}]
+
+
+def test_forma_comando_sin_sesion():
+    comando = {"find": "candidatos", "filter": {"nombre": "ana"}, "limit": 5, "lsid": {"id": "x"}, "$db": "tpo"}
+    assert forma_comando(comando) == {"find": "candidatos", "filter": {"nombre": "?"}, "limit": "?"}
+    # Misma forma con otros valores: misma huella
+    otro = forma_comando({"find": "candidatos", "filter": {"nombre": "beto"}, "limit": 50})
+    assert huella(otro) == huella(forma_comando(comando))
+
+
+def test_forma_cypher():
+    q = "MATCH (u:User {name: 'o\\'hara'}) WHERE u.edad > 30 AND u.x = \"y\"  RETURN u LIMIT $lim"
+    assert forma_cypher(q) == "MATCH (u:User {name: ?}) WHERE u.edad > ? AND u.x = ? RETURN u LIMIT $lim"
+    assert forma_cypher("MATCH (n1:Skill) RETURN n1") == "MATCH (n1:Skill) RETURN n1"
+
+
+def test_resumir_explain_sin_valores():
+    res = {
+        "queryPlanner": {
+            "parsedQuery": {"nombre": {"$eq": "ana"}},
+            "winningPlan": {"stage": "FETCH", "inputStage": {
+                "stage": "IXSCAN", "indexName": "nombre_1", "indexBounds": {"nombre": ['["ana", "ana"]']},
+            }},
+            "rejectedPlans": [{}, {}],
+        },
+        "executionStats": {"nReturned": 1, "allPlansExecution": [{}]},
+        "command": {"find": "candidatos", "filter": {"nombre": "ana"}},
+        "serverInfo": {}, "ok": 1,
+    }
+    out = _resumir_explain(res)
+    assert set(out) == {"queryPlanner", "executionStats"}
+    assert out["queryPlanner"]["parsedQuery"] == {"nombre": {"$eq": "?"}}
+    assert out["queryPlanner"]["winningPlan"]["inputStage"]["indexBounds"] == {"nombre": ["?"]}
+    assert out["queryPlanner"]["winningPlan"]["inputStage"]["indexName"] == "nombre_1"
+    assert out["queryPlanner"]["rejectedPlans"] == 2
+    assert out["executionStats"] == {"nReturned": 1}
+    assert "ana" not in repr(out)
+
+
+def test_plan_cypher_sin_literales():
+    plan = {
+        "operator_type": "Filter@neo4j",
+        "args": {"Details": "u.name = 'ana' AND u.edad > 30", "planner-version": "5.1", "runtime": "PIPELINED",
+                 "Rows": 3},
+        "children": [{"operator_type": "NodeByLabelScan", "args": {"Details": "u:User"}, "children": []}],
+    }
+    out = _plan_cypher(plan)
+    assert out["args"]["Details"] == "u.name = ? AND u.edad > ?"
+    assert out["args"]["planner-version"] == "5.1" and out["args"]["runtime"] == "PIPELINED"
+    assert out["args"]["Rows"] == 3
+    assert out["children"][0]["args"]["Details"] == "u:User"
+    assert _plan_cypher(None) is None
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    monkeypatch.setenv("LENTAS_UMBRAL_MS", "10")
+    monkeypatch.setenv("LENTAS_PLAN_MUESTREO", "1")
+    monkeypatch.setenv("LENTAS_PLANES_POR_MIN", "1000")
+    monkeypatch.setenv("LENTAS_FORMAS_MAX", "3")
+    monkeypatch.setenv("LENTAS_EN_CURSO_MAX", "3")
+    monkeypatch.setenv("LENTAS_EN_CURSO_S", "60")
+    reg = RegistroLento()
+    reg.encolados = []
+    monkeypatch.setattr(reg, "_encolar", lambda entrada, plan: reg.encolados.append((entrada, plan)))
+    return reg
+
+
+def test_plan_por_forma_acotado(registro):
+    for h in ("a", "b", "c", "d"):
+        assert registro._quiere_plan(h)
+    assert list(registro._plan_por_forma) == ["b", "c", "d"]
+    assert not registro._quiere_plan("d")
+    # Vencido plan_cada_s la forma se olvida y vuelve a tener plan
+    for h in registro._plan_por_forma:
+        registro._plan_por_forma[h] -= registro.plan_cada_s
+    assert registro._quiere_plan("d")
+    assert list(registro._plan_por_forma) == ["d"]
+
+
+def _evento(request_id, comando=None, duracion_ms=0):
+    comando = comando or {"find": "candidatos", "filter": {"nombre": "ana"}, "lsid": {"id": "x"}}
+    return SimpleNamespace(
+        command_name=next(iter(comando)), command=comando, database_name="tpo",
+        connection_id=("localhost", 27017), request_id=request_id, duration_micros=duracion_ms * 1000,
+    )
+
+
+def test_monitor_guarda_solo_lo_necesario(registro):
+    monitor = MonitorLentasMongo(registro)
+    documentos = [{"nombre": f"c{i}"} for i in range(100)]
+    monitor.started(_evento(1, {"insert": "candidatos", "documents": documentos}))
+    monitor.started(_evento(2))
+    _, _, (nombre, forma_op, explicar) = monitor._en_curso[(("localhost", 27017), 1)]
+    assert (nombre, explicar) == ("insert", None)
+    assert forma_op == {"insert": "candidatos", "documents": [{"nombre": "?"}, "... 100"]}
+    _, _, (nombre, forma_op, explicar) = monitor._en_curso[(("localhost", 27017), 2)]
+    assert forma_op is None and explicar == {"find": "candidatos", "filter": {"nombre": "ana"}}
+
+    monitor.succeeded(_evento(1, duracion_ms=50))
+    monitor.failed(_evento(2, duracion_ms=50))
+    assert monitor._en_curso == {}
+    (insert, plan_insert), (find, plan_find) = registro.encolados
+    assert insert["forma"]["documents"] == [{"nombre": "?"}, "... 100"] and plan_insert is None
+    assert find["forma"] == {"find": "candidatos", "filter": {"nombre": "?"}}
+    assert plan_find == {"base_datos": "tpo", "comando": {"find": "candidatos", "filter": {"nombre": "ana"}}}
+
+
+def test_monitor_en_curso_acotado_y_con_vencimiento(registro, monkeypatch):
+    monitor = MonitorLentasMongo(registro)
+    for i in range(5):
+        monitor.started(_evento(i))
+    assert [k[1] for k in monitor._en_curso] == [2, 3, 4] and monitor.olvidados == 2
+
+    ahora = operaciones_lentas.time.monotonic()
+    monkeypatch.setattr(operaciones_lentas.time, "monotonic", lambda: ahora + registro.en_curso_s)
+    monitor.started(_evento(9))
+    assert [k[1] for k in monitor._en_curso] == [9] and monitor.olvidados == 5
+    # La respuesta de un comando olvidado no registra nada
+    monitor.succeeded(_evento(3, duracion_ms=50))
+    assert registro.encolados == []
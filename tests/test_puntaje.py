@@ -0,0 +1,34 @@
+import random
+
+from app.services.funciones import explain_match
+from app.services.puntaje import explain_match_bulk, score_bulk
+
+SKILLS = ["python", "sql", "power bi", "machine learning", "tensorflow", "docker", "react", "redis"]
+
+
+def _perfiles(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    perfiles = []
+    for i in range(n):
+        tecnicas = [{"nombre": s, "nivel": rnd.randint(0, 10)} for s in rnd.sample(SKILLS, rnd.randint(0, 5))]
+        if tecnicas and rnd.random() < 0.2:
+            # Skill repetida: gana la última ocurrencia, igual que el dict de explain_match
+            tecnicas.append({"nombre": tecnicas[0]["nombre"], "nivel": rnd.randint(0, 10)})
+        perfiles.append({"informacion_personal": {"nombre_apellido": f"c{i}"},
+                         "habilidades": {"tecnicas": tecnicas}})
+    perfiles.append({"informacion_personal": {"nombre_apellido": "sin habilidades"}})
+    perfiles.append({"habilidades": {"tecnicas": None}})
+    return perfiles
+
+
+def test_score_bulk_igual_a_explain_match():
+    perfiles = _perfiles(500)
+    for reqs in (["python", "sql", "machine learning"], ["python", "python", "redis"], ["cobol"], []):
+        esperado = [explain_match(p, reqs) for p in perfiles]
+        assert score_bulk(perfiles, reqs).tolist() == [e["total"] for e in esperado]
+        assert explain_match_bulk(perfiles, reqs) == esperado
+
+
+def test_score_bulk_sin_perfiles():
+    assert score_bulk([], ["python"]).tolist() == []
+    assert explain_match_bulk([], ["python"]) == []
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import mongomock
+from bson import ObjectId
+
+from app.services.versiones import _reservar_versiones, log_version, log_versions
+
+
+def test_reservar_siembra_con_la_ultima_version_registrada():
+    db = mongomock.MongoClient().db
+    cid = ObjectId()
+    db.versiones_perfil.insert_many([{"candidato_id": cid, "version": v} for v in (1, 2, 5)])
+    assert _reservar_versiones(db, cid) == 6
+    assert _reservar_versiones(db, cid, 3) == 7
+    assert _reservar_versiones(db, cid) == 10
+    assert _reservar_versiones(db, ObjectId()) == 1
+
+
+class _Atomica:
+    """Colección de mongomock con cada operación atómica, como en el servidor (mongomock no lo es)."""
+
+    def __init__(self, col, lock):
+        self._col, self._lock = col, lock
+
+    def __getattr__(self, nombre):
+        metodo = getattr(self._col, nombre)
+
+        def atomico(*args, **kwargs):
+            with self._lock:
+                return metodo(*args, **kwargs)
+        return atomico
+
+
+class _DbAtomica:
+    def __init__(self, db):
+        self._db, self._lock = db, threading.Lock()
+
+    def __getattr__(self, nombre):
+        return _Atomica(self._db[nombre], self._lock)
+
+
+def test_reservar_concurrente_no_repite_numeros():
+    # Sin contador previo: varios threads compiten por sembrarlo (DuplicateKeyError -> reintento)
+    db = _DbAtomica(mongomock.MongoClient().db)
+    cid = ObjectId()
+    with ThreadPoolExecutor(8) as ex:
+        primeros = list(ex.map(lambda _: _reservar_versiones(db, cid, 2), range(200)))
+    numeros = [p + i for p in primeros for i in range(2)]
+    assert sorted(numeros) == list(range(1, 401))
+
+
+def test_log_version_y_log_versions_numeran_en_orden():
+    db = mongomock.MongoClient().db
+    cid = ObjectId()
+    assert log_version(db, cid, "Usuario creado", {"a": 1})["version"] == 1
+    out = log_versions(db, [(cid, "Agregó skill python", None), (str(cid), "Agregó skill sql", None)])
+    assert [v["version"] for v in out] == [2, 3]
+    versiones = [d["version"] for d in db.versiones_perfil.find({"candidato_id": cid}, sort=[("version", 1)])]
+    assert versiones == [1, 2, 3]
+
+
+def test_log_versions_nuevos_con_contador_existente_cae_a_la_reserva():
+    db = mongomock.MongoClient().db
+    viejo, nuevo = ObjectId(), ObjectId()
+    log_version(db, viejo, "Usuario creado")
+    out = log_versions(db, [(viejo, "Reimportado", None), (nuevo, "Usuario creado", None)], nuevos=True)
+    assert [(v["candidato_id"], v["version"]) for v in out] == [(str(viejo), 2), (str(nuevo), 1)]